@@ -7,4 +7,5 @@ analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
 from . import product_routes
 from . import company_routes
 from . import global_routes
+from . import commands
 
@@ -0,0 +1,41 @@
+import click
+from datetime import datetime
+from analytics import analytics_bp
+from extensions import db
+from models import User
+from rollups import rebuild_daily_totals, rebuild_leaderboards
+from analytics_cache import invalidate_analytics, unshared_invalidation_warning
+
+def parse_date_option(ctx, param, value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        raise click.BadParameter(f"Invalid date: '{value}'. Use YYYY-MM-DD.")
+
+@analytics_bp.cli.command("rebuild-daily-totals")
+@click.option("--user-id", type=int, help="Only rebuild the rollup of this user.")
+@click.option("--start", callback=parse_date_option, help="First day to rebuild (YYYY-MM-DD).")
+@click.option("--end", callback=parse_date_option, help="Last day to rebuild (YYYY-MM-DD).")
+def rebuild_daily_totals_command(user_id, start, end):
+    """Recomputes the daily totals rollup from the raw entries (backfill or repair)."""
+    rows = rebuild_daily_totals(user_id=user_id, start=start, end=end)
+    db.session.commit()
+    for rebuilt_user_id in ([user_id] if user_id is not None else db.session.scalars(db.select(User.id))):
+        invalidate_analytics(rebuilt_user_id)
+    click.echo(f"Rebuilt {rows} daily total row(s).")
+    warning = unshared_invalidation_warning()
+    if warning:
+        click.echo(warning, err=True)
+
+@analytics_bp.cli.command("rebuild-leaderboards")
+def rebuild_leaderboards_command():
+    """Recomputes the company and product leaderboards, moving the rolling boards to today's window.
+    Schedule it daily (ex. shortly after midnight), so days leaving the rolling window stop counting."""
+    rows = rebuild_leaderboards()
+    db.session.commit()
+    for user_id in db.session.scalars(db.select(User.id)):
+        invalidate_analytics(user_id)
+    click.echo(f"Rebuilt {rows} leaderboard row(s).")
+    warning = unshared_invalidation_warning()
+    if warning:
+        click.echo(warning, err=True)
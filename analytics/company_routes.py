@@ -1,12 +1,13 @@
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from analytics import analytics_bp
-from analytics.utils import count_transactions, sum_monetary_totals, query_results, calculate_transaction_stats
+from analytics.utils import query_results, calculate_transaction_stats
 from models import ProductCompany, Product, Company, Entry, LineItem
 from flask import jsonify, current_app, g
 from werkzeug.exceptions import NotFound
 from extensions import db
 from utils import get_user_item_or_404, requires_auth
+from analytics_cache import cached_response
 
 def fetch_product_history(company_id):
     """
@@ -49,10 +50,8 @@ def all_company_products(company_id):
         # total_purchase_amount = sum(pc.total_quantity_bought for pc in all_products_query)
         # total_supply_amount = sum(pc.total_quantity_supplied for pc in all_products_query)
 
-        # Count how many purchase/supply entries this company has:
-        entries = query_results(company_id = company.id)
-
-        stats = calculate_transaction_stats(entries = entries, pcs = all_products_query)
+        # Counts, totals and averages of this company's purchase/supply entries
+        stats = calculate_transaction_stats(g.user.id, company_id = company.id)
 
         # transactions_count = count_transactions(entries_list= entries)
         # purchase_count = transactions_count["purchase"]
@@ -123,6 +122,7 @@ def all_company_products(company_id):
 
 @analytics_bp.route("/companies/<company_id>/top-products", methods=["GET"])
 @requires_auth
+@cached_response
 def top_10_company_products(company_id):
     """
     Retrieves the top 10 most purchased and most supplied products for a specific company.
@@ -225,9 +225,7 @@ def product_history(company_id, product_id):
         if not pc:
             raise NotFound(description="No transaction data for this product & company")
 
-        # Even though this helper has been designed to accept multiple PC rows in mind, it can handle this case
-        # of a singular connection (One Product - One Company) wrapped into a list without a TypeError
-        stats = calculate_transaction_stats(entries = entries, pcs = [ pc ], product_id = product.id)
+        stats = calculate_transaction_stats(g.user.id, company_id = company.id, product_id = product.id)
 
         # transactions_count = count_transactions(entries_list = entries)
         # purchase_count = transactions_count["purchase"]
@@ -281,7 +279,7 @@ def product_history(company_id, product_id):
             "transactions" : [
             # Transform each entry to a format workable for the React frontend timeline
                 {
-                    "date": entry.date,
+                    "date": entry.date.isoformat(),
                     "transaction_type": entry.transaction_type,
                     "document_nr": entry.document_nr,
                     "line_items": [li.to_dict()
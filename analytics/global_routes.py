@@ -2,16 +2,28 @@
 # GET /analytics/top-companies /analytics/global/top-products?range=month
 # GET /analytics/monthly-summary /analytics/global/top-companies?range=month
 from datetime import datetime, timedelta
+from itertools import islice
 from analytics import analytics_bp
 from analytics.utils import get_entry_totals_filtered, parse_date_range, get_companies_tally, get_products_tally, \
-    get_month_periods, compare_months, compare_periods
-from flask import jsonify, current_app, request
+    get_monthly_totals, compare_months, compare_periods, get_timeseries, bucket_starts, DATE_BUCKETS, \
+    get_periods_totals, compare_period_series, get_leaderboard, leaderboard_period, LEADERBOARDS
+from flask import jsonify, current_app, request, g
 from werkzeug.exceptions import NotFound
 from models import Product, Company
 from utils import get_user_item_or_404, requires_auth
+from analytics_cache import cached_response
+
+# Range of the 'months' parameter of the quick trends (the month to month comparison needs 3)
+QUICK_TRENDS_MIN_MONTHS = 3
+QUICK_TRENDS_MAX_MONTHS = 24
+# Largest number of buckets returned by the time series
+TIMESERIES_MAX_POINTS = 1000
+# Largest number of periods compared in one request
+COMPARE_MAX_PERIODS = 24
 
 @analytics_bp.route("/global/summary", methods = ["GET"])
 @requires_auth
+@cached_response
 def global_summary():
 
     try:
@@ -51,7 +63,7 @@ def global_summary():
         #     "totals": totals
         # })
 
-        monetary_totals = get_entry_totals_filtered(start = start, end = end, product = product, company = company)
+        monetary_totals = get_entry_totals_filtered(g.user.id, start = start, end = end, product = product, company = company)
 
         # Fallback checking for empty keys if default 'None' returned if no query results somehow failed.
         if not monetary_totals or (monetary_totals["supply"] == 0 and monetary_totals["purchase"] == 0):
@@ -89,14 +101,75 @@ def global_summary():
         current_app.logger.error(f"Unexpected error in {global_summary.__name__}: {str(e)}")
         return jsonify(error="Internal server error"), 500
 
+@analytics_bp.route("/global/timeseries", methods = ["GET"])
+@requires_auth
+@cached_response
+def global_timeseries():
+    """
+    Supply and purchase values per 'bucket' (day, week or month) of the date range (default: last 30 days),
+    optionally filtered by product and/or company. Returns the whole zero-filled series in one response.
+    """
+
+    try:
+
+        bucket = request.args.get("bucket", "day")
+        product_id = request.args.get("product_id")
+        company_id = request.args.get("company_id")
+
+        try:
+            product = get_user_item_or_404(Product, int(product_id)) if product_id else None
+            company = get_user_item_or_404(Company, int(company_id)) if company_id else None
+        except ValueError:
+            current_app.logger.error(f"Wrong Product/ Company ID provided by the client in {global_timeseries.__name__}.")
+            return jsonify(error=f"Invalid Product: '{product_id}' ID or Company: '{company_id}' ID. An integer expected."), 400
+
+        if bucket not in DATE_BUCKETS:
+            return jsonify(error=f"Invalid bucket: '{bucket}'. Use one of: {', '.join(DATE_BUCKETS)}."), 400
+
+        start, end = parse_date_range(request.args.get("start"), request.args.get("end"))
+
+        # Bounding the response size: ex. 2 years of daily bars is fine, a century is not
+        if len(list(islice(bucket_starts(start, end, bucket), TIMESERIES_MAX_POINTS + 1))) > TIMESERIES_MAX_POINTS:
+            return jsonify(error=f"Too many {bucket} buckets in the date range (maximum {TIMESERIES_MAX_POINTS}). "
+                                 f"Use a shorter range or a larger bucket."), 400
+
+        series = get_timeseries(g.user.id, start, end, bucket = bucket, product = product, company = company)
+
+        return jsonify({
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "bucket": bucket,
+            "filters": {
+                "product": {"id": product.id, "name": product.name} if product else None,
+                "company": {"id": company.id, "name": company.name} if company else None
+            },
+            "series": series
+        })
+
+    except NotFound as err:
+
+        current_app.logger.error(f"No Product/ Company found for given id's in {global_timeseries.__name__}: {str(err.description)}")
+        return jsonify(error=err.description), 404
+
+    except ValueError as e:
+
+        current_app.logger.error(f"Wrong data format provided by the client in {global_timeseries.__name__}: {str(e)}")
+        return jsonify(error=str(e)), 400
+
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in {global_timeseries.__name__}: {str(e)}")
+        return jsonify(error="Internal server error"), 500
+
 @analytics_bp.route("/global/products-tally", methods = ["GET"])
 @requires_auth
+@cached_response
 def global_by_products():
 
     try:
 
         start_date = request.args.get("start")
         end_date = request.args.get("end")
+        board = request.args.get("range")
         limit = request.args.get("limit")
 
         if limit:
@@ -109,16 +182,26 @@ def global_by_products():
                 current_app.logger.error(f"Invalid 'limit' filter input in {global_by_products.__name__}.")
                 return jsonify({"error": f"Invalid input for limit filter: '{limit}'. An integer expected."}), 400
 
+        if board and (start_date or end_date):
+            return jsonify({"error": "Use either the 'range' or the 'start'/'end' filters."}), 400
+        if board and board not in LEADERBOARDS:
+            return jsonify({"error": f"Invalid range: '{board}'. Use one of: {', '.join(LEADERBOARDS)}."}), 400
+
         try:
             if not start_date and not end_date:
-                start, end = parse_date_range(start_date, end_date, fallback_days = "all")
+                # Whole-range tallies (all time by default) are served from the precomputed leaderboards
+                board = board or "all_time"
+                start, end = leaderboard_period(board)
             else:
                 start, end = parse_date_range(start_date, end_date)
         except ValueError as e:
             current_app.logger.error(f"Date parsing error in {global_by_products.__name__}: {str(e)}")
             return jsonify({"error": str(e)}), 400
 
-        all_products_tally = get_products_tally(start = start, end = end, limit = limit)
+        all_products_tally = get_leaderboard(g.user.id, "product", board, limit = limit) if board else None
+        if not all_products_tally:
+            # Custom date range, or a rolling board not rebuilt for today's window yet
+            all_products_tally = get_products_tally(g.user.id, start = start, end = end, limit = limit)
 
         if not all_products_tally or (not all_products_tally.get("supply") and not all_products_tally.get("purchase")):
             current_app.logger.info(f"Received global top-products tally request with args: {dict(request.args)}."
@@ -145,12 +228,14 @@ def global_by_products():
 
 @analytics_bp.route("/global/companies-tally", methods = ["GET"])
 @requires_auth
+@cached_response
 def global_by_companies():
 
     try:
 
         start_date = request.args.get("start")
         end_date = request.args.get("end")
+        board = request.args.get("range")
         limit = request.args.get("limit")
 
         if limit:
@@ -163,16 +248,26 @@ def global_by_companies():
                 current_app.logger.error(f"Invalid 'limit' filter input in {global_by_companies.__name__}.")
                 return jsonify({"error": f"Invalid input for limit filter: '{limit}'. An integer expected."}), 400
 
+        if board and (start_date or end_date):
+            return jsonify({"error": "Use either the 'range' or the 'start'/'end' filters."}), 400
+        if board and board not in LEADERBOARDS:
+            return jsonify({"error": f"Invalid range: '{board}'. Use one of: {', '.join(LEADERBOARDS)}."}), 400
+
         try:
             if not start_date and not end_date:
-                start, end = parse_date_range(start_date, end_date, fallback_days = "all")
+                # Whole-range tallies (all time by default) are served from the precomputed leaderboards
+                board = board or "all_time"
+                start, end = leaderboard_period(board)
             else:
                 start, end = parse_date_range(start_date, end_date)
         except ValueError as e:
             current_app.logger.error(f"Date parsing error in {global_by_companies.__name__}: {str(e)}")
             return jsonify({"error": str(e)}), 400
 
-        all_companies_tally = get_companies_tally(start = start, end = end, limit = limit)
+        all_companies_tally = get_leaderboard(g.user.id, "company", board, limit = limit) if board else None
+        if not all_companies_tally:
+            # Custom date range, or a rolling board not rebuilt for today's window yet
+            all_companies_tally = get_companies_tally(g.user.id, start = start, end = end, limit = limit)
 
         if not all_companies_tally or (not all_companies_tally.get("supply") and not all_companies_tally.get("purchase")):
             current_app.logger.info(f"Received global top-companies tally request with args: {dict(request.args)}."
@@ -199,26 +294,29 @@ def global_by_companies():
 
 @analytics_bp.route("/global/quick-trends", methods = ["GET"])
 @requires_auth
+@cached_response
 def global_quick_trends():
+    """
+    Monthly supply and purchase totals of the last 'months' months (default 3, up to 24), computed in one
+    grouped query, with the change of the current month against the previous two.
+    """
 
     try:
 
         try:
-            this_month_start, this_month_end = get_month_periods(0)
-            last_month_start, last_month_end = get_month_periods(1)
-            two_months_back_start, two_months_back_end = get_month_periods(2)
-        except ValueError as e:
-            return jsonify(error=str(e))
+            months = int(request.args.get("months", 3))
+        except ValueError:
+            return jsonify(error=f"Invalid number of months: '{request.args.get('months')}'. An integer expected."), 400
+        if not QUICK_TRENDS_MIN_MONTHS <= months <= QUICK_TRENDS_MAX_MONTHS:
+            return jsonify(error=f"The number of months must be between {QUICK_TRENDS_MIN_MONTHS} and "
+                                 f"{QUICK_TRENDS_MAX_MONTHS}."), 400
 
-        this_month_summary = get_entry_totals_filtered(start = this_month_start, end = this_month_end, trends = True)
-        last_month_summary = get_entry_totals_filtered(start = last_month_start, end = last_month_end, trends = True)
-        two_months_back_summary = get_entry_totals_filtered(start = two_months_back_start, end = two_months_back_end, trends = True)
+        monthly_totals = get_monthly_totals(g.user.id, months)
 
-        # Removing the filters key from the monthly totals analysis. They are not used here
-        # therefore should not confuse the user.
-        summaries = [this_month_summary, last_month_summary, two_months_back_summary]
-        for summary in summaries:
-            summary.pop("filters", None)
+        # Only the totals are kept for the month to month comparison, the month labels are in 'months'
+        this_month_summary, last_month_summary, two_months_back_summary = [
+            {"supply": month["supply"], "purchase": month["purchase"]} for month in monthly_totals[:3]
+        ]
 
         change_data = compare_months(this_month_data = this_month_summary, last_month_data = last_month_summary,
                                      two_months_back_data = two_months_back_summary)
@@ -227,7 +325,8 @@ def global_quick_trends():
             "current_month" : this_month_summary,
             "last_month" : last_month_summary,
             "two_months_back" : two_months_back_summary,
-            "change_percent" : change_data
+            "change_percent" : change_data,
+            "months": monthly_totals
         })
 
     except Exception as e:
@@ -237,18 +336,33 @@ def global_quick_trends():
 
 @analytics_bp.route("/global/compare-periods", methods = ["GET"])
 @requires_auth
+@cached_response
 def global_compare_periods():
+    """
+    Compares the supply and purchase totals of any number of periods, given as
+    'periods=YYYY-MM-DD:YYYY-MM-DD,YYYY-MM-DD:YYYY-MM-DD,...' (ex. eight quarters), each against the next one.
+    The legacy 'start1', 'end1', 'start2', 'end2' parameters are still accepted for two periods.
+    All periods are computed in one query.
+    """
 
     try:
 
-        # Using simple dictionary style access to trigger KeyError if any parameter is missing.
-        # This is intended behavior since 'global_quick_trends' already handles quick last few months data comparison.
-        # This endpoint serves as a direct, custom period comparative analysis, therefore all dates are required.
-        required_dates = ["start1", "end1", "start2", "end2"]
-        try:
-            start_date_1, end_date_1, start_date_2, end_date_2 = [request.args[param] for param in required_dates]
-        except KeyError:
-            return jsonify(error="Please provide all required date periods to launch the analysis."), 400
+        # All dates are required: 'global_quick_trends' already handles the quick last few months comparison.
+        # This endpoint serves as a direct, custom period comparative analysis.
+        legacy = "periods" not in request.args
+        if legacy:
+            required_dates = ["start1", "end1", "start2", "end2"]
+            try:
+                start_date_1, end_date_1, start_date_2, end_date_2 = [request.args[param] for param in required_dates]
+            except KeyError:
+                return jsonify(error="Please provide all required date periods to launch the analysis."), 400
+            period_dates = [(start_date_1, end_date_1), (start_date_2, end_date_2)]
+        else:
+            period_dates = [period.partition(":")[::2] for period in request.args["periods"].split(",")]
+            if not 2 <= len(period_dates) <= COMPARE_MAX_PERIODS:
+                return jsonify(error=f"Please provide between 2 and {COMPARE_MAX_PERIODS} periods to compare."), 400
+            if not all(start_date and end_date for start_date, end_date in period_dates):
+                return jsonify(error="Every period needs a start and an end date: 'YYYY-MM-DD:YYYY-MM-DD'."), 400
 
         product_id = request.args.get("product_id")
         company_id = request.args.get("company_id")
@@ -262,21 +376,33 @@ def global_compare_periods():
                 error=f"Invalid Product: '{product_id}' ID or Company: '{company_id}' ID. An integer expected."), 400
 
         try:
-            start_1, end_1 = parse_date_range(start_date_1, end_date_1)
-            start_2, end_2 = parse_date_range(start_date_2, end_date_2)
+            periods = [parse_date_range(start_date, end_date) for start_date, end_date in period_dates]
         except ValueError as e:
             current_app.logger.error(f"Date parsing error in {global_compare_periods.__name__}: {str(e)}")
             return jsonify(error=str(e)), 400
 
-        monetary_totals_1 = get_entry_totals_filtered(start = start_1, end = end_1, product = product, company = company, trends = True)
-        monetary_totals_2 = get_entry_totals_filtered(start = start_2, end = end_2, product = product, company = company, trends = True)
+        periods_totals = get_periods_totals(g.user.id, periods, product = product, company = company)
+
+        if legacy:
+            (start_1, end_1), (start_2, end_2) = periods
+            monetary_totals_1, monetary_totals_2 = [
+                {"supply": totals["supply"], "purchase": totals["purchase"]} for totals in periods_totals
+            ]
+            change_data = compare_periods(period_1_data = monetary_totals_1, period_2_data = monetary_totals_2)
 
-        change_data = compare_periods(period_1_data = monetary_totals_1, period_2_data = monetary_totals_2)
+            return jsonify({
+                f"period_1 ({start_1} - {end_1})": monetary_totals_1,
+                f"period_2 ({start_2} - {end_2})": monetary_totals_2,
+                "change_percent": change_data
+            })
 
         return jsonify({
-            f"period_1 ({start_1} - {end_1})": monetary_totals_1,
-            f"period_2 ({start_2} - {end_2})": monetary_totals_2,
-            "change_percent": change_data
+            "filters": {
+                "product": {"id": product.id, "name": product.name} if product else None,
+                "company": {"id": company.id, "name": company.name} if company else None
+            },
+            "periods": periods_totals,
+            "change_percent": compare_period_series(periods_totals)
         })
 
     except NotFound as err:
@@ -1,23 +1,21 @@
 from analytics import analytics_bp
-from analytics.utils import query_results, calculate_transaction_stats
-from flask import jsonify, current_app
+from analytics.utils import calculate_transaction_stats
+from flask import jsonify, current_app, g
 from werkzeug.exceptions import NotFound
 from extensions import db
 from models import Product, ProductCompany
 from utils import get_user_item_or_404, requires_auth
+from analytics_cache import cached_response
 
 @analytics_bp.route("/products/<product_id>/top-partners", methods = ["GET"])
 @requires_auth
+@cached_response
 def top_partners(product_id):
 
     try:
 
         product = get_user_item_or_404(Product, product_id)
 
-        # For monetary and qualitative stats:
-
-        entries = query_results(product_id = product.id)
-
         # transactions_count = count_transactions(entries_list = entries)
         # purchase_count = transactions_count["purchase"]
         # supply_count = transactions_count["supply"]
@@ -44,7 +42,7 @@ def top_partners(product_id):
         # average_supply_value = round(total_supply_value / supply_count, 2) if supply_count else 0
         # average_purchase_value = round(total_purchase_value / purchase_count, 2) if purchase_count else 0
 
-        stats = calculate_transaction_stats(entries = entries, pcs = all_product_companies, product_id = product.id)
+        stats = calculate_transaction_stats(g.user.id, product_id = product.id)
 
         # Filtering the entries query-reusing for efficiency
         top_suppliers = (
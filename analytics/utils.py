@@ -1,31 +1,36 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import OrderedDict
 
 from flask import current_app
-from sqlalchemy import func, Date, cast, desc
+from sqlalchemy import func, desc, case
 from sqlalchemy.orm import joinedload
 from werkzeug.exceptions import NotFound
 
 from extensions import db
-from models import Entry, LineItem, Company, Product
-from utils import get_user_item_or_404
+from models import Entry, LineItem, Company, Product, DailyTotal, Leaderboard
+from utils import get_user_item_or_404, date_bucket
+from entries.loaders import with_entry_serialisation
+from rollups import ALL_TIME, current_rolling_window, rolling_window_start
 
 def query_results(company_id: int = None, product_id: int = None):
+    """
+    Builds the query of entries for a company and/or product. Line items (with their products) and the company
+    are eager loaded with the shared serialisation strategy, so iterating and serialising the results costs a
+    constant number of statements.
+    """
 
     if company_id is None:
 
         if product_id is None:
             raise NotFound("Query results need parameters to run.")
 
-        entries = (
+        entries = with_entry_serialisation(
             db.session.query(Entry)
-            .options(joinedload(Entry.line_items))
             .filter(Entry.line_items.any(LineItem.product_id == product_id))
         )
     else:
-        entries = (
+        entries = with_entry_serialisation(
             db.session.query(Entry)
-            .options(joinedload(Entry.line_items))
             .filter(Entry.company_id == company_id)
         )
 
@@ -36,89 +41,77 @@ def query_results(company_id: int = None, product_id: int = None):
 
     return entries
 
-def count_transactions(entries_list):
+def scoped_to_user(model, user_id: int):
     """
-    Returns a dictionary with counts of 'Supply' and 'Purchase' entries
-    for the given company (and optional product).
+    Filter restricting an analytics query to one tenant's rows. Every aggregate goes through it, so no query
+    can read (or scan) other users' data; the tables' indexes lead with 'user_id' to serve it.
     """
+    if user_id is None:
+        raise ValueError("Analytics queries must be scoped to a user.")
 
+    return model.user_id == user_id
 
-    # Count supplies and purchases in one query each
-    supply_count = entries_list.filter(Entry.transaction_type == "Supply").count()
-    purchase_count = entries_list.filter(Entry.transaction_type == "Purchase").count()
-
-    return {"supply": supply_count, "purchase": purchase_count}
-
-def sum_monetary_totals(entries_list, product_id = None):
+def transaction_totals(user_id: int, company_id: int = None, product_id: int = None):
     """
-    Returns a dictionary with total monetary value of 'Supply' and 'Purchase' entries
-    for the given company (and optional product).
+    Returns the number of the user's entries, their monetary value and the quantity moved per transaction type
+    for the given company and/or product, computed in a single grouped query.
+    With a product, only that product's line items count towards the value and quantity.
     """
+    if company_id is None and product_id is None:
+        raise NotFound("Query results need parameters to run.")
 
-    total = {"supply": 0.0, "purchase": 0.0}
-    for e in entries_list:
-        val = sum(li.quantity * li.price_per_unit
-                  for li in e.line_items
-                  if product_id is None or li.product_id == product_id)
-        total[e.transaction_type.lower()] += val
-
-    return total
-
-    # query = (
-    #     db.session.query(
-    #         Entry.transaction_type,
-    #         func.sum(LineItem.quantity * LineItem.price_per_unit).label("total_value")
-    #     )
-    #     .join(LineItem, Entry.line_items)
-    #     .filter(Entry.company_id == company_id)
-    # )
-    #
-    # # Optionally filter by product
-    # if product_id is not None:
-    #     query = query.filter(LineItem.product_id == product_id)
-    #
-    # # Group by type (Supply/Purchase)
-    # query = query.group_by(Entry.transaction_type)
-    #
-    # # Execute and map to dict
-    # results = query.all()
-    # total = {"supply": 0.0, "purchase": 0.0}
-    # for transaction_type, value in results:
-    #     total[transaction_type.lower()] = float(value) if value else 0.0
-    #
-    # return total
-
-
-def calculate_transaction_stats(entries, pcs = None, product_id = None):
-    """
-    Calculate transaction stats, optionally aggregating from a list of ProductCompany rows (pcs).
-    """
-    counts = count_transactions(entries)
-    totals = sum_monetary_totals(entries, product_id = product_id)
+    query = (
+        db.session.query(
+            Entry.transaction_type,
+            func.count(func.distinct(Entry.id)),
+            func.coalesce(func.sum(LineItem.quantity * LineItem.price_per_unit), 0.0),
+            func.coalesce(func.sum(LineItem.quantity), 0.0)
+        )
+        .join(LineItem, Entry.line_items)
+        .filter(scoped_to_user(Entry, user_id))
+        .group_by(Entry.transaction_type)
+    )
+
+    if company_id is not None:
+        query = query.filter(Entry.company_id == company_id)
+
+    if product_id is not None:
+        query = query.filter(LineItem.product_id == product_id)
 
-    # Sum quantities across all ProductCompany entries
-    total_quantity_purchased = sum(pc.total_quantity_bought for pc in pcs) if pcs else sum(getattr(e, 'total_quantity_bought', 0) for e in entries)
-    total_quantity_supplied = sum(pc.total_quantity_supplied for pc in pcs) if pcs else sum(getattr(e, 'total_quantity_supplied', 0) for e in entries)
+    totals = {
+        "count": {"supply": 0, "purchase": 0},
+        "value": {"supply": 0.0, "purchase": 0.0},
+        "quantity": {"supply": 0.0, "purchase": 0.0},
+    }
+    for transaction_type, count, value, quantity in query.all():
+        totals["count"][transaction_type.lower()] = count
+        totals["value"][transaction_type.lower()] = float(value)
+        totals["quantity"][transaction_type.lower()] = float(quantity)
 
-    average_purchase_quantity = round(total_quantity_purchased / counts["purchase"], 2) if counts["purchase"] else 0
-    average_supply_quantity = round(total_quantity_supplied / counts["supply"], 2) if counts["supply"] else 0
+    return totals
+
+def calculate_transaction_stats(user_id: int, company_id: int = None, product_id: int = None):
+    """
+    Calculate transaction stats (counts, monetary and quantitative totals and their averages)
+    for a company and/or product. Aggregated in the database, so the cost does not grow with
+    the number of entries loaded into the app.
+    """
+    totals = transaction_totals(user_id, company_id = company_id, product_id = product_id)
+    counts, values, quantities = totals["count"], totals["value"], totals["quantity"]
 
     stats = {
         "transaction_counts": counts,
         "totals": {
-            "quantitative": {
-                "purchase": total_quantity_purchased,
-                "supply": total_quantity_supplied,
-            },
-            "monetary": totals,
+            "quantitative": quantities,
+            "monetary": values,
         },
         "average_quantity_per_transaction": {
-            "purchase": average_purchase_quantity,
-            "supply": average_supply_quantity,
+            "purchase": round(quantities["purchase"] / counts["purchase"], 2) if counts["purchase"] else 0,
+            "supply": round(quantities["supply"] / counts["supply"], 2) if counts["supply"] else 0,
         },
         "average_value_per_transaction": {
-            "purchase": round(totals["purchase"] / counts["purchase"], 2) if counts["purchase"] else 0,
-            "supply": round(totals["supply"] / counts["supply"], 2) if counts["supply"] else 0,
+            "purchase": round(values["purchase"] / counts["purchase"], 2) if counts["purchase"] else 0,
+            "supply": round(values["supply"] / counts["supply"], 2) if counts["supply"] else 0,
         },
     }
 
@@ -130,14 +123,8 @@ def filter_entries(start: datetime = None, end: datetime = None, entries = None,
     if entries is None:
         query = db.session.query(Entry)
 
-        # Dynamically building joinedload options
-        options = [joinedload(Entry.line_items)]
-        if companies:
-            options.append(joinedload(Entry.company))
-        if products:
-            options.append(joinedload(Entry.line_items).joinedload("product"))
-
-        query = query.options(*options)
+        # Shared serialisation strategy (line items with their products, optionally the company)
+        query = with_entry_serialisation(query, company=companies)
 
         if start and end:
             query = query.filter(Entry.date >= start, Entry.date <= end)
@@ -193,21 +180,22 @@ def parse_date_range(start_str: str, end_str: str, fallback_days = 30):
 
     return start, end
 
-def get_entry_totals_filtered(start: datetime, end: datetime, product = None, company = None, trends:bool = False):
+def get_entry_totals_filtered(user_id: int, start: datetime, end: datetime, product = None, company = None, trends:bool = False):
     """
-    Returns a dictionary with total value of supply and purchase transactions,
+    Returns a dictionary with total value of the user's supply and purchase transactions,
     optionally filtered by date range, product ID, and/or company ID.
     If trends is True, returns a dictionary with zero values for both supply
     and purchase to enable percentage computations, otherwise returns None.
     """
 
+    # Read from the daily rollup: the cost depends on the days in range, not on the number of LineItems
     query = (
         db.session.query(
-            Entry.transaction_type,
-            func.sum(LineItem.quantity * LineItem.price_per_unit)
+            DailyTotal.transaction_type,
+            func.sum(DailyTotal.value)
         )
-        .join(Entry.line_items)
-        .group_by(Entry.transaction_type)
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .group_by(DailyTotal.transaction_type)
     )
 
 
@@ -218,24 +206,21 @@ def get_entry_totals_filtered(start: datetime, end: datetime, product = None, co
     }
 
     if product:
-        query = query.join(LineItem.product).filter(Product.id == product.id)
+        query = query.filter(DailyTotal.product_id == product.id)
         sales_summary["filters"]["product"] = {
             "id": product.id,
             "name": product.name
         }
 
     if company:
-        query = query.filter(Entry.company_id == company.id)
+        query = query.filter(DailyTotal.company_id == company.id)
         sales_summary["filters"]["company"] = {
             "id": company.id,
             "name": company.name
         }
 
     if start and end:
-        query = query.filter(
-            cast(Entry.date, Date) >= start,
-            cast(Entry.date, Date) <= end
-        )
+        query = query.filter(DailyTotal.date >= start, DailyTotal.date <= end)
 
     results = query.all()
 
@@ -252,38 +237,35 @@ def get_entry_totals_filtered(start: datetime, end: datetime, product = None, co
 
     return sales_summary
 
-def get_companies_tally(start: datetime = None, end: datetime = None, limit: int = None):
+def get_companies_tally(user_id: int, start: datetime = None, end: datetime = None, limit: int = None):
     """
-    Uses SQL aggregation to return top companies by total transaction value,
+    Uses SQL aggregation (over the user's daily rollup) to return top companies by total transaction value,
     grouped by transaction type.
     Allows to filter the results by 'limit' filter, restricting the number of query results by
     each transaction type to the desired number.
     Allows to filter the results by the chosen date range.
     """
 
-    total_value = func.sum(LineItem.quantity * LineItem.price_per_unit).label("total_value")
+    total_value = func.sum(DailyTotal.value).label("total_value")
     row_number = func.row_number().over(
-        partition_by=Entry.transaction_type,
+        partition_by=DailyTotal.transaction_type,
         order_by=desc(total_value)
     ).label("row_num")
 
     base_query = (
         db.session.query(
-            Entry.transaction_type,
+            DailyTotal.transaction_type,
             Company.name.label("company_name"),
             total_value,
             row_number
         )
-        .join(Entry.line_items)
-        .join(Entry.company)
-        .group_by(Entry.transaction_type, Company.name) # Window function already handles grouping using 'partition_by', but we need to aggregate results under specific companies.
+        .join(Company, Company.id == DailyTotal.company_id)
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .group_by(DailyTotal.transaction_type, Company.name) # Window function already handles grouping using 'partition_by', but we need to aggregate results under specific companies.
     )
 
     if start and end:
-        base_query = base_query.filter(
-            cast(Entry.date, Date) >= start,
-            cast(Entry.date, Date) <= end
-        )
+        base_query = base_query.filter(DailyTotal.date >= start, DailyTotal.date <= end)
 
     # Using subquery because filtering on a window function is not possible in the same defining query.
     # row_num column must be computed first, then (mimicking WITH -CTE) can be filtered in outer scope.
@@ -315,38 +297,35 @@ def get_companies_tally(start: datetime = None, end: datetime = None, limit: int
 
     return top_companies
 
-def get_products_tally(start: datetime = None, end: datetime = None, limit:int = None):
+def get_products_tally(user_id: int, start: datetime = None, end: datetime = None, limit:int = None):
     """
-    Uses SQL aggregation to return top products by total transaction value,
+    Uses SQL aggregation (over the user's daily rollup) to return top products by total transaction value,
     grouped by transaction type.
     Allows to filter the results by 'limit' filter, restricting the number of query results by
     each transaction type to the desired number.
     Allows to filter the results by the chosen date range.
     """
 
-    total_value = func.sum(LineItem.quantity * LineItem.price_per_unit).label("total_value")
+    total_value = func.sum(DailyTotal.value).label("total_value")
     row_number = func.row_number().over(
-        partition_by=Entry.transaction_type,
+        partition_by=DailyTotal.transaction_type,
         order_by=desc(total_value)
     ).label("row_num")
 
     base_query = (
         db.session.query(
-            Entry.transaction_type,
+            DailyTotal.transaction_type,
             Product.name.label("product_name"),
             total_value,
             row_number
         )
-        .join(Entry.line_items)
-        .join(LineItem.product)
-        .group_by(Entry.transaction_type, Product.name)
+        .join(Product, Product.id == DailyTotal.product_id)
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .group_by(DailyTotal.transaction_type, Product.name)
     )
 
     if start and end:
-        base_query = base_query.filter(
-            cast(Entry.date, Date) >= start,
-            cast(Entry.date, Date) <= end
-        )
+        base_query = base_query.filter(DailyTotal.date >= start, DailyTotal.date <= end)
 
     # Wrap with subquery to filter on row_num
     subquery = base_query.subquery()
@@ -376,6 +355,64 @@ def get_products_tally(start: datetime = None, end: datetime = None, limit:int =
 
     return top_products
 
+LEADERBOARDS = ("all_time", "month", "rolling_30d")
+
+def leaderboard_period(board: str):
+    """The (start, end) dates covered by a leaderboard today."""
+    today = datetime.today().date()
+    if board == "month":
+        return today.replace(day = 1), today
+    if board == "rolling_30d":
+        return rolling_window_start(today), today
+    return datetime.min.date(), today
+
+def get_leaderboard(user_id: int, subject: str, board: str = "all_time", limit: int = None):
+    """
+    Returns the user's top companies or products ('subject') by total transaction value, grouped by transaction
+    type, from the precomputed leaderboards (see 'rollups.py'): all time, current month or rolling 30 days.
+    Returns None if the rolling boards were not rebuilt for today's window yet, or if there is no data.
+    """
+    if board == "all_time":
+        period_start = ALL_TIME
+    elif board == "month":
+        period_start = datetime.today().date().replace(day = 1)
+    elif board == "rolling_30d":
+        period_start = current_rolling_window()
+        if period_start is None:
+            return None
+    else:
+        raise ValueError(f"Invalid range: '{board}'. Use one of: {', '.join(LEADERBOARDS)}.")
+
+    model = Company if subject == "company" else Product
+    row_number = func.row_number().over(
+        partition_by = Leaderboard.transaction_type,
+        order_by = desc(Leaderboard.value)
+    ).label("row_num")
+
+    subquery = (
+        db.session.query(Leaderboard.transaction_type, model.name.label("name"), Leaderboard.value, row_number)
+        .join(model, model.id == Leaderboard.subject_id)
+        .filter(scoped_to_user(Leaderboard, user_id))
+        .filter(Leaderboard.board == board, Leaderboard.period_start == period_start, Leaderboard.subject == subject)
+        .subquery()
+    )
+    query = db.session.query(subquery.c.transaction_type, subquery.c.name, subquery.c.value)
+    if limit is not None:
+        query = query.filter(subquery.c.row_num <= limit)
+
+    results = query.order_by(subquery.c.transaction_type, subquery.c.row_num).all()
+    if not results:
+        return None
+
+    leaderboard = OrderedDict({
+        "supply": {},
+        "purchase": {}
+    })
+    for transaction_type, name, value in results:
+        leaderboard[transaction_type.lower()][name] = value
+
+    return leaderboard
+
 # def get_quick_trends():
 #
 #     pass
@@ -384,33 +421,134 @@ def get_products_tally(start: datetime = None, end: datetime = None, limit:int =
 #
 #     pass
 
+def get_periods_totals(user_id: int, periods: list, product = None, company = None):
+    """
+    Returns the user's supply and purchase totals for each (start, end) period, optionally filtered by product
+    and/or company. All periods are computed by one conditional aggregation query (one sum per period) over
+    the rollup rows of the span they cover, so the cost does not grow with the number of periods.
+    Periods may overlap.
+    """
+    sums = [
+        func.sum(case((DailyTotal.date.between(start, end), DailyTotal.value), else_ = 0))
+        for start, end in periods
+    ]
+    query = (
+        db.session.query(DailyTotal.transaction_type, *sums)
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .filter(DailyTotal.date >= min(start for start, _ in periods), DailyTotal.date <= max(end for _, end in periods))
+        .group_by(DailyTotal.transaction_type)
+    )
+
+    if product:
+        query = query.filter(DailyTotal.product_id == product.id)
+
+    if company:
+        query = query.filter(DailyTotal.company_id == company.id)
+
+    totals = [{"start": start.isoformat(), "end": end.isoformat(), "supply": 0, "purchase": 0} for start, end in periods]
+    for transaction_type, *period_values in query.all():
+        for period_totals, value in zip(totals, period_values):
+            period_totals[transaction_type.lower()] += value or 0
+
+    return totals
+
 def get_month_periods(months_ago: int):
     """
     Function (helper for 'global_quick_trends') that determines the first and last day for a month N months ago.
-    It outputs the result as a tuple (start, end) meaning the dates (YYYY-MM-DD) of the first and last day of the month determined by
+    It outputs the result as a tuple (start, end) meaning the dates of the first and last day of the month determined by
     'months_ago' input:
-    - 0: current month,
+    - 0: current month (ending today),
     - 1: last month,
-    -2: two months back.
+    - N: N months back.
     """
+    if months_ago < 0:
+        raise ValueError(f"The input of {get_month_periods.__name__} must be 0 (this month) or a number of months back.")
+
+    today = datetime.today().date()
+    month_index = today.year * 12 + today.month - 1 - months_ago  # Months counted from year 0, January = 0
+    start = date(month_index // 12, month_index % 12 + 1, 1)
 
-    today = datetime.today()
     if months_ago == 0:
-        start = today.replace(day=1).strftime("%Y-%m-%d")
-        end = today.strftime("%Y-%m-%d")
+        end = today
+    else:
+        end = date((month_index + 1) // 12, (month_index + 1) % 12 + 1, 1) - timedelta(days = 1)
 
-    elif months_ago == 1:
-        start = ((today - timedelta(days = today.day)).replace(day=1)).strftime("%Y-%m-%d")
-        end = (today.replace(day=1) - timedelta(days = 1)).strftime("%Y-%m-%d")
+    return start, end
+
+DATE_BUCKETS = ("day", "week", "month")
 
-    elif months_ago == 2:
-        start = ((today.replace(day = 1) - timedelta(days = 32)).replace(day=1)).strftime("%Y-%m-%d")
-        end = (((today - timedelta(days = today.day)).replace(day=1)) - timedelta(days = 1)).strftime("%Y-%m-%d")
+def bucket_starts(start: date, end: date, bucket: str):
+    """First days of the consecutive buckets covering start..end (the first one may begin before 'start')."""
+    if bucket == "week":
+        current = start - timedelta(days = start.weekday())
+    elif bucket == "month":
+        current = start.replace(day = 1)
     else:
-        raise ValueError(f"The possible inputs for the function: {get_month_periods.__name__}are: 0- for this month,"
-                         f"1- for previous month and 2- for two months back.")
+        current = start
 
-    return start, end
+    while current <= end:
+        yield current
+        if bucket == "month":
+            current = (current + timedelta(days = 32)).replace(day = 1)
+        else:
+            current += timedelta(days = 7 if bucket == "week" else 1)
+
+def get_timeseries(user_id: int, start: date, end: date, bucket: str = "day", product = None, company = None):
+    """
+    Returns the user's supply and purchase values per day, week or month of start..end, optionally filtered by
+    product and/or company, from one grouped query over the rollup. The series is dense: buckets without
+    transactions are filled with zeros.
+    """
+    if bucket not in DATE_BUCKETS:
+        raise ValueError(f"Invalid bucket: '{bucket}'. Use one of: {', '.join(DATE_BUCKETS)}.")
+
+    bucket_start = date_bucket(DailyTotal.date, bucket)
+    query = (
+        db.session.query(bucket_start, DailyTotal.transaction_type, func.sum(DailyTotal.value))
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .filter(DailyTotal.date >= start, DailyTotal.date <= end)
+        .group_by(bucket_start, DailyTotal.transaction_type)
+    )
+
+    if product:
+        query = query.filter(DailyTotal.product_id == product.id)
+
+    if company:
+        query = query.filter(DailyTotal.company_id == company.id)
+
+    series = OrderedDict(
+        (day.isoformat(), {"date": day.isoformat(), "supply": 0, "purchase": 0})
+        for day in bucket_starts(start, end, bucket)
+    )
+    for day, transaction_type, total_value in query.all():
+        series[str(day)[:10]][transaction_type.lower()] += total_value
+
+    return list(series.values())
+
+def get_monthly_totals(user_id: int, months: int):
+    """
+    Returns the user's supply and purchase totals for each of the last 'months' months (current month first)
+    from a single scan of the rollup bucketed by month, so a 24-month trend costs the same one query as 3 months.
+    """
+    periods = [get_month_periods(months_ago) for months_ago in range(months)]
+    bucket = date_bucket(DailyTotal.date, "month")
+
+    results = (
+        db.session.query(bucket, DailyTotal.transaction_type, func.sum(DailyTotal.value))
+        .filter(scoped_to_user(DailyTotal, user_id))
+        .filter(DailyTotal.date >= periods[-1][0], DailyTotal.date <= periods[0][1])
+        .group_by(bucket, DailyTotal.transaction_type)
+        .all()
+    )
+
+    totals = {start.isoformat(): {"supply": 0, "purchase": 0} for start, _ in periods}
+    for month, transaction_type, total_value in results:
+        totals[str(month)[:10]][transaction_type.lower()] += total_value
+
+    return [
+        {"month": start.strftime("%Y-%m"), "start": start.isoformat(), "end": end.isoformat(), **totals[start.isoformat()]}
+        for start, end in periods
+    ]
 
 def compute_change_percent(current: float, previous: float):
 
@@ -454,6 +592,19 @@ def compare_periods(period_1_data: dict, period_2_data: dict):
 
     return change_data
 
+def compare_period_series(periods_data: list):
+    """Change percentages of every period against the next one in the list (ex. each quarter vs the one before)."""
+
+    return [
+        {
+            "period": index + 1,
+            "vs_period": index + 2,
+            "purchase": compute_change_percent(current.get("purchase", 0), following.get("purchase", 0)),
+            "supply": compute_change_percent(current.get("supply", 0), following.get("supply", 0))
+        }
+        for index, (current, following) in enumerate(zip(periods_data, periods_data[1:]))
+    ]
+
 
 
 
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request, g
+
+from cache import CACHE_REGISTRY, TTLCache, get_cache_backend
+
+
+class ResponseCache:
+    """
+    Cache of JSON responses keyed by (user, generation, endpoint, normalised arguments).
+    Each user has a generation token that any write to their data replaces, so responses computed before
+    the write are never looked up again and age out of the backend instead of being deleted one by one.
+
+    A write only hides the responses of the caches reading the same generations, so with several processes
+    the generations must be kept in a shared store ('generations_backend', 'redis' by default once
+    'CACHE_REDIS_URL' is set), even when the results are cached per process. See 'shared'.
+    """
+
+    def __init__(self, name, maxsize=2048, ttl=300, backend=None, generations_backend=None, generations=None):
+        self.name = name
+        self.ttl = ttl
+        self.results = get_cache_backend(name, maxsize=maxsize, ttl=ttl, backend=backend)
+        if generations is None:
+            generations_backend = generations_backend or ("redis" if os.getenv("CACHE_REDIS_URL") else backend)
+            # Generations live as long as the results they guard: an expired or evicted generation is replaced
+            # by a fresh token, which only causes misses, never stale hits
+            generations = get_cache_backend(f"{name}_generations", maxsize=maxsize, ttl=ttl,
+                                            backend=generations_backend)
+        self.generations = generations
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.saved_seconds = 0.0
+        CACHE_REGISTRY[name] = self
+
+    @property
+    def shared(self):
+        """Whether the generations are seen by every process. When they are not, a write in one process leaves
+        the other processes serving the user's older responses until they expire: only safe with one process."""
+        return not isinstance(self.generations, TTLCache)
+
+    def generation(self, user_id):
+        """Returns the user's current generation token, starting a new one if there is none."""
+        current = self.generations.get(user_id)
+        if current is None:
+            current = self.bump(user_id)
+        return current
+
+    def bump(self, user_id):
+        """Starts a new generation for the user, so none of their cached responses is served anymore."""
+        token = time.time_ns()
+        self.generations.set(user_id, token)
+        return token
+
+    def key(self, user_id, endpoint, arguments):
+        """Builds the cache key. Arguments are sorted and blank values dropped, so equivalent requests share it."""
+        normalised = sorted((name, str(value).strip()) for name, value in arguments if str(value).strip())
+        return f"{user_id}:{self.generation(user_id)}:{endpoint}?{urlencode(normalised)}"
+
+    def get(self, key):
+        cached = self.results.get(key)
+        if cached is not None:
+            with self._lock:
+                self.saved_seconds += cached["seconds"]
+        return cached
+
+    def set(self, key, body, status, seconds):
+        self.results.set(key, {"body": body, "status": status, "seconds": seconds})
+
+    def clear(self):
+        self.results.clear()
+        self.generations.clear()
+        with self._lock:
+            self.saved_seconds = 0.0
+
+    def stats(self):
+        """Returns the result backend counters with the query time saved by the hits."""
+        stats = self.results.stats()
+        with self._lock:
+            stats["saved_seconds"] = round(self.saved_seconds, 3)
+        return stats
+
+
+ANALYTICS_CACHE = ResponseCache(
+    "analytics_responses",
+    maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", 2048)),
+    ttl=int(os.getenv("ANALYTICS_CACHE_TTL", 300)),
+    backend=os.getenv("ANALYTICS_CACHE_BACKEND"),  # Defaults to 'CACHE_BACKEND'
+    generations_backend=os.getenv("ANALYTICS_GENERATIONS_BACKEND"),
+)
+
+def invalidate_analytics(user_id):
+    """Drops the user's cached analytics. Call after committing any change to their entries, products or companies."""
+    ANALYTICS_CACHE.bump(user_id)
+
+def unshared_invalidation_warning():
+    """
+    Warning for the commands invalidating analytics outside the server processes, or None. With process-local
+    generations the servers never see those invalidations and keep serving the responses they cached before
+    the command until they expire: only Redis generations reach them ('CACHE_REDIS_URL').
+    """
+    if ANALYTICS_CACHE.shared:
+        return None
+    return (f"Running servers keep serving their cached analytics for up to {ANALYTICS_CACHE.ttl}s: set "
+            f"'CACHE_REDIS_URL' to share the cache generations with them, or restart them to see the changes now.")
+
+def cached_response(view):
+    """
+    Caches successful JSON responses of an analytics view per user. Must be applied below 'requires_auth',
+    which sets 'g.user'. Responses other than 200 are never cached, nothing is while the cache is disabled.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ANALYTICS_CACHE.enabled:
+            return view(*args, **kwargs)
+        arguments = [*request.args.items(multi=True), *kwargs.items()]
+        key = ANALYTICS_CACHE.key(g.user.id, request.endpoint, arguments)
+
+        cached = ANALYTICS_CACHE.get(key)
+        if cached is not None:
+            return current_app.response_class(cached["body"], status=cached["status"], mimetype="application/json")
+
+        started = time.perf_counter()
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and response.is_json:
+            ANALYTICS_CACHE.set(key, response.get_data(as_text=True), response.status_code,
+                                time.perf_counter() - started)
+        return response
+
+    return wrapper
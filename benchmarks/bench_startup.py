@@ -0,0 +1,107 @@
+"""
+Startup time of the app, target: under 300 ms from a cold worker to its first response.
+
+Measures, as medians over fresh processes:
+  - the import of the frameworks alone (the floor any worker pays),
+  - 'import wsgi' (imports plus 'create_app') and the first request served after it, in one process,
+  - a cold gunicorn worker: with 'max_requests' 1 every request is served by a worker forked just for it
+    from the preloaded master, so its latency is the fork, the post-fork reset and the first request.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 10]
+
+The database URI points at a closed port on purpose: nothing on the startup path may connect to it
+(only '/ready' does, answering 503).
+"""
+import os
+import sys
+import time
+import json
+import socket
+import argparse
+import statistics
+import subprocess
+import http.client
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PORT = 5098
+ENV = dict(os.environ, SQLALCHEMY_DATABASE_URI="postgresql://bench@127.0.0.1:9/none", PORT=str(PORT),
+           GUNICORN_WORKERS="1", GUNICORN_THREADS="1", GUNICORN_MAX_REQUESTS="1", GUNICORN_MAX_REQUESTS_JITTER="0",
+           GUNICORN_ACCESS_LOG="/dev/null")
+
+FRAMEWORKS = """
+import time
+started = time.perf_counter()
+import flask, flask_sqlalchemy, sqlalchemy.orm, flask_cors, requests, jwt, psycopg2
+print(json.dumps({"import": time.perf_counter() - started}))
+"""
+
+APP = """
+import time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+client = wsgi.app.test_client()
+assert client.get("/health").status_code == 200
+served = time.perf_counter()
+assert client.get("/ready").status_code == 503
+print(json.dumps({"import": imported - started, "first_request": served - started}))
+"""
+
+
+def in_fresh_process(code):
+    output = subprocess.run([sys.executable, "-c", "import json\n" + code], cwd=ROOT, env=ENV, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def get(path):
+    connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+    connection.request("GET", path)
+    status = connection.getresponse().status
+    connection.close()
+    return status
+
+
+def cold_worker_requests(repeat):
+    server = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"], cwd=ROOT, env=ENV,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                get("/health")
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.05)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            assert get("/health") == 200
+            timings.append(time.perf_counter() - started)
+        return timings
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def milliseconds(values):
+    return f"{statistics.median(values) * 1000:>8.0f} ms (min {min(values) * 1000:.0f})"
+
+
+def run(repeat):
+    frameworks = [in_fresh_process(FRAMEWORKS) for _ in range(repeat)]
+    app = [in_fresh_process(APP) for _ in range(repeat)]
+
+    print(f"{'Frameworks import (floor)':<42}{milliseconds([run['import'] for run in frameworks])}")
+    print(f"{'import wsgi (create_app included)':<42}{milliseconds([run['import'] for run in app])}")
+    print(f"{'Process start to first response':<42}{milliseconds([run['first_request'] for run in app])}")
+    print(f"{'Cold gunicorn worker to first response':<42}{milliseconds(cold_worker_requests(repeat))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    run(parser.parse_args().repeat)
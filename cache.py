@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import threading
+import weakref
+from collections import OrderedDict
+
+# All named caches created through this module, so their counters can be reported in one place
+CACHE_REGISTRY = {}
+# Every in-process cache, emptied in each forked web worker (see 'reset_local_caches')
+LOCAL_CACHES = weakref.WeakSet()
+
+
+class TTLCache:
+    """Thread-safe, bounded in-process cache. Least recently used keys are evicted first once
+    'maxsize' is reached and every key expires after its own time-to-live (in seconds)."""
+
+    def __init__(self, name, maxsize=1024, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        CACHE_REGISTRY[name] = self
+        LOCAL_CACHES.add(self)
+
+    def get(self, key, default=None):
+        """Return the cached value for 'key' or 'default' if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store 'value' under 'key'. A per-key 'ttl' overrides the cache default."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Returns the hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class RedisCache:
+    """Cache backend shared between replicas, backed by Redis. Values must be JSON-serializable.
+    Exposes the same interface as TTLCache; the counters are kept per process."""
+
+    def __init__(self, name, url, ttl=300):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The 'redis' package is required for the redis cache backend.")
+
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = None
+        self._client = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        CACHE_REGISTRY[name] = self
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def get(self, key, default=None):
+        raw = self._client.get(self._key(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=f"{self.name}:*"):
+            self._client.delete(key)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+                "backend": "redis",
+            }
+
+
+def get_cache_backend(name, maxsize=1024, ttl=300, backend=None):
+    """Creates a named cache with the backend chosen by the 'CACHE_BACKEND' environment variable:
+    'memory' (in-process LRU, the default) or 'redis' (shared store, configured with 'CACHE_REDIS_URL')."""
+    backend = backend or os.getenv("CACHE_BACKEND", "memory")
+    if backend == "memory":
+        return TTLCache(name, maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        return RedisCache(name, url=os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"), ttl=ttl)
+    raise ValueError(f"Unknown cache backend: '{backend}'. Use 'memory' or 'redis'.")
+
+
+def reset_local_caches():
+    """Empties the in-process caches and their counters. Run in each web worker right after the fork (see
+    'gunicorn.conf.py'), so it starts with caches of its own rather than a copy of the master's. The Redis caches,
+    shared on purpose, are left alone."""
+    for cache in list(LOCAL_CACHES):
+        cache.clear()
+
+
+def cache_stats():
+    """Returns the counters of every registered cache, keyed by the cache name."""
+    return {name: cache.stats() for name, cache in CACHE_REGISTRY.items()}
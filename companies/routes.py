@@ -4,6 +4,7 @@ from werkzeug.exceptions import NotFound
 from extensions import db
 from models import Company
 from utils import validate_company_data, requires_auth, get_user_item_or_404
+from analytics_cache import invalidate_analytics
 
 @companies_bp.route("/companies/<int:company_id>")
 @requires_auth
@@ -59,6 +60,7 @@ def edit_company(company_id):
             if key != "name" or value != edited_company.name:
                 setattr(edited_company, key, value)
         db.session.commit()
+        invalidate_analytics(g.user.id)
         current_app.logger.info(f"Correctly updated the Company: {edited_company.name}.")
         return jsonify(edited_company.to_dict()), 200
 
@@ -80,6 +82,7 @@ def delete_company(company_id):
 
         db.session.delete(deleted_company)
         db.session.commit()
+        invalidate_analytics(g.user.id)
         current_app.logger.info(f"Company: {deleted_company.name} successfully deleted from the database.")
         return jsonify(success=f"Successfully deleted the company: {deleted_company.name}."), 200
 
@@ -1,8 +1,18 @@
+import os
+from collections import defaultdict
 from flask import jsonify, current_app
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
 from extensions import db
-from models import Entry, Company, LineItem, Product
-from utils import get_or_create_product_company, calculate_product_company, single_line_item_validation, update_product_stock
+from models import Entry, Company, LineItem
+from utils import get_or_create_product_companies, calculate_product_company, single_line_item_validation, update_product_stock, \
+    resolve_products_by_name, lock_products, parse_iso_date, numeric_line_item
+from validator_funcs import validate_entry_data
+from rollups import record_rollups
+from analytics_cache import invalidate_analytics
+
+# Entries written per transaction by the bulk paths
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
 
 class EntryService:
 
@@ -22,14 +32,15 @@ class EntryService:
                 current_app.logger.warning(f"Company: {data.get('company')} not found.")
                 return jsonify(error=f"Company: {data.get('company')} not found in the database."), 400
 
-            # Validate LineItems
-            validated_line_items = single_line_item_validation(data.get('line_items'))
+            # Validate LineItems, resolving all their Products in one query
+            validated_products = {}
+            validated_line_items = single_line_item_validation(data.get('line_items'), user.id, validated_products)
 
             # Check if validation returned a response (error case)
             if isinstance(validated_line_items, tuple):  # Flask responses return (jsonify(), status_code)
                 return validated_line_items  # Directly return the error response
 
-            return EntryService.save_entry(data, validated_line_items, company_to_assign, user)
+            return EntryService.save_entry(data, validated_line_items, company_to_assign, user, validated_products)
 
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -41,7 +52,7 @@ class EntryService:
             return jsonify(error="Internal server error"), 500
 
     @staticmethod
-    def save_entry(data, validated_line_items, company_to_assign, user):
+    def save_entry(data, validated_line_items, company_to_assign, user, validated_products=None):
         """Handles database operations separately from validation."""
         try:
             # SETTING THE ATTRIBUTES FOR THE NEW ENTRY
@@ -49,6 +60,7 @@ class EntryService:
             for key, value in data.items():
                 if key != "line_items" and key != "company":
                     setattr(new_entry, key, value)
+            new_entry.date = parse_iso_date(data["date"])
 
             # Assigning the Entry to the User and Company
             new_entry.user = user
@@ -58,12 +70,13 @@ class EntryService:
             db.session.flush()
 
             # Process LineItems
-            EntryService.process_line_items(new_entry, validated_line_items, company_to_assign)
+            EntryService.process_line_items(new_entry, validated_line_items, company_to_assign, validated_products)
 
+            entry_id, user_id = new_entry.id, user.id  # Read before commit, avoiding a refresh of the expired rows
             db.session.commit()
-            current_app.logger.info(f"Successfully created a new Entry: {new_entry.id}!")
-            print(f"Successfully created a new Entry: {new_entry.id}!")
-            return jsonify(message="Entry created successfully!", entry_id=new_entry.id), 201
+            invalidate_analytics(user_id)
+            current_app.logger.info(f"Successfully created a new Entry: {entry_id}!")
+            return jsonify(message="Entry created successfully!", entry_id=entry_id), 201
 
         except ValueError as e:
             db.session.rollback()
@@ -82,48 +95,74 @@ class EntryService:
 
 
     @staticmethod
-    def process_line_items(new_entry, validated_line_items, company_to_assign):
-        """Handles processing and saving line items."""
+    def process_line_items(new_entry, validated_line_items, company_to_assign, validated_products=None):
+        """Handles processing and saving line items.
+        Products already resolved during validation are reused; otherwise they are fetched in one query.
+        LineItems are inserted with one statement and all ProductCompany connections are fetched
+        (and the missing ones created) in one go, so the round-trips do not grow with the number of line items.
+        Products and ProductCompany rows are locked before their totals are updated."""
         try:
-            validated_products = {
-                line_item["product"]: Product.query.filter_by(name=line_item["product"]).first()
+            if validated_products is None:
+                validated_products = resolve_products_by_name(
+                    (line_item["product"] for line_item in validated_line_items), new_entry.user_id
+                )
+
+            connections = get_or_create_product_companies(
+                (validated_products[line_item["product"]].id for line_item in validated_line_items),
+                company_to_assign.id
+            )
+
+            # All LineItems in one multi-row INSERT
+            db.session.execute(insert(LineItem), [
+                {
+                    "quantity": line_item["quantity"],
+                    "price_per_unit": line_item["price_per_unit"],
+                    "product_id": validated_products[line_item["product"]].id,
+                    "entry_id": new_entry.id
+                }
                 for line_item in validated_line_items
-            }
+            ])
 
-            for line_item in validated_line_items:
-                product_name = line_item["product"]
-                product_obj = validated_products[product_name]
-
-                new_line_item = LineItem(
-                    quantity=line_item["quantity"],
-                    price_per_unit=line_item["price_per_unit"],
-                    product=product_obj,
-                    entry=new_entry
-                )
-                db.session.add(new_line_item)
+            # Daily rollup and leaderboards, committed together with the Entry
+            record_rollups(
+                {
+                    "user_id": new_entry.user_id,
+                    "date": new_entry.date,
+                    "company_id": company_to_assign.id,
+                    "transaction_type": new_entry.transaction_type,
+                    "product_id": validated_products[line_item["product"]].id,
+                    "quantity": line_item["quantity"],
+                    "price_per_unit": line_item["price_per_unit"]
+                }
+                for line_item in validated_line_items
+            )
 
-                # Prevent duplicate references in Product.line_items
-                if new_line_item not in product_obj.line_items:
-                    product_obj.line_items.append(new_line_item)
-                    print(f"Appended Line Items for product: {product_name}. Their current list: {product_obj.line_items}")
+            # Quantities per Product, applied in Product ID order: ProductCompany rows are locked in that order
+            # above and Products below, so entries sharing Products cannot deadlock each other
+            quantities = defaultdict(float)
+            for line_item in validated_line_items:
+                quantities[validated_products[line_item["product"]].id] += line_item["quantity"]
+            locked_products = lock_products(quantities.keys())
 
+            for product_id, quantity in sorted(quantities.items()):
                 # Handle ProductCompany updates
-                existing_connection = get_or_create_product_company(product_obj.id, company_to_assign.id)
+                existing_connection = connections[product_id]
                 calculate_product_company(
                     product_company=existing_connection,
                     transaction_type=new_entry.transaction_type,
-                    quantity=line_item["quantity"]
+                    quantity=quantity
                 )
                 current_app.logger.info(f"Updated ProductCompany balance for ID: {existing_connection.id}.")
 
                 # Handle Product's Stock
+                product_obj = locked_products[product_id]
                 try:
                     update_product_stock(
                         product=product_obj,
                         transaction_type=new_entry.transaction_type,
-                        quantity=line_item["quantity"]
+                        quantity=quantity
                     )
-                    current_app.logger.info(f"Updated stock for product: {product_name}. Current stock: {product_obj.stock}")
+                    current_app.logger.info(f"Updated stock for product: {product_obj.name}. Current stock: {product_obj.stock}")
                 except ValueError as e:
                     db.session.rollback()
                     current_app.logger.error(f"Value Error in product stock update: {str(e)}")
@@ -132,4 +171,187 @@ class EntryService:
         except Exception as e:
             current_app.logger.error(f"Error processing line items: {str(e)}")
             db.session.rollback()
-            raise  # Re-raise to propagate to the outer try/except
\ No newline at end of file
+            raise  # Re-raise to propagate to the outer try/except
+
+
+    @staticmethod
+    def bulk_create_entries(entries_data, user, chunk_size=BULK_CHUNK_SIZE, dry_run=False):
+        """
+        Validates and saves many entries at once, with the same rules as a single 'POST /entries'.
+
+        Document numbers, Companies and Products of the whole batch are resolved with set-based queries,
+        and the entries are written in chunks of 'chunk_size', one transaction per chunk.
+        Entries that would take a Product's stock below zero are rejected before writing.
+        With 'dry_run' the entries are validated and resolved, but nothing is written.
+
+        Returns one result per entry, in input order:
+        {"index", "document_nr", "status": "created" | "valid" | "error", "entry_id" | "error"}.
+        """
+        results = [None] * len(entries_data)
+
+        def fail(index, data, error):
+            results[index] = {
+                "index": index,
+                "document_nr": data.get("document_nr") if isinstance(data, dict) else None,
+                "status": "error",
+                "error": error
+            }
+
+        # Field, format and value checks (no database access)
+        valid = []
+        for index, data in enumerate(entries_data):
+            error = validate_entry_data(data)
+            if error:
+                fail(index, data, error)
+            else:
+                valid.append((index, dict(data, line_items=[numeric_line_item(line_item)
+                                                            for line_item in data["line_items"]])))
+
+        # Set-based lookups for the whole batch
+        document_nrs = {data["document_nr"] for _, data in valid}
+        existing_documents = {
+            document_nr for (document_nr,) in
+            db.session.query(Entry.document_nr).filter(Entry.document_nr.in_(document_nrs))
+        } if document_nrs else set()
+        company_names = {data["company"] for _, data in valid}
+        companies = {
+            company.name: company for company in
+            Company.query.filter(Company.user_id == user.id, Company.name.in_(company_names))
+        } if company_names else {}
+        products = resolve_products_by_name(
+            (line_item["product"] for _, data in valid for line_item in data["line_items"]), user.id
+        )
+
+        # Per-entry checks against the resolved data, including the running stock of every Product
+        stock = {product.id: product.stock for product in products.values()}
+        ready = []
+        seen_documents = set()
+        for index, data in valid:
+            document_nr = data["document_nr"]
+            if document_nr in existing_documents or document_nr in seen_documents:
+                fail(index, data, f"The entry tied to a transaction: {document_nr} already exists.")
+                continue
+            if data["company"] not in companies:
+                fail(index, data, f"Company: {data['company']} not found in the database.")
+                continue
+            missing = [line_item["product"] for line_item in data["line_items"] if line_item["product"] not in products]
+            if missing:
+                fail(index, data, f"No such product: {missing[0]} found in the database while trying to create new Entry.")
+                continue
+
+            stock_changes = defaultdict(float)
+            for line_item in data["line_items"]:
+                sign = 1 if data["transaction_type"] == "Supply" else -1
+                stock_changes[products[line_item["product"]].id] += sign * line_item["quantity"]
+            short = [product_id for product_id, change in stock_changes.items() if stock[product_id] + change < 0]
+            if short:
+                product = next(p for p in products.values() if p.id == short[0])
+                fail(index, data, f"Insufficient stock for product '{product.name}'. Current stock: {stock[product.id]}, "
+                                  f"required: {-stock_changes[product.id]}")
+                continue
+
+            for product_id, change in stock_changes.items():
+                stock[product_id] += change
+            seen_documents.add(document_nr)
+            ready.append((index, data))
+
+        if dry_run:
+            for index, data in ready:
+                results[index] = {"index": index, "document_nr": data["document_nr"], "status": "valid"}
+            return results
+
+        user_id = user.id  # The commits below expire 'user'
+        for start in range(0, len(ready), chunk_size):
+            chunk = ready[start:start + chunk_size]
+            try:
+                entry_ids = EntryService.save_entries_chunk(chunk, companies, products, user)
+                db.session.commit()
+                invalidate_analytics(user_id)
+                for index, data in chunk:
+                    results[index] = {"index": index, "document_nr": data["document_nr"], "status": "created",
+                                      "entry_id": entry_ids[data["document_nr"]]}
+                current_app.logger.info(f"Bulk entry creation: committed a chunk of {len(chunk)} entries.")
+
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Bulk entry creation: chunk of {len(chunk)} entries failed: {str(e)}")
+                for index, data in chunk:
+                    fail(index, data, "Failed to save entry: a database error occurred while saving its chunk.")
+
+        return results
+
+    @staticmethod
+    def save_entries_chunk(chunk, companies, products, user):
+        """Writes a chunk of already validated entries with set-based statements (without committing).
+        Returns the IDs of the new entries keyed by document number."""
+
+        db.session.execute(insert(Entry), [
+            {
+                "date": parse_iso_date(data["date"]),
+                "document_nr": data["document_nr"],
+                "transaction_type": data["transaction_type"],
+                "company_id": companies[data["company"]].id,
+                "user_id": user.id
+            }
+            for _, data in chunk
+        ])
+        entry_ids = dict(
+            db.session.query(Entry.document_nr, Entry.id)
+            .filter(Entry.document_nr.in_([data["document_nr"] for _, data in chunk]))
+            .all()
+        )
+
+        db.session.execute(insert(LineItem), [
+            {
+                "quantity": line_item["quantity"],
+                "price_per_unit": line_item["price_per_unit"],
+                "product_id": products[line_item["product"]].id,
+                "entry_id": entry_ids[data["document_nr"]]
+            }
+            for _, data in chunk
+            for line_item in data["line_items"]
+        ])
+        record_rollups(
+            {
+                "user_id": user.id,
+                "date": parse_iso_date(data["date"]),
+                "company_id": companies[data["company"]].id,
+                "transaction_type": data["transaction_type"],
+                "product_id": products[line_item["product"]].id,
+                "quantity": line_item["quantity"],
+                "price_per_unit": line_item["price_per_unit"]
+            }
+            for _, data in chunk
+            for line_item in data["line_items"]
+        )
+
+        # ProductCompany connections, fetched (or created) and locked once per Company of the chunk.
+        # Rows are locked in (Company ID, Product ID) order and Products in ID order, like in 'process_line_items',
+        # so concurrent writers cannot deadlock each other.
+        product_ids_by_company = defaultdict(set)
+        for _, data in chunk:
+            for line_item in data["line_items"]:
+                product_ids_by_company[data["company"]].add(products[line_item["product"]].id)
+        connections = {
+            (company_name, product_id): connection
+            for company_name, product_ids in sorted(product_ids_by_company.items(), key=lambda item: companies[item[0]].id)
+            for product_id, connection in get_or_create_product_companies(product_ids, companies[company_name].id).items()
+        }
+        # Re-reads the stock of the Products: the stock check below runs against the locked values
+        lock_products(products[line_item["product"]].id for _, data in chunk for line_item in data["line_items"])
+
+        for _, data in chunk:
+            for line_item in data["line_items"]:
+                product = products[line_item["product"]]
+                calculate_product_company(
+                    product_company=connections[(data["company"], product.id)],
+                    transaction_type=data["transaction_type"],
+                    quantity=line_item["quantity"]
+                )
+                update_product_stock(
+                    product=product,
+                    transaction_type=data["transaction_type"],
+                    quantity=line_item["quantity"]
+                )
+
+        return entry_ids
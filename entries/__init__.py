@@ -2,4 +2,4 @@ from flask import Blueprint
 
 entries_bp = Blueprint("entries", __name__)
 
-from . import routes
\ No newline at end of file
+from . import routes, importer
\ No newline at end of file
@@ -0,0 +1,172 @@
+import csv
+import json
+import time
+import click
+from itertools import groupby, islice
+from flask import current_app
+from entries import entries_bp
+from extensions import db
+from models import User
+from analytics_cache import unshared_invalidation_warning
+from .EntryService import EntryService, BULK_CHUNK_SIZE
+
+# CSV columns: one row per LineItem, rows of the same entry next to each other
+CSV_COLUMNS = ["date", "document_nr", "transaction_type", "company", "product", "quantity", "price_per_unit"]
+# At most this many per-entry errors are kept in the final report (the rest are only counted and logged)
+MAX_REPORTED_ERRORS = 100
+
+def to_number(value):
+    """Converts a numeric CSV value to int or float. Other values are returned unchanged, so validation reports them."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+def read_csv_entries(lines):
+    """Yields entries from CSV rows. Consecutive rows with the same document number form one entry."""
+    reader = csv.DictReader(lines)
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing CSV column(s): {', '.join(missing)}.")
+
+    for document_nr, rows in groupby(reader, key=lambda row: row["document_nr"]):
+        first, *rest = rows
+        yield {
+            "date": first["date"],
+            "document_nr": document_nr,
+            "transaction_type": first["transaction_type"],
+            "company": first["company"],
+            "line_items": [
+                {"product": row["product"], "quantity": to_number(row["quantity"]), "price_per_unit": to_number(row["price_per_unit"])}
+                for row in [first, *rest]
+            ]
+        }
+
+def read_ndjson_entries(lines):
+    """Yields entries from NDJSON lines. Malformed lines are yielded as None and reported as per-entry errors."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def read_entries(lines, file_format):
+    if file_format == "csv":
+        return read_csv_entries(lines)
+    if file_format == "ndjson":
+        return read_ndjson_entries(lines)
+    raise ValueError(f"Unknown import format: '{file_format}'. Use 'csv' or 'ndjson'.")
+
+def skip_until(entries, document_nr):
+    """Skips entries up to, and including, the one with the given document number (the last checkpoint).
+    Raises ValueError if the input does not contain it: the checkpoint belongs to another file."""
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get("document_nr") == document_nr:
+            return entries
+    raise ValueError(f"Checkpoint document: {document_nr} not found in the input, nothing was imported.")
+
+def chunked(iterable, size):
+    """Yields lists of at most 'size' items, reading only one chunk ahead."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def read_checkpoint(path):
+    try:
+        with open(path) as file:
+            return json.load(file).get("last_document_nr")
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(path, document_nr, processed):
+    with open(path, "w") as file:
+        json.dump({"last_document_nr": document_nr, "processed": processed}, file)
+
+def import_entries(entries, user, chunk_size=BULK_CHUNK_SIZE, dry_run=False, checkpoint_path=None, resume_after=None):
+    """
+    Imports an iterable of entries chunk by chunk through 'EntryService.bulk_create_entries', so memory use
+    depends on 'chunk_size' and not on the size of the source.
+
+    After every chunk the last document number is written to 'checkpoint_path' (if given); a later run
+    with 'resume_after' set to that number skips everything up to it. The checkpoint stops advancing at the
+    first chunk with a failed entry, so resuming after fixing the input retries it (entries already created
+    after it are then rejected as existing). Dry runs validate without writing.
+    Returns a report with the counts, the first errors, the last checkpoint and the throughput.
+    """
+    entries = iter(entries)
+    if resume_after:
+        entries = skip_until(entries, resume_after)
+        current_app.logger.info(f"Resuming the import after document: {resume_after}.")
+
+    report = {"processed": 0, "created": 0, "valid": 0, "failed": 0, "errors": [], "checkpoint": resume_after}
+    checkpoint_held = False
+    started = time.perf_counter()
+
+    for chunk in chunked(entries, chunk_size):
+        results = EntryService.bulk_create_entries(chunk, user, chunk_size=chunk_size, dry_run=dry_run)
+
+        for result in results:
+            report[result["status"] if result["status"] != "error" else "failed"] += 1
+            if result["status"] == "error":
+                current_app.logger.warning(f"Import: entry {report['processed'] + result['index']} "
+                                           f"({result['document_nr']}) rejected: {result['error']}")
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({**result, "index": report["processed"] + result["index"]})
+        report["processed"] += len(chunk)
+
+        checkpoint_held = checkpoint_held or any(result["status"] == "error" for result in results)
+        last_document_nr = next((entry.get("document_nr") for entry in reversed(chunk) if isinstance(entry, dict)), None)
+        if checkpoint_path and not dry_run and not checkpoint_held and last_document_nr:
+            write_checkpoint(checkpoint_path, last_document_nr, report["processed"])
+            report["checkpoint"] = last_document_nr
+
+        # Committed objects are not needed anymore, keep the identity map from growing with the import
+        db.session.expunge_all()
+        db.session.add(user)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["entries_per_second"] = round(report["processed"] / report["seconds"], 1) if report["seconds"] else 0
+    return report
+
+@entries_bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user-email", required=True, help="Owner of the imported entries.")
+@click.option("--format", "file_format", type=click.Choice(["csv", "ndjson"]), help="Defaults to the file extension.")
+@click.option("--chunk-size", default=BULK_CHUNK_SIZE, show_default=True, help="Entries per transaction.")
+@click.option("--dry-run", is_flag=True, help="Validate the file without writing to the database.")
+@click.option("--checkpoint", "checkpoint_path", help="File storing the last imported document number.")
+@click.option("--resume", is_flag=True, help="Continue after the document number stored in --checkpoint.")
+def import_command(path, user_email, file_format, chunk_size, dry_run, checkpoint_path, resume):
+    """Imports historical entries from a CSV or NDJSON file."""
+    user = User.query.filter_by(email=user_email).first()
+    if not user:
+        raise click.ClickException(f"User: {user_email} not found in the database.")
+    if resume and not checkpoint_path:
+        raise click.ClickException("--resume requires --checkpoint.")
+
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    resume_after = read_checkpoint(checkpoint_path) if resume else None
+
+    with open(path, newline="", encoding="utf-8") as file:
+        try:
+            report = import_entries(read_entries(file, file_format), user, chunk_size=chunk_size, dry_run=dry_run,
+                                    checkpoint_path=checkpoint_path, resume_after=resume_after)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    for error in report["errors"]:
+        click.echo(f"#{error['index']} {error['document_nr']}: {error['error']}", err=True)
+    click.echo(
+        f"{'Validated' if dry_run else 'Imported'} {report['processed']} entries in {report['seconds']}s "
+        f"({report['entries_per_second']} entries/s): {report['created']} created, {report['valid']} valid, "
+        f"{report['failed']} failed."
+    )
+    if checkpoint_path and report["failed"] and not dry_run:
+        click.echo(f"Checkpoint kept before the first failed chunk, at document: {report['checkpoint']}. "
+                   f"Fix the failed entries and run again with --resume.", err=True)
+    warning = unshared_invalidation_warning()
+    if warning and report["created"]:
+        click.echo(warning, err=True)
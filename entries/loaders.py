@@ -0,0 +1,20 @@
+from sqlalchemy.orm import joinedload, selectinload
+from models import Entry, LineItem
+
+def entry_serialisation_options(company: bool = True):
+    """
+    Loader options for every query whose entries end up in Entry.to_dict / LineItem.to_dict.
+
+    Line items are loaded with 'selectinload' (one extra statement for the whole result, no row multiplication)
+    and their products joined into that statement, like the company into the entries one ('joinedload',
+    many-to-one, same row).
+    Serialising N entries with M line items then costs a constant number of statements instead of 1 + N + N*M.
+    """
+    options = [selectinload(Entry.line_items).joinedload(LineItem.product)]
+    if company:
+        options.append(joinedload(Entry.company))
+    return options
+
+def with_entry_serialisation(query, company: bool = True):
+    """Applies the serialisation loader options to an Entry query."""
+    return query.options(*entry_serialisation_options(company=company))
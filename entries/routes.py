@@ -1,20 +1,101 @@
+import os
+import json
+import base64
+from datetime import datetime, date
 from entries import entries_bp
-from flask import jsonify, current_app, g
+from flask import jsonify, current_app, g, request
+from sqlalchemy import tuple_
 from werkzeug.exceptions import NotFound
 from extensions import db
 from models import User, Entry
+from .loaders import with_entry_serialisation, entry_serialisation_options
 from validator_funcs import validate_json_payload, validate_document_nr, validate_transaction_type, validate_date_format, validate_line_items
 from .EntryService import EntryService
 from utils import requires_auth, get_user_item_or_404
 
+ENTRIES_PAGE_SIZE = 50
+ENTRIES_MAX_PAGE_SIZE = 500
+BULK_MAX_ENTRIES = int(os.getenv("BULK_MAX_ENTRIES", 5000))
+
+def encode_cursor(entry):
+    """Opaque cursor pointing right after the given entry in the (date, id) ordering."""
+    return base64.urlsafe_b64encode(json.dumps([entry.date.isoformat(), entry.id]).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    """Returns the (date, id) pair stored in a cursor. Raises ValueError for malformed cursors."""
+    try:
+        entry_date, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return date.fromisoformat(entry_date), int(entry_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: '{cursor}'.")
+
+def parse_entries_filters(args):
+    """Validates the query parameters of the entries listing. Raises ValueError on invalid input."""
+    try:
+        limit = int(args.get("limit", ENTRIES_PAGE_SIZE))
+    except ValueError:
+        raise ValueError(f"Invalid input for limit: '{args.get('limit')}'. An integer expected.")
+    if not 1 <= limit <= ENTRIES_MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid input for limit: '{limit}'. A value between 1 and {ENTRIES_MAX_PAGE_SIZE} expected.")
+
+    filters = {"limit": limit, "after": decode_cursor(args["after"]) if args.get("after") else None}
+
+    for key in ("start", "end"):
+        value = args.get(key)
+        if value:
+            try:
+                value = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                raise ValueError(f"Invalid date format: '{value}'. Use YYYY-MM-DD.")
+        filters[key] = value or None
+
+    company_id = args.get("company_id")
+    try:
+        filters["company_id"] = int(company_id) if company_id else None
+    except ValueError:
+        raise ValueError(f"Invalid Company: '{company_id}' ID. An integer expected.")
+
+    transaction_type = args.get("transaction_type")
+    if transaction_type and transaction_type not in Entry.TRANSACTION_TYPES:
+        raise ValueError(f"Invalid transaction type: '{transaction_type}'. Should be {' or '.join(Entry.TRANSACTION_TYPES)}.")
+    filters["transaction_type"] = transaction_type
+
+    return filters
+
+def entries_page(user, limit, after=None, start=None, end=None, company_id=None, transaction_type=None):
+    """
+    Returns one page of the user's entries, newest first, and the cursor of the next page (or None).
+    Keyset pagination on (date, id): every page costs the same number of queries no matter how deep it is.
+    """
+    query = with_entry_serialisation(
+        db.session.query(Entry)
+        .filter(Entry.user_id == user.id)
+    )
+
+    if start:
+        query = query.filter(Entry.date >= start)
+    if end:
+        query = query.filter(Entry.date <= end)
+    if company_id:
+        query = query.filter(Entry.company_id == company_id)
+    if transaction_type:
+        query = query.filter(Entry.transaction_type == transaction_type)
+    if after:
+        query = query.filter(tuple_(Entry.date, Entry.id) < after)
+
+    # One extra row tells whether there is a next page
+    entries = query.order_by(Entry.date.desc(), Entry.id.desc()).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
 @entries_bp.route("/entries/<int:entry_id>")
 @requires_auth
 def get_entry(entry_id):
 
     try:
-        entry = get_user_item_or_404(Entry, entry_id)
+        entry = get_user_item_or_404(Entry, entry_id, options=entry_serialisation_options())
 
-        print(f"Line items belonging to the enrty of ID {entry.id}: {entry.line_items}") # Debug line
         current_app.logger.info(f"Entry retrieved: {entry.id} by func: {get_entry.__name__}")
         return jsonify(entry=entry.to_dict()), 200
 
@@ -31,15 +112,23 @@ def get_entry(entry_id):
 @requires_auth
 def get_entries():
 
+    try:
+        filters = parse_entries_filters(request.args)
+    except ValueError as e:
+        current_app.logger.error(f"Invalid query parameters in {get_entries.__name__}: {str(e)}")
+        return jsonify(error=str(e)), 400
+
     try:
         #Handling the User object from the JWT Token:
         user = g.user
-        entries = user.entries
+        entries, next_cursor = entries_page(user, **filters)
 
-        current_app.logger.info(
-        f"Entries retrieved: {', '.join([str(entry.id) for entry in entries])} by func: {get_entries.__name__}") # May consider if it's not hindering the performance of the code
-        print(f"Line items of each : {', '.join([str(entry.line_items) for entry in entries])}")
-        return jsonify([entry.to_dict() for entry in entries]), 200
+        current_app.logger.info(f"Entries page of {len(entries)} retrieved by func: {get_entries.__name__}")
+        return jsonify(
+            entries=[entry.to_dict() for entry in entries],
+            next_cursor=next_cursor,
+            limit=filters["limit"]
+        ), 200
 
     except Exception as e:
         current_app.logger.error(f"Unexpected error in {get_entries.__name__}: {str(e)}")
@@ -73,6 +162,58 @@ def add_entry(*args, **kwargs):
     user = g.user
     return EntryService.pre_entry_validation(data, user)
 
+def parse_bulk_payload(req):
+    """
+    Reads the entries of a bulk request: a JSON array (or {"entries": [...]}), or NDJSON - one entry per line.
+    Malformed NDJSON lines are kept as None, so they are reported as per-entry errors.
+    Raises ValueError if the payload as a whole cannot be read.
+    """
+    if req.mimetype in ("application/x-ndjson", "application/jsonlines"):
+        entries = []
+        for line in req.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                entries.append(None)
+        return entries
+
+    payload = req.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get("entries")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of entries, {\"entries\": [...]} or NDJSON.")
+    return payload
+
+@entries_bp.route("/entries/bulk", methods=["POST"])
+@requires_auth
+def add_entries_bulk():
+    """Creates many entries in one request. Every entry is validated like in 'POST /entries'
+    and gets its own result; valid entries are saved even if others in the batch fail."""
+    try:
+        entries_data = parse_bulk_payload(request)
+    except ValueError as e:
+        current_app.logger.error(f"Invalid bulk payload in {add_entries_bulk.__name__}: {str(e)}")
+        return jsonify(error=str(e)), 400
+
+    if not entries_data:
+        return jsonify(error="No entries found in the request body."), 400
+    if len(entries_data) > BULK_MAX_ENTRIES:
+        return jsonify(error=f"Too many entries: {len(entries_data)}. At most {BULK_MAX_ENTRIES} per request."), 400
+
+    try:
+        results = EntryService.bulk_create_entries(entries_data, g.user)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Unexpected error in {add_entries_bulk.__name__}: {str(e)}")
+        return jsonify(error="Internal server error"), 500
+
+    created = sum(1 for result in results if result["status"] == "created")
+    failed = len(results) - created
+    current_app.logger.info(f"Bulk entry creation: {created} created, {failed} failed.")
+    return jsonify(created=created, failed=failed, results=results), 201 if not failed else 207
+
 
 
 
@@ -58,17 +58,24 @@ function EntryItem({ entry }) {
 
 function EntryList() {
   const [entries, setEntries] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const navigate = useNavigate();
 
+  // Entries are served in pages; 'after' is the cursor returned with the previous page
+  async function fetchEntries(after = null) {
+    const endpoint = after ? `/entries?after=${encodeURIComponent(after)}` : '/entries';
+    const data = await apiFetch(endpoint);
+    setEntries((previous) => (after ? [...previous, ...data.entries] : data.entries));
+    setNextCursor(data.next_cursor);
+  }
+
   useEffect(() => {
-    async function fetchEntries() {
+    async function fetchFirstPage() {
       try {
-        console.log("Fetching...")
-        const data = await apiFetch('/entries');
-        console.log(`Backend entried data: ${data}`)
-        setEntries(data);
+        await fetchEntries();
       } catch (err) {
         setError(true);
         console.error('Failed to fetch entries:', err.message);
@@ -77,9 +84,20 @@ function EntryList() {
       }
     }
 
-    fetchEntries();
+    fetchFirstPage();
   }, []);
 
+  async function loadMore() {
+    setLoadingMore(true);
+    try {
+      await fetchEntries(nextCursor);
+    } catch (err) {
+      console.error('Failed to fetch more entries:', err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   if (loading) {
     return (
       <div className="d-flex justify-content-center align-items-center flex-column" style={{ height: '100vh' }}>
@@ -121,6 +139,13 @@ function EntryList() {
             <EntryItem key={entry.document_nr} entry={entry} />
           ))}
         </ListGroup>
+        {nextCursor && (
+          <div className="d-flex justify-content-center mt-2">
+            <Button variant="outline-primary" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? <Spinner animation="border" size="sm" /> : 'Load more'}
+            </Button>
+          </div>
+        )}
         <div className="d-flex justify-content-center mt-4">
             <Button variant="primary" size="lg" onClick={() => navigate('/entries/new')}>
             Add New Entry
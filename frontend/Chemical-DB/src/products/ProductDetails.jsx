@@ -23,6 +23,8 @@ function ProductDetails() {
 
     const [summaryError, setSummaryError] = useState(null);
 
+    const [summaryStatus, setSummaryStatus] = useState(null);
+
     const [deleteStatus, setDeleteStatus] = useState({
         loading: false,
         success: false,
@@ -54,6 +56,7 @@ function ProductDetails() {
         const data = await apiFetch(`/products/${id}/regenerate-summary`, 'PATCH')
 
         setSummary(data.summary);
+        setSummaryStatus(data.status);
         
         } catch (err) {
         setSummaryError(err.message || "Something went wrong.");
@@ -72,6 +75,7 @@ function ProductDetails() {
         const data = await apiFetch(`/products/${id}`); // method: 'GET' and body: null by default
         setProduct(data.product); // Due to json response object structure
         setSummary(data.product.summary);
+        setSummaryStatus(data.summary_status);
         console.log(data.product, data.product.id)
         console.log(product)
     } catch (err) {
@@ -84,7 +88,26 @@ function ProductDetails() {
     fetchProduct();
 }, [id]);
 
-    // 2. Redirect after successful deletion
+    // 2. Polling the summary while it is generated in the background
+    useEffect(() => {
+
+    if (summaryStatus !== 'pending') return;
+
+    const interval = setInterval(async () => {
+      try {
+        const data = await apiFetch(`/products/${id}/summary`);
+        setSummary(data.summary);
+        setSummaryStatus(data.status);
+      } catch (err) {
+        setSummaryError(err.message || "Something went wrong.");
+        setSummaryStatus(null);
+      }
+    }, 2000);
+
+    return () => clearInterval(interval);
+  }, [id, summaryStatus]);
+
+    // 3. Redirect after successful deletion
     useEffect(() => {
 
     if (deleteStatus.success) {
@@ -127,9 +150,9 @@ function ProductDetails() {
 
           <h5 className="text-primary">Product Assistant Summary</h5>
           {summaryError && <div className="alert alert-danger">{summaryError}</div>}
-          <p className="mb-3">{summary}</p>
-          <button onClick={regenerateSummary} className="btn btn-outline-danger" disabled={isRegenerating}>
-            {isRegenerating ? "Regenerating..." : "Regenerate Summary"}
+          <p className="mb-3">{summaryStatus === 'pending' && !summary ? 'Generating the product summary...' : summary}</p>
+          <button onClick={regenerateSummary} className="btn btn-outline-danger" disabled={isRegenerating || summaryStatus === 'pending'}>
+            {isRegenerating || summaryStatus === 'pending' ? "Regenerating..." : "Regenerate Summary"}
           </button>
 
           <ul className="list-group list-group-flush mb-3">
@@ -0,0 +1,72 @@
+"""
+Gunicorn settings for serving 'wsgi:app' in production, all overridable through the environment.
+
+The app is loaded once in the master and the workers are forked from it ('GUNICORN_PRELOAD'), so each worker
+drops the database connections it inherited and empties its in-process caches right after the fork.
+With several workers the analytics response cache needs its generations in Redis ('CACHE_REDIS_URL'): a write
+handled by one worker could not invalidate the responses cached by the others, so it is disabled otherwise.
+The same holds for the commands writing entries or rollups from another process ('flask entries import',
+'flask analytics rebuild-*'): without Redis generations a single worker keeps its cache and serves the
+responses cached before the command for up to 'ANALYTICS_CACHE_TTL' seconds, which the commands warn about.
+Workers are recycled after 'GUNICORN_MAX_REQUESTS' requests (+ jitter) and given 'GUNICORN_GRACEFUL_TIMEOUT'
+seconds to finish their requests on SIGTERM.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5002)}"
+
+# Processes, and threads per process ('gthread' workers when above 1)
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def local_analytics_cache(server):
+    """Whether the analytics cache would serve stale responses: process-local generations, several workers."""
+    from analytics_cache import ANALYTICS_CACHE
+
+    return server.num_workers > 1 and not ANALYTICS_CACHE.shared
+
+
+def when_ready(server):
+    if local_analytics_cache(server):
+        server.log.warning(f"Analytics response cache disabled: its generations are local to each of the "
+                           f"{server.num_workers} workers. Set 'CACHE_REDIS_URL' to share them and enable it.")
+
+
+def post_fork(server, worker):
+    """Sockets and cached entries are not shared across processes: the pooled connections opened by the
+    master (while importing the app) are dropped without closing them, so the master keeps its own."""
+    from wsgi import app
+    from extensions import db
+    from cache import reset_local_caches
+    from analytics_cache import ANALYTICS_CACHE
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    reset_local_caches()
+    ANALYTICS_CACHE.enabled = not local_analytics_cache(server)
+    server.log.info(f"Worker {worker.pid}: database pool and local caches reset")
+
+
+def worker_exit(server, worker):
+    """Lets the running summary jobs finish (bounded by the graceful timeout); queued ones are dropped and
+    queued again by the next product view."""
+    from summaries import SUMMARY_QUEUE
+
+    SUMMARY_QUEUE.executor.shutdown(wait=True, cancel_futures=True)
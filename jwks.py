@@ -0,0 +1,150 @@
+import re
+import json
+import time
+import logging
+import threading
+
+import requests
+from jwt.algorithms import RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+class JWKSKeyManager:
+    """Keeps the signing keys of a JWKS endpoint as ready-to-use RSA public keys, keyed by 'kid'.
+
+    - Concurrent lookups that need a fetch share a single request (single-flight).
+    - Keys are kept for the Cache-Control max-age of the JWKS response (or 'default_max_age'),
+      and refreshed in the background once 'refresh_ratio' of that time has passed.
+    - Fetches triggered by unknown 'kid's are rate-limited to one per 'miss_interval' seconds, also while no
+      key set is loaded, so tokens with forged key ids cannot turn into a JWKS fetch storm. After failed
+      fetches the next one is allowed sooner: 'failure_backoff' seconds, doubling up to 'miss_interval'.
+    """
+
+    def __init__(self, jwks_url, timeout=5, default_max_age=3600, refresh_ratio=0.8, miss_interval=60,
+                 failure_backoff=1):
+        # 'jwks_url' may be a callable, resolving the URL on every fetch (ex. from the environment)
+        self.jwks_url = jwks_url
+        self.timeout = timeout
+        self.default_max_age = default_max_age
+        self.refresh_ratio = refresh_ratio
+        self.miss_interval = miss_interval
+        self.failure_backoff = failure_backoff
+
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._max_age = default_max_age
+        self._next_miss_fetch = 0.0
+        self._failed_at = 0.0
+        self._consecutive_failures = 0
+        self._fetch_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self.fetch_count = 0
+        self.failed_fetch_count = 0
+
+    def _url(self):
+        return self.jwks_url() if callable(self.jwks_url) else self.jwks_url
+
+    def _max_age_from(self, response):
+        match = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+        return int(match.group(1)) if match else self.default_max_age
+
+    def _fetch(self):
+        """Downloads the key set and pre-parses every RS256 key. Raises on network or format errors."""
+        response = requests.get(self._url(), timeout=self.timeout)
+        response.raise_for_status()
+        self.fetch_count += 1
+
+        keys = {}
+        for key in response.json().get("keys", []):
+            if key.get("kty") != "RSA" or "kid" not in key:
+                continue
+            keys[key["kid"]] = RSAAlgorithm.from_jwk(json.dumps(key))
+
+        self._keys = keys
+        self._max_age = self._max_age_from(response)
+        self._fetched_at = time.monotonic()
+        logger.info(f"Fetched {len(keys)} JWKS key(s), cached for {self._max_age}s.")
+
+    def _fetch_once(self, requested_at):
+        """Fetches the key set unless another thread already tried to after 'requested_at': threads waiting
+        on a failed fetch do not repeat it."""
+        with self._fetch_lock:
+            if self._fetched_at > requested_at or self._failed_at > requested_at:
+                return
+            try:
+                self._fetch()
+            except Exception:
+                self._failed_at = time.monotonic()
+                self._consecutive_failures += 1
+                self.failed_fetch_count += 1
+                raise
+            self._consecutive_failures = 0
+
+    def _is_expired(self, now):
+        return now - self._fetched_at >= self._max_age
+
+    def _needs_refresh(self, now):
+        return now - self._fetched_at >= self._max_age * self.refresh_ratio
+
+    def _refresh_in_background(self):
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self._fetch_once(time.monotonic())
+            except Exception as e:
+                logger.error(f"Background JWKS refresh failed: {str(e)}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_key(self, kid):
+        """Returns the verification key for 'kid', or None if the key set does not contain it."""
+        now = time.monotonic()
+        key = self._keys.get(kid)
+
+        if key is not None and not self._is_expired(now):
+            if self._needs_refresh(now):
+                self._refresh_in_background()
+            return key
+
+        if key is not None:
+            # Expired key set: refresh synchronously, but keep serving the known key if the endpoint is down
+            try:
+                self._fetch_once(now)
+            except Exception as e:
+                logger.error(f"JWKS refresh failed, using the expired key set: {str(e)}")
+                return key
+            # The refreshed key set is authoritative: a key it no longer contains was revoked
+            return self._keys.get(kid)
+
+        # Unknown 'kid': possibly a key rotation, possibly a forged token
+        if now < self._next_miss_fetch:
+            logger.warning(f"Unknown 'kid' {kid}: JWKS fetch skipped (rate-limited).")
+            return None
+
+        self._next_miss_fetch = now + self.miss_interval
+        try:
+            self._fetch_once(now)
+        except Exception:
+            self._next_miss_fetch = now + min(self.miss_interval,
+                                              self.failure_backoff * 2 ** (self._consecutive_failures - 1))
+            raise
+        return self._keys.get(kid)
+
+    def clear(self):
+        with self._fetch_lock:
+            self._keys = {}
+            self._fetched_at = 0.0
+            self._next_miss_fetch = 0.0
+            self._failed_at = 0.0
+            self._consecutive_failures = 0
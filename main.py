@@ -1,94 +1,96 @@
 import logging
-from flask import Flask, request, url_for, jsonify, session, g
-from flask_migrate import Migrate
+from flask import Flask, Blueprint, request, url_for, jsonify, session, g, current_app
 from extensions import db
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from dotenv import load_dotenv
 import os
 import json
-from authlib.integrations.flask_client import OAuth
 from companies import companies_bp
 from products import products_bp
 from entries import entries_bp
 from analytics import analytics_bp
 from utils import requires_auth
+from cache import cache_stats
 from flask_cors import CORS
 
-# Loading the environment variables
-load_dotenv()
-
-# Initialising the app
-app = Flask(__name__)
-# Set up CORS to enable frontend calls to API
-CORS(app, origins=["http://localhost:3000", "http://localhost:30080"])  # Or "*"
-# Load database URI from environment variables
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', "postgresql://userisme:password123@db:5432/chemical-db")
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize Flask-Migrate
-migrate = Migrate(app, db)
-
-# Initialize the db with the app
-db.init_app(app)
-
-with app.app_context():
-    print(f"Connected to database: {db.engine.url}")
-    # inspector = inspect(db.engine)
-    # if not inspector.has_table("users"):
-    #     print("No database found, proceeding to instantiate the Model.")
-    #     db.create_all()
-    # else:
-    #     print("The database exists, no need to initialize the Model.")
-
-app.config['TEMPLATES_AUTO_RELOAD'] = False
-# Registering the blueprints
-app.register_blueprint(companies_bp)
-app.register_blueprint(products_bp)
-app.register_blueprint(entries_bp)
-app.register_blueprint(analytics_bp)
-
-# Logging setup
-if not app.debug:
-    handler = logging.FileHandler("app.log")
-    handler.setLevel(logging.INFO)
-    app.logger.addHandler(handler)
-
-app.secret_key = os.getenv('APP_SECRET_KEY')
-
-# Auth0 setup
-oauth = OAuth(app)
-
-oauth.register(
-    "auth0",
-    client_id=os.getenv("AUTH0_CLIENT_ID"),
-    client_secret=os.getenv("AUTH0_CLIENT_SECRET"),
-    client_kwargs={
-        "scope": "openid profile email",
-        "audience": os.getenv("AUTH0_AUDIENCE"),
-        "prompt": "login"
-    },
-    server_metadata_url=f'https://{os.getenv("AUTH0_DOMAIN")}/.well-known/openid-configuration'
-)
-
-with app.app_context():
-    if not inspect(db.engine).has_table("users"):
-        app.logger.error("The 'user' table does not exist.")
-    else:
-        app.logger.info("User table exists and is ready for queries.")
-
-with app.app_context():
-    app.logger.info(f"Registered routes: {[rule.rule for rule in app.url_map.iter_rules()]}")
+# App wide routes (health checks, current user)
+core_bp = Blueprint("core", __name__)
+
+def create_app(config=None):
+    """
+    Builds the app, 'config' overriding the settings read from the environment. Nothing connects to the
+    database or to Auth0 here: the first request that needs them does ('/ready' checks the database).
+    Set 'MIGRATIONS' to False where 'flask db' is never run (the web workers), to skip loading alembic.
+    """
+    # Loading the environment variables
+    load_dotenv()
+
+    # Initialising the app
+    app = Flask(__name__)
+    # Set up CORS to enable frontend calls to API
+    CORS(app, origins=["http://localhost:3000", "http://localhost:30080"])  # Or "*"
+    # Load database URI from environment variables
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', "postgresql://userisme:password123@db:5432/chemical-db")
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.config['MIGRATIONS'] = True
+    app.config.update(config or {})
+
+    # Initialize the db with the app (the engine connects on first use)
+    db.init_app(app)
+
+    # Initialize Flask-Migrate
+    if app.config['MIGRATIONS']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Registering the blueprints
+    app.register_blueprint(core_bp)
+    app.register_blueprint(companies_bp)
+    app.register_blueprint(products_bp)
+    app.register_blueprint(entries_bp)
+    app.register_blueprint(analytics_bp)
+
+    # Logging setup
+    if not app.debug and not app.testing:
+        handler = logging.FileHandler("app.log")
+        handler.setLevel(logging.INFO)
+        app.logger.addHandler(handler)
+
+    app.secret_key = os.getenv('APP_SECRET_KEY')
+
+    app.logger.debug(f"Registered routes: {[rule.rule for rule in app.url_map.iter_rules()]}")
+    return app
+
+def get_oauth():
+    """Auth0 client of the current app, registered on first use (authlib fetches the server metadata lazily too)."""
+    oauth = current_app.extensions.get("authlib.integrations.flask_client")
+    if oauth is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(current_app)
+        oauth.register(
+            "auth0",
+            client_id=os.getenv("AUTH0_CLIENT_ID"),
+            client_secret=os.getenv("AUTH0_CLIENT_SECRET"),
+            client_kwargs={
+                "scope": "openid profile email",
+                "audience": os.getenv("AUTH0_AUDIENCE"),
+                "prompt": "login"
+            },
+            server_metadata_url=f'https://{os.getenv("AUTH0_DOMAIN")}/.well-known/openid-configuration'
+        )
+    return oauth
 
 #( CHANGED FOR EASIER TESTABILITY AND DIRECT CONTROL OVER ERROR HANDLING IN VIEWS-- MORE SCALABLE ) -> Now each view function raises 404 on it's own
 # 404 Error Handler:
-# @app.errorhandler(404)
+# @core_bp.app_errorhandler(404)
 # def resource_not_found(error):
 #     """Error handler for 404 - Resource Not Found"""
 #     return jsonify(error = error.description or "Resource not found"), 404
 
-# @app.route("/login", methods=["GET"])
+# @core_bp.route("/login", methods=["GET"])
 # def login():
-#     auth0_login_url = oauth.auth0.authorize_redirect(
+#     auth0_login_url = get_oauth().auth0.authorize_redirect(
 #         redirect_uri=url_for("callback", _external=True),
 #         audience=os.getenv("AUTH0_AUDIENCE"),
 #         scope="openid profile email",
@@ -98,9 +100,9 @@ with app.app_context():
 
 #     return jsonify({"login_url": auth0_login_url}), 200
 
-# @app.route("/callback", methods=["GET", "POST"])
+# @core_bp.route("/callback", methods=["GET", "POST"])
 # def callback():
-#     token = oauth.auth0.authorize_access_token()
+#     token = get_oauth().auth0.authorize_access_token()
 #     print("Token Audience:", token.get("aud", "MISSING_AUD"))
 
 #     print("TOKEN RECEIVED:", json.dumps(token, indent=2))  # Debugging
@@ -109,7 +111,7 @@ with app.app_context():
 #     session["user"] = token
 #     return jsonify({"access_token": token["access_token"]}), 200
 
-@app.route("/protected", methods=["GET"])
+@core_bp.route("/protected", methods=["GET"])
 @requires_auth
 def protected():
     # Print the raw Authorization header (which contains the JWT token)
@@ -118,14 +120,32 @@ def protected():
     print("User Payload:", request.user)
     return jsonify({"message": "You have access!", "user": request.user})
 
-@app.route('/health')
+@core_bp.route('/health')
 def health_check():
+    """Liveness: the process serves requests. Never touches the database."""
     return "OK", 200
 
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5002)
+@core_bp.route('/ready')
+def readiness_check():
+    """Readiness: the database is reachable and migrated. Route traffic to the worker only once it answers 200."""
+    try:
+        db.session.execute(text("SELECT 1"))
+        if not inspect(db.engine).has_table("users"):
+            current_app.logger.error("The 'user' table does not exist.")
+            return jsonify(ready=False, error="Database schema missing, run the migrations."), 503
+    except Exception as e:
+        current_app.logger.error(f"Readiness check failed: {str(e)}")
+        return jsonify(ready=False, error="Database unavailable."), 503
+    return jsonify(ready=True), 200
+
+@core_bp.route('/health/cache')
+@requires_auth
+def cache_health_check():
+    """Reports the hit/miss counters of the in-process caches. Not a probe: it needs a signed in user, as the
+    counters tell about the app's traffic."""
+    return jsonify(cache_stats()), 200
 
-@app.route("/user", methods=["GET"])
+@core_bp.route("/user", methods=["GET"])
 @requires_auth
 def get_current_user():
     """This function serves as the endpoint for frontend to fetch the info on the current user and display 
@@ -139,4 +159,8 @@ def get_current_user():
 
     else: 
         return jsonify({'error': 'no user'
-        })
\ No newline at end of file
+        })
+
+# Development server only. In production the app is served by gunicorn: 'gunicorn -c gunicorn.conf.py wsgi:app'
+if __name__ == "__main__":
+    create_app().run(host="0.0.0.0", port=5002)
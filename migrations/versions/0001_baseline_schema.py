@@ -0,0 +1,94 @@
+"""Baseline schema
+
+Creates the tables of the original schema. Databases created before migrations were tracked already
+have them, so every table is only created when missing; on such a database this revision only stamps
+the version.
+
+Revision ID: 0001_baseline_schema
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(250), nullable=False),
+            sa.Column("email", sa.String(250), nullable=False),
+            sa.Column("auth0_sub", sa.String(250), nullable=False, unique=True),
+        )
+
+    if "companies" not in existing:
+        op.create_table(
+            "companies",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(250), nullable=False),
+            sa.Column("address", sa.String(250), nullable=False),
+            sa.Column("contact_person", sa.String(250), nullable=True),
+            sa.Column("contact_number", sa.String(20), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        )
+
+    if "products" not in existing:
+        op.create_table(
+            "products",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(250), nullable=False, unique=True),
+            sa.Column("stock", sa.Float(), nullable=False),
+            sa.Column("customs_code", sa.String(250), nullable=False),
+            sa.Column("img_url", sa.String(250), nullable=False),
+            sa.Column("summary", sa.String(1000), nullable=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        )
+
+    if "entries" not in existing:
+        op.create_table(
+            "entries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("date", sa.String(250), nullable=False),
+            sa.Column("document_nr", sa.String(250), nullable=False, unique=True),
+            sa.Column("transaction_type", sa.Enum("Supply", "Purchase", name="transaction_type_enum"), nullable=False),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id")),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        )
+
+    if "product_companies" not in existing:
+        op.create_table(
+            "product_companies",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("total_quantity_bought", sa.Float(), nullable=False),
+            sa.Column("total_quantity_supplied", sa.Float(), nullable=False),
+            sa.Column("last_transaction_date", sa.String(250), nullable=False),
+            sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id")),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id")),
+        )
+
+    if "line_items" not in existing:
+        op.create_table(
+            "line_items",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("quantity", sa.Float(), nullable=False),
+            sa.Column("price_per_unit", sa.Float(), nullable=False),
+            sa.Column("entry_id", sa.Integer(), sa.ForeignKey("entries.id")),
+            sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id")),
+        )
+
+
+def downgrade():
+    for table in ("line_items", "product_companies", "entries", "products", "companies", "users"):
+        op.drop_table(table)
+    sa.Enum(name="transaction_type_enum").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,71 @@
+"""Store Entry.date as DATE and index it per user and per company
+
+The text dates ('YYYY-MM-DD') are copied into a new DATE column in batches, each committed on its own,
+so the backfill neither holds one long transaction over the whole table nor rewrites it in one go.
+
+Revision ID: 0002_entry_date_column
+Revises: 0001_baseline_schema
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_entry_date_column'
+down_revision = '0001_baseline_schema'
+branch_labels = None
+depends_on = None
+
+# Rows converted per committed batch
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 10000))
+
+
+def backfill(statement):
+    """Runs the batched UPDATE until it no longer changes any rows, committing after every batch."""
+    with op.get_context().autocommit_block():
+        while op.get_bind().execute(sa.text(statement), {"batch": BACKFILL_BATCH_SIZE}).rowcount:
+            pass
+
+
+def upgrade():
+    op.add_column("entries", sa.Column("date_value", sa.Date(), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        backfill(
+            "UPDATE entries SET date_value = to_date(left(date, 10), 'YYYY-MM-DD') "
+            "WHERE id IN (SELECT id FROM entries WHERE date_value IS NULL LIMIT :batch)"
+        )
+    else:
+        backfill(
+            "UPDATE entries SET date_value = substr(date, 1, 10) "
+            "WHERE id IN (SELECT id FROM entries WHERE date_value IS NULL LIMIT :batch)"
+        )
+
+    with op.batch_alter_table("entries") as batch_op:
+        batch_op.drop_column("date")
+        batch_op.alter_column("date_value", new_column_name="date", nullable=False)
+
+    op.create_index("ix_entries_user_id_date", "entries", ["user_id", "date"])
+    op.create_index("ix_entries_company_id_date", "entries", ["company_id", "date"])
+
+
+def downgrade():
+    op.drop_index("ix_entries_company_id_date", table_name="entries")
+    op.drop_index("ix_entries_user_id_date", table_name="entries")
+
+    with op.batch_alter_table("entries") as batch_op:
+        batch_op.alter_column("date", new_column_name="date_value", nullable=True)
+    op.add_column("entries", sa.Column("date", sa.String(250), nullable=True))
+
+    backfill(
+        "UPDATE entries SET date = CAST(date_value AS VARCHAR(250)) "
+        "WHERE id IN (SELECT id FROM entries WHERE date IS NULL LIMIT :batch)"
+    )
+
+    with op.batch_alter_table("entries") as batch_op:
+        batch_op.drop_column("date_value")
+        batch_op.alter_column("date", nullable=False)
@@ -0,0 +1,67 @@
+"""Index the foreign keys and make (product_id, company_id) unique on product_companies
+
+entries.user_id and entries.company_id are already the leading columns of the (user_id, date) and
+(company_id, date) indexes from 0002, so they get no single-column index of their own.
+
+Duplicated ProductCompany rows (possible so far, as nothing enforced uniqueness) are merged into the
+oldest row of each pair before the unique constraint is added: the quantities are summed and the
+latest transaction date is kept.
+
+Revision ID: 0003_foreign_key_indexes
+Revises: 0002_entry_date_column
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_foreign_key_indexes'
+down_revision = '0002_entry_date_column'
+branch_labels = None
+depends_on = None
+
+
+def merge_duplicate_product_companies():
+    op.execute("""
+        UPDATE product_companies SET
+            total_quantity_bought = totals.bought,
+            total_quantity_supplied = totals.supplied,
+            last_transaction_date = totals.last_date
+        FROM (
+            SELECT min(id) AS keep_id, sum(total_quantity_bought) AS bought,
+                   sum(total_quantity_supplied) AS supplied, max(last_transaction_date) AS last_date
+            FROM product_companies
+            GROUP BY product_id, company_id
+            HAVING count(*) > 1
+        ) AS totals
+        WHERE product_companies.id = totals.keep_id
+    """)
+    op.execute("""
+        DELETE FROM product_companies
+        WHERE id NOT IN (SELECT min(id) FROM product_companies GROUP BY product_id, company_id)
+    """)
+
+
+def upgrade():
+    merge_duplicate_product_companies()
+
+    with op.batch_alter_table("product_companies") as batch_op:
+        batch_op.create_unique_constraint("uq_product_companies_product_id_company_id", ["product_id", "company_id"])
+    op.create_index("ix_product_companies_company_id", "product_companies", ["company_id"])
+
+    op.create_index("ix_line_items_entry_id", "line_items", ["entry_id"])
+    op.create_index("ix_line_items_product_id_entry_id", "line_items", ["product_id", "entry_id"])
+    op.create_index("ix_products_user_id", "products", ["user_id"])
+    op.create_index("ix_companies_user_id", "companies", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_companies_user_id", table_name="companies")
+    op.drop_index("ix_products_user_id", table_name="products")
+    op.drop_index("ix_line_items_product_id_entry_id", table_name="line_items")
+    op.drop_index("ix_line_items_entry_id", table_name="line_items")
+
+    op.drop_index("ix_product_companies_company_id", table_name="product_companies")
+    with op.batch_alter_table("product_companies") as batch_op:
+        batch_op.drop_constraint("uq_product_companies_product_id_company_id", type_="unique")
@@ -0,0 +1,58 @@
+"""Daily totals rollup per user, day, company, product and transaction type
+
+Created and filled from the existing entries; afterwards it is kept up to date on every entry creation.
+It can be rebuilt at any time with 'flask analytics rebuild-daily-totals'.
+
+Revision ID: 0004_daily_totals
+Revises: 0003_foreign_key_indexes
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_daily_totals'
+down_revision = '0003_foreign_key_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The enum type already exists (entries.transaction_type)
+    transaction_type = (
+        postgresql.ENUM("Supply", "Purchase", name="transaction_type_enum", create_type=False)
+        if op.get_bind().dialect.name == "postgresql"
+        else sa.Enum("Supply", "Purchase", name="transaction_type_enum")
+    )
+
+    op.create_table(
+        "daily_totals",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("transaction_type", transaction_type, nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "date", "company_id", "product_id", "transaction_type"),
+    )
+    op.create_index("ix_daily_totals_company_id_date", "daily_totals", ["company_id", "date"])
+    op.create_index("ix_daily_totals_product_id_date", "daily_totals", ["product_id", "date"])
+
+    op.execute("""
+        INSERT INTO daily_totals (user_id, date, company_id, product_id, transaction_type, value, quantity, count)
+        SELECT entries.user_id, entries.date, entries.company_id, line_items.product_id, entries.transaction_type,
+               sum(line_items.quantity * line_items.price_per_unit), sum(line_items.quantity), count(line_items.id)
+        FROM entries JOIN line_items ON line_items.entry_id = entries.id
+        GROUP BY entries.user_id, entries.date, entries.company_id, line_items.product_id, entries.transaction_type
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_daily_totals_product_id_date", table_name="daily_totals")
+    op.drop_index("ix_daily_totals_company_id_date", table_name="daily_totals")
+    op.drop_table("daily_totals")
@@ -0,0 +1,75 @@
+"""Company and product leaderboards per user, transaction type and board (all time, month, rolling 30 days)
+
+The all time and monthly boards are filled from the daily totals; the rolling boards are built by
+'flask analytics rebuild-leaderboards', which should run daily. Afterwards all boards are kept up to date on
+every entry creation.
+
+Revision ID: 0005_leaderboards
+Revises: 0004_daily_totals
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_leaderboards'
+down_revision = '0004_daily_totals'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    # The enum type already exists (entries.transaction_type)
+    transaction_type = (
+        postgresql.ENUM("Supply", "Purchase", name="transaction_type_enum", create_type=False)
+        if postgres
+        else sa.Enum("Supply", "Purchase", name="transaction_type_enum")
+    )
+
+    op.create_table(
+        "leaderboards",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("board", sa.String(length=20), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("subject", sa.String(length=20), nullable=False),
+        sa.Column("subject_id", sa.Integer(), nullable=False),
+        sa.Column("transaction_type", transaction_type, nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "board", "period_start", "subject", "subject_id", "transaction_type"),
+    )
+    op.create_index("ix_leaderboards_ranking", "leaderboards",
+                    ["user_id", "board", "period_start", "subject", "transaction_type", "value"])
+    op.create_table(
+        "leaderboard_windows",
+        sa.Column("board", sa.String(length=20), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("board"),
+    )
+
+    all_time = "DATE '0001-01-01'" if postgres else "'0001-01-01'"
+    month = "CAST(date_trunc('month', date) AS DATE)" if postgres else "strftime('%Y-%m-01', date)"
+    # Like 'record_leaderboards': future days join the all time boards on their day, their month right away
+    for subject in ("company", "product"):
+        op.execute(f"""
+            INSERT INTO leaderboards (user_id, board, period_start, subject, subject_id, transaction_type, value)
+            SELECT user_id, 'all_time', {all_time}, '{subject}', {subject}_id, transaction_type, sum(value)
+            FROM daily_totals
+            WHERE date <= CURRENT_DATE
+            GROUP BY user_id, {subject}_id, transaction_type
+        """)
+        op.execute(f"""
+            INSERT INTO leaderboards (user_id, board, period_start, subject, subject_id, transaction_type, value)
+            SELECT user_id, 'month', {month}, '{subject}', {subject}_id, transaction_type, sum(value)
+            FROM daily_totals
+            GROUP BY user_id, {month}, {subject}_id, transaction_type
+        """)
+
+
+def downgrade():
+    op.drop_table("leaderboard_windows")
+    op.drop_index("ix_leaderboards_ranking", table_name="leaderboards")
+    op.drop_table("leaderboards")
@@ -0,0 +1,46 @@
+"""Product summaries cached across users by normalised product name and prompt version
+
+Seeded with the summaries already generated for the existing products (the fallback text excluded).
+
+Revision ID: 0006_product_summary_cache
+Revises: 0005_leaderboards
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_product_summary_cache'
+down_revision = '0005_leaderboards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "product_summary_cache",
+        sa.Column("name_key", sa.String(length=250), nullable=False),
+        sa.Column("prompt_version", sa.String(length=20), nullable=False),
+        sa.Column("summary", sa.String(length=1000), nullable=False),
+        sa.PrimaryKeyConstraint("name_key", "prompt_version"),
+    )
+
+    # Same normalisation as 'summaries.summary_key' (SQLite only trims: its keys may differ in inner spacing)
+    name_key = (
+        r"lower(regexp_replace(trim(name), '\s+', ' ', 'g'))"
+        if op.get_bind().dialect.name == "postgresql"
+        else "lower(trim(name))"
+    )
+    op.execute(f"""
+        INSERT INTO product_summary_cache (name_key, prompt_version, summary)
+        SELECT {name_key}, '1', min(summary)
+        FROM products
+        WHERE summary IS NOT NULL AND summary <> 'Sorry, no product summary available at the moment :('
+        GROUP BY {name_key}
+    """)
+
+
+def downgrade():
+    op.drop_table("product_summary_cache")
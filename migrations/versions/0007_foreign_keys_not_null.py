@@ -0,0 +1,59 @@
+"""Make the foreign key columns NOT NULL, as the models declare them
+
+The baseline created them nullable. Rows with a NULL foreign key belong to no user, entry or product and
+cannot be shown nor fixed by the app, but they are not deleted here: the upgrade stops and lists them, to be
+removed or reassigned by hand before running it again.
+
+Revision ID: 0007_foreign_keys_not_null
+Revises: 0006_product_summary_cache
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_foreign_keys_not_null'
+down_revision = '0006_product_summary_cache'
+branch_labels = None
+depends_on = None
+
+
+FOREIGN_KEYS = {
+    "companies": ["user_id"],
+    "products": ["user_id"],
+    "entries": ["company_id", "user_id"],
+    "product_companies": ["product_id", "company_id"],
+    "line_items": ["entry_id", "product_id"],
+}
+
+
+def null_foreign_keys():
+    """Returns '<table>.<column>: <count>' for every foreign key column holding NULLs."""
+    connection = op.get_bind()
+    found = []
+    for table, columns in FOREIGN_KEYS.items():
+        for column in columns:
+            count = connection.execute(sa.text(f"SELECT count(*) FROM {table} WHERE {column} IS NULL")).scalar()
+            if count:
+                found.append(f"{table}.{column}: {count}")
+    return found
+
+
+def upgrade():
+    found = null_foreign_keys()
+    if found:
+        raise RuntimeError(f"Rows with NULL foreign keys must be deleted or reassigned first ({', '.join(found)}).")
+
+    for table, columns in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    for table, columns in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Integer(), nullable=True)
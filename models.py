@@ -1,5 +1,6 @@
 from sqlalchemy.orm import relationship, Mapped, mapped_column, DeclarativeBase
-from sqlalchemy import Integer,Float, String, ForeignKey, Enum
+from datetime import date
+from sqlalchemy import Integer,Float, String, ForeignKey, Enum, Date, Index, UniqueConstraint
 from extensions import db
 
 # Define the base class using DeclarativeBase
@@ -20,9 +21,14 @@ class User(Base):
 
 class Entry(Base):
     __tablename__ = "entries"
+    # Date range filters and the (date, id) listing order are always scoped to a user or a company
+    __table_args__ = (
+        Index("ix_entries_user_id_date", "user_id", "date"),
+        Index("ix_entries_company_id_date", "company_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    date: Mapped[str] = mapped_column(String(250), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
     document_nr: Mapped[str] = mapped_column(String(250), unique=True, nullable=False)
     transaction_type: Mapped[str] = mapped_column(Enum("Supply", "Purchase", name="transaction_type_enum"), nullable=False)
     REQUIRED_FIELDS = ["date", "document_nr", "transaction_type", "company", "line_items"]
@@ -43,7 +49,7 @@ class Entry(Base):
         """Convert Entry object to a JSON-serializable dictionary."""
         return {
             "id": self.id,
-            "date": self.date,
+            "date": self.date.isoformat(),
             "document_nr": self.document_nr,
             "transaction_type": self.transaction_type,
             "company_id": self.company_id,
@@ -70,7 +76,7 @@ class Product(Base):
     line_items: Mapped[list["LineItem"]] = relationship("LineItem", back_populates="product")
 
     # Relationship of Many to One with user, here the Child for the User
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
     user: Mapped["User"] = relationship("User", back_populates="products")
 
     def editable_fields(self):
@@ -102,7 +108,7 @@ class Company(Base):
     product_companies: Mapped[list["ProductCompany"]] = relationship("ProductCompany", back_populates="company")
 
     # Relationship of Many to One with user, here the Child for the User
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
     user: Mapped["User"] = relationship("User", back_populates="companies")
 
     def to_dict(self):
@@ -121,6 +127,10 @@ class Company(Base):
 
 class ProductCompany(Base):
     __tablename__ = "product_companies"
+    # One connection per Product and Company, which also lets new connections be created with 'ON CONFLICT'
+    __table_args__ = (
+        UniqueConstraint("product_id", "company_id", name="uq_product_companies_product_id_company_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     total_quantity_bought: Mapped[float] = mapped_column(Float, nullable=False)
@@ -132,11 +142,15 @@ class ProductCompany(Base):
     product: Mapped["Product"] = relationship("Product", back_populates="product_companies")
 
     # A relationship of One to Many with Company, here the Child for Company
-    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"))
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), index=True)
     company: Mapped["Company"] = relationship("Company", back_populates="product_companies")
 
 class LineItem(Base):
     __tablename__ = "line_items"
+    # Product filters on entries ('Entry.line_items.any(product_id == ...)') look up (product_id, entry_id) pairs
+    __table_args__ = (
+        Index("ix_line_items_product_id_entry_id", "product_id", "entry_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     quantity: Mapped[float] = mapped_column(Float, nullable=False)
@@ -144,7 +158,7 @@ class LineItem(Base):
     REQUIRED_FIELDS = ["quantity", "price_per_unit", "product"]
 
     # A relationship of One to Many with the Entry, here the Child of Entry
-    entry_id: Mapped[int] = mapped_column(Integer, ForeignKey("entries.id"))
+    entry_id: Mapped[int] = mapped_column(Integer, ForeignKey("entries.id"), index=True)
     entry: Mapped["Entry"] = relationship("Entry", back_populates="line_items")
 
     # A relationship of One to Many with the Product, here the Child of Product
@@ -161,3 +175,58 @@ class LineItem(Base):
             "price_per_unit": self.price_per_unit
         }
 
+
+class DailyTotal(Base):
+    """Rollup of LineItems per user, day, Company, Product and transaction type, kept up to date on every
+    Entry creation (see 'rollups.py'). Analytics totals read it, instead of aggregating raw LineItems."""
+    __tablename__ = "daily_totals"
+    __table_args__ = (
+        Index("ix_daily_totals_company_id_date", "company_id", "date"),
+        Index("ix_daily_totals_product_id_date", "product_id", "date"),
+    )
+
+    # The primary key starts with (user_id, date), serving the date range filters of a user
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"), primary_key=True)
+    transaction_type: Mapped[str] = mapped_column(Enum("Supply", "Purchase", name="transaction_type_enum"), primary_key=True)
+
+    value: Mapped[float] = mapped_column(Float, nullable=False)  # Sum of quantity * price_per_unit
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)  # Number of LineItems
+
+class Leaderboard(Base):
+    """Total value per Company or Product of a user, transaction type and board: 'all_time', 'month' (one per
+    calendar month) or 'rolling_30d'. Kept up to date on every Entry creation (see 'rollups.py'), so the top-N
+    tallies read a few rows instead of aggregating the transactions."""
+    __tablename__ = "leaderboards"
+    __table_args__ = (
+        Index("ix_leaderboards_ranking", "user_id", "board", "period_start", "subject", "transaction_type", "value"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    board: Mapped[str] = mapped_column(String(20), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)  # First day of the month/window, date.min for all time
+    subject: Mapped[str] = mapped_column(String(20), primary_key=True)  # 'company' or 'product'
+    subject_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    transaction_type: Mapped[str] = mapped_column(Enum("Supply", "Purchase", name="transaction_type_enum"), primary_key=True)
+
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+
+class LeaderboardWindow(Base):
+    """Start of the rolling window the 'rolling_30d' leaderboards were last rebuilt for. Entries only update
+    (and tallies only read) the rolling boards while this window is the current one."""
+    __tablename__ = "leaderboard_windows"
+
+    board: Mapped[str] = mapped_column(String(20), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, nullable=False)
+
+class ProductSummaryCache(Base):
+    """Generated product summaries shared by all users, keyed by the normalised product name and the prompt version
+    (see 'summaries.py'): a common product is generated once, not once per user creating it."""
+    __tablename__ = "product_summary_cache"
+
+    name_key: Mapped[str] = mapped_column(String(250), primary_key=True)
+    prompt_version: Mapped[str] = mapped_column(String(20), primary_key=True)
+    summary: Mapped[str] = mapped_column(String(1000), nullable=False)
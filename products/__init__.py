@@ -2,4 +2,5 @@ from flask import Blueprint
 
 products_bp = Blueprint("products", __name__)
 
-from . import routes
\ No newline at end of file
+from . import routes
+from . import commands
\ No newline at end of file
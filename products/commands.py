@@ -0,0 +1,36 @@
+import click
+from products import products_bp
+from utils import request_product_summary
+from summaries import SUMMARY_BACKENDS, backfill_summaries
+
+@products_bp.cli.command("backfill-summaries")
+@click.option("--concurrency", type=click.IntRange(min=1), default=4, show_default=True,
+              help="Most summary requests in flight at once (lowered automatically while rate limited).")
+@click.option("--batch-size", type=click.IntRange(min=1), default=100, show_default=True,
+              help="Products committed and checkpointed together.")
+@click.option("--checkpoint", default=".summary-backfill.json", show_default=True,
+              help="File saving the progress; a new run resumes after it.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint (retries the products that failed).")
+@click.option("--retry-unavailable", is_flag=True, help="Also replace the 'no summary available' fallbacks.")
+@click.option("--max-retries", type=click.IntRange(min=0), default=5, show_default=True,
+              help="Retries of a rate limited request before giving up on the product.")
+@click.option("--backend", type=click.Choice(list(SUMMARY_BACKENDS)), envvar="SUMMARY_BACKEND", default="openai",
+              show_default=True, help="'openai' (set 'OPENAI_API_BASE' for a local stub) or 'fake'.")
+def backfill_summaries_command(concurrency, batch_size, checkpoint, restart, retry_unavailable, max_retries, backend):
+    """Generates the summaries of all the products having none, so no product page waits for its first one."""
+    generate = request_product_summary if backend == "openai" else SUMMARY_BACKENDS[backend]
+
+    def report(totals):
+        seconds = max(totals["seconds"], 1e-6)
+        click.echo(
+            f"Up to product {totals['last_product_id']}: {totals['products']} product(s), {totals['cached']} from cache, "
+            f"{totals['generated']} generated, {totals['failed']} failed, {totals['rate_limits']} rate limit(s), "
+            f"concurrency {totals['concurrency']} - {totals['products'] / seconds:.1f} products/s, "
+            f"{totals['generated'] / seconds:.2f} generations/s"
+        )
+
+    totals = backfill_summaries(generate, concurrency=concurrency, batch_size=batch_size, checkpoint=checkpoint,
+                                retry_unavailable=retry_unavailable, max_retries=max_retries, on_batch=report,
+                                resume=not restart)
+    click.echo(f"Done in {totals['seconds']:.1f}s: {totals['products']} product(s), {totals['generated']} generated, "
+               f"{totals['failed']} failed.")
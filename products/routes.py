@@ -1,9 +1,12 @@
 from products import products_bp
 from flask import request, jsonify, current_app, g
 from werkzeug.exceptions import NotFound
+from sqlalchemy.exc import IntegrityError
 from extensions import db
 from models import Product
-from utils import validate_product_data, requires_auth, get_user_item_or_404, fetch_product_summary
+from utils import validate_product_data, requires_auth, get_user_item_or_404
+from summaries import SUMMARY_QUEUE, summary_status, cached_summary
+from analytics_cache import invalidate_analytics
 
 def product_check(name):
     """A function that checks if a product entered in the Product Form
@@ -19,20 +22,13 @@ def get_product(product_id):
     try:
         product = get_user_item_or_404(Product, product_id)
 
-        # Handling the AI generated summary (not on Product creation- limiting OpenAI API calls)
+        # The AI generated summary is made on first view (not on Product creation- limiting OpenAI API calls),
+        # in the background: the response does not wait for it, the client polls '/products/<id>/summary'
         if not product.summary:
-
-            summary = fetch_product_summary(product)
-
-            if not summary:
-                product.summary = "Sorry, no product summary available at the moment :("
-            else:
-                product.summary = summary
-
-            db.session.commit()
+            SUMMARY_QUEUE.submit(product.id, product.name)
 
         current_app.logger.info(f"Product retrieved: {product.id} by func: {get_product.__name__}")
-        return jsonify(product=product.to_dict()), 200
+        return jsonify(product=product.to_dict(), summary_status=summary_status(product)), 200
 
 
 
@@ -44,22 +40,37 @@ def get_product(product_id):
         current_app.logger.error(f"Unexpected error in {get_product.__name__}: {str(e)}")
         return jsonify(error="Internal server error"), 500
 
-@products_bp.route("/products/<product_id>/regenerate-summary", methods=["PATCH"])
+@products_bp.route("/products/<product_id>/summary")
 @requires_auth
-def regenerate_product_summary(product_id):
+def get_product_summary(product_id):
+    """Polled by the client until the summary status is 'ready'."""
     try:
         product = get_user_item_or_404(Product, product_id)
 
-        summary = fetch_product_summary(product)
+        # Queues it again if an earlier attempt was dropped (full queue, worker error)
+        if not product.summary:
+            SUMMARY_QUEUE.submit(product.id, product.name)
 
-        if not summary:
-            product.summary = "Sorry, no product summary available at the moment :("
-        else:
-            product.summary = summary
+        return jsonify(summary=product.summary, status=summary_status(product)), 200
 
-        db.session.commit()
+    except NotFound as err:
+        return jsonify(error=err.description), 404
 
-        return jsonify(message="Summary regenerated successfully.", summary=product.summary), 200
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in {get_product_summary.__name__}: {str(e)}")
+        return jsonify(error="Internal server error"), 500
+
+@products_bp.route("/products/<product_id>/regenerate-summary", methods=["PATCH"])
+@requires_auth
+def regenerate_product_summary(product_id):
+    try:
+        product = get_user_item_or_404(Product, product_id)
+
+        # Bypasses the summary cache. The current summary is kept until the new one replaces it
+        if SUMMARY_QUEUE.submit(product.id, product.name, regenerate=True) is None:
+            return jsonify(error="Too many summaries are being generated, try again later."), 503
+
+        return jsonify(message="Summary regeneration queued.", summary=product.summary, status="pending"), 202
 
     except NotFound as err:
         return jsonify(error=err.description), 404
@@ -101,6 +112,7 @@ def edit_product(product_id):
             if key != "name" or (key == 'name' and value != edited_product.name):
                 setattr(edited_product, key, value)
         db.session.commit()
+        invalidate_analytics(g.user.id)
         current_app.logger.info(f"Correctly updated the Product: {edited_product.name}.")
         return jsonify(edited_product.to_dict()), 200
 
@@ -109,6 +121,11 @@ def edit_product(product_id):
 
         return jsonify(error=err.description), 404
 
+    except IntegrityError:  # Product names are unique across accounts
+        db.session.rollback()
+        current_app.logger.warning(f"Product name: {data.get('name')} already taken by another account.")
+        return jsonify(error="This product name is already in use."), 409
+
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Unexpected error in {edit_product.__name__}: {str(e)}")
@@ -123,6 +140,7 @@ def delete_product(product_id):
 
         db.session.delete(deleted_product)
         db.session.commit()
+        invalidate_analytics(g.user.id)
         current_app.logger.info(f"Product ID {deleted_product.id} successfully deleted.")
         return jsonify(success=f"Successfully deleted the product: {deleted_product.name}."), 200
 
@@ -156,6 +174,8 @@ def add_product():
             setattr(new_product, key, value)
         # Set stock to 0:
         setattr(new_product,"stock", 0)
+        # Common products get their summary from the shared cache, the others on first view
+        new_product.summary = cached_summary(new_product.name)
         # Handling User:
         user = g.user
         new_product.user = user
@@ -169,6 +189,11 @@ def add_product():
             "product_id": new_product.id
         }), 201
 
+    except IntegrityError:  # Product names are unique across accounts
+        db.session.rollback()
+        current_app.logger.warning(f"Product name: {data.get('name')} already taken by another account.")
+        return jsonify(error="This product name is already in use."), 409
+
     except Exception as e:
         current_app.logger.error(f"Unexpected error in {add_product.__name__}: {str(e)}")
         return jsonify(error="Internal server error"), 500
@@ -0,0 +1,213 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import func, select, delete, insert, literal, text, Date
+from extensions import db
+from models import DailyTotal, Entry, LineItem, Leaderboard, LeaderboardWindow
+from utils import dialect_insert, date_bucket
+
+DAILY_TOTAL_KEY = ("user_id", "date", "company_id", "product_id", "transaction_type")
+
+LEADERBOARD_KEY = ("user_id", "board", "period_start", "subject", "subject_id", "transaction_type")
+# 'period_start' of the all time boards
+ALL_TIME = date.min
+ROLLING_DAYS = 30
+
+def upsert_statement():
+    """'INSERT ... ON CONFLICT DO UPDATE' adding the inserted value, quantity and count to an existing row."""
+    statement = dialect_insert(DailyTotal)
+    return statement.on_conflict_do_update(
+        index_elements=list(DAILY_TOTAL_KEY),
+        set_={
+            "value": DailyTotal.value + statement.excluded.value,
+            "quantity": DailyTotal.quantity + statement.excluded.quantity,
+            "count": DailyTotal.count + statement.excluded.count,
+        }
+    )
+
+def record_daily_totals(line_items):
+    """
+    Adds new LineItems to the daily rollup, in the caller's transaction (so the rollup is committed or rolled
+    back together with the Entries). 'line_items' are dicts with the Entry's user_id, date, company_id and
+    transaction_type and the LineItem's product_id, quantity and price_per_unit.
+    Rows are upserted in key order, so concurrent Entries touching the same days cannot deadlock.
+    """
+    deltas = defaultdict(lambda: {"value": 0.0, "quantity": 0.0, "count": 0})
+    for line_item in line_items:
+        delta = deltas[tuple(line_item[key] for key in DAILY_TOTAL_KEY)]
+        delta["value"] += float(line_item["quantity"]) * float(line_item["price_per_unit"])
+        delta["quantity"] += float(line_item["quantity"])
+        delta["count"] += 1
+
+    if not deltas:
+        return
+
+    db.session.execute(upsert_statement(), [
+        {**dict(zip(DAILY_TOTAL_KEY, key)), **delta} for key, delta in sorted(deltas.items())
+    ])
+
+def rebuild_daily_totals(user_id=None, start=None, end=None):
+    """
+    Recomputes the rollup from the raw LineItems, optionally only for one user and/or a date range
+    (backfill and repair). Runs in the caller's transaction, new Entries waiting for it to commit;
+    returns the number of rollup rows written.
+    """
+    entry_filters = []
+    if user_id is not None:
+        entry_filters.append(Entry.user_id == user_id)
+    if start is not None:
+        entry_filters.append(Entry.date >= start)
+    if end is not None:
+        entry_filters.append(Entry.date <= end)
+
+    rollup_filters = []
+    if user_id is not None:
+        rollup_filters.append(DailyTotal.user_id == user_id)
+    if start is not None:
+        rollup_filters.append(DailyTotal.date >= start)
+    if end is not None:
+        rollup_filters.append(DailyTotal.date <= end)
+
+    lock_table(DailyTotal)  # See 'rebuild_leaderboards'
+    db.session.execute(delete(DailyTotal).where(*rollup_filters))
+
+    aggregated = (
+        select(
+            Entry.user_id, Entry.date, Entry.company_id, LineItem.product_id, Entry.transaction_type,
+            func.sum(LineItem.quantity * LineItem.price_per_unit),
+            func.sum(LineItem.quantity),
+            func.count(LineItem.id)
+        )
+        .join(Entry.line_items)
+        .where(*entry_filters)
+        .group_by(Entry.user_id, Entry.date, Entry.company_id, LineItem.product_id, Entry.transaction_type)
+    )
+    result = db.session.execute(
+        insert(DailyTotal).from_select([*DAILY_TOTAL_KEY, "value", "quantity", "count"], aggregated)
+    )
+    current_app.logger.info(f"Rebuilt {result.rowcount} daily total row(s) (user: {user_id}, from: {start}, to: {end}).")
+    return result.rowcount
+
+def record_rollups(line_items):
+    """Adds new LineItems to the daily totals and the leaderboards (see 'record_daily_totals' for the dicts)."""
+    line_items = list(line_items)
+    record_daily_totals(line_items)
+    record_leaderboards(line_items)
+
+def rolling_window_start(today=None):
+    """First day of the rolling window ending today."""
+    return (today or date.today()) - timedelta(days=ROLLING_DAYS - 1)
+
+def current_rolling_window():
+    """Start of the rolling window if the 'rolling_30d' boards were rebuilt for today's window, otherwise None
+    (they are then stale, and neither updated nor read until the next rebuild)."""
+    window = db.session.get(LeaderboardWindow, "rolling_30d")
+    if window is not None and window.period_start == rolling_window_start():
+        return window.period_start
+    return None
+
+def record_leaderboards(line_items):
+    """
+    Adds new LineItems to the Company and Product leaderboards of all time, of the Entry's month and (for recent
+    Entries) of the rolling window, in the caller's transaction. Takes the same dicts as 'record_daily_totals'.
+    Future-dated Entries only count in their month: they join the other boards with the first rebuild on their day.
+    """
+    line_items = list(line_items)
+    window_start = None
+    if any(line_item["date"] >= rolling_window_start() for line_item in line_items):
+        window_start = current_rolling_window()
+
+    deltas = defaultdict(float)
+    for line_item in line_items:
+        boards = [("month", line_item["date"].replace(day=1))]
+        if line_item["date"] <= date.today():
+            boards.append(("all_time", ALL_TIME))
+        if window_start is not None and window_start <= line_item["date"] <= date.today():
+            boards.append(("rolling_30d", window_start))
+
+        value = float(line_item["quantity"]) * float(line_item["price_per_unit"])
+        for board, period_start in boards:
+            for subject in ("company", "product"):
+                key = (line_item["user_id"], board, period_start, subject, line_item[f"{subject}_id"],
+                       line_item["transaction_type"])
+                deltas[key] += value
+
+    if not deltas:
+        return
+
+    statement = dialect_insert(Leaderboard)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(LEADERBOARD_KEY),
+        set_={"value": Leaderboard.value + statement.excluded.value}
+    )
+    db.session.execute(statement, [
+        {**dict(zip(LEADERBOARD_KEY, key)), "value": value} for key, value in sorted(deltas.items())
+    ])
+
+def leaderboard_rows(board, period_start, subject, start=None, end=None):
+    """SELECT of leaderboard rows of one board, aggregated from the daily rollup between 'start' and 'end'."""
+    subject_id = DailyTotal.company_id if subject == "company" else DailyTotal.product_id
+    # The month boards are grouped by the month of the day; the other boards have a single period
+    group_by = [DailyTotal.user_id, subject_id, DailyTotal.transaction_type]
+    if period_start is None:
+        period = date_bucket(DailyTotal.date, "month")
+        group_by.append(period)
+    else:
+        period = literal(period_start, Date)
+
+    query = (
+        select(
+            DailyTotal.user_id, literal(board), period, literal(subject), subject_id, DailyTotal.transaction_type,
+            func.sum(DailyTotal.value)
+        )
+        .group_by(*group_by)
+    )
+    if start is not None:
+        query = query.where(DailyTotal.date >= start)
+    if end is not None:
+        query = query.where(DailyTotal.date <= end)
+    return query
+
+def lock_table(model):
+    """
+    Blocks writes to the model's table (reads go on) until the end of the transaction, so a rebuild replacing
+    its rows cannot interleave with the upserts of new Entries. Postgres only: SQLite has a single writer anyway.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text(f"LOCK TABLE {model.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+def rebuild_leaderboards(today=None):
+    """
+    Recomputes every leaderboard from the daily rollup, moving the rolling boards to the window ending 'today'
+    (or the current date). Meant to run daily, as windows age out and future-dated days come due; also repairs
+    the boards after deletions. Runs in the caller's transaction, new Entries waiting for it to commit;
+    returns the number of leaderboard rows written.
+    """
+    today = today or date.today()
+    window_start = rolling_window_start(today)
+    # Otherwise an Entry committed between the delete and the insert would be inserted twice: a unique violation
+    lock_table(Leaderboard)
+    db.session.execute(delete(Leaderboard))
+
+    rows = 0
+    for subject in ("company", "product"):
+        for board, period_start, start, end in [
+            ("all_time", ALL_TIME, None, today),
+            ("month", None, None, None),
+            ("rolling_30d", window_start, window_start, window_start + timedelta(days=ROLLING_DAYS - 1)),
+        ]:
+            result = db.session.execute(
+                insert(Leaderboard).from_select([*LEADERBOARD_KEY, "value"],
+                                                leaderboard_rows(board, period_start, subject, start, end))
+            )
+            rows += result.rowcount
+
+    window = db.session.get(LeaderboardWindow, "rolling_30d")
+    if window is None:
+        db.session.add(LeaderboardWindow(board="rolling_30d", period_start=window_start))
+    else:
+        window.period_start = window_start
+    db.session.flush()
+
+    current_app.logger.info(f"Rebuilt {rows} leaderboard row(s), rolling window from {window_start}.")
+    return rows
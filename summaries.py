@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import or_
+
+from extensions import db
+from models import Product, ProductSummaryCache
+from utils import fetch_product_summary, dialect_insert, SUMMARY_PROMPT_VERSION
+
+SUMMARY_UNAVAILABLE = "Sorry, no product summary available at the moment :("
+
+
+def fake_product_summary(product_name):
+    """Local stand-in for the OpenAI call, for tests and load runs. Waits 'FAKE_SUMMARY_DELAY' seconds
+    to mimic the round-trip and returns a fixed text."""
+    time.sleep(float(os.getenv("FAKE_SUMMARY_DELAY", 0)))
+    return f"{product_name} is an industrial chemical product. Store it dry and handle it with protective equipment."
+
+
+def summary_key(product_name):
+    """Normalised product name the summaries are cached under: case and spacing do not matter."""
+    return " ".join(product_name.split()).lower()
+
+
+def cached_summary(product_name):
+    """Returns the cached summary of the product name for the current prompt version, or None."""
+    cached = db.session.get(ProductSummaryCache, (summary_key(product_name), SUMMARY_PROMPT_VERSION))
+    return cached.summary if cached else None
+
+
+def store_summary(product_name, summary):
+    """Caches a generated summary, replacing the one of the same name and prompt version (after a regeneration).
+    Part of the caller's transaction."""
+    statement = dialect_insert(ProductSummaryCache).values(
+        name_key=summary_key(product_name), prompt_version=SUMMARY_PROMPT_VERSION, summary=summary
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=["name_key", "prompt_version"], set_={"summary": statement.excluded.summary}
+    ))
+
+
+SUMMARY_BACKENDS = {
+    "openai": fetch_product_summary,
+    "fake": fake_product_summary,
+}
+
+
+class SummaryQueue:
+    """
+    Generates product summaries in the background on a bounded pool of worker threads.
+    A product has at most one job in flight per kind (regeneration or not): further requests join it. A
+    regeneration never joins a plain job, which may only copy the cached summary. Jobs look up the shared
+    summary cache first, and jobs of the same product name run one after another, so the LLM is called once
+    per name. It is called outside of any database session; the result is written in a short transaction.
+    De-duplication is per process, each web worker runs its own queue.
+    """
+
+    def __init__(self, workers=4, max_pending=100, backend=None):
+        backend = backend or os.getenv("SUMMARY_BACKEND", "openai")
+        if backend not in SUMMARY_BACKENDS:
+            raise ValueError(f"Unknown summary backend: '{backend}'. Use one of: {', '.join(SUMMARY_BACKENDS)}.")
+        self.generate = SUMMARY_BACKENDS[backend]
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summaries")
+        self.in_flight = {}
+        self.name_locks = {}
+        self._lock = threading.Lock()
+
+    def submit(self, product_id, product_name, regenerate=False):
+        """Queues the product's summary, 'regenerate' bypassing the cache. Returns its job, or None when the queue
+        is full (the next request retries). A request joining a job in flight gets that job's summary."""
+        with self._lock:
+            job = self.in_flight.get((product_id, regenerate))
+            if job is None and len(self.in_flight) < self.max_pending:
+                job = self.executor.submit(self._run, current_app._get_current_object(), product_id, product_name,
+                                           regenerate)
+                self.in_flight[(product_id, regenerate)] = job
+        if job is None:
+            current_app.logger.warning(f"Summary queue full, product {product_id} not queued")
+        return job
+
+    def is_pending(self, product_id):
+        with self._lock:
+            return (product_id, False) in self.in_flight or (product_id, True) in self.in_flight
+
+    def _name_lock(self, product_name):
+        with self._lock:
+            lock, users = self.name_locks.get(summary_key(product_name), (threading.Lock(), 0))
+            self.name_locks[summary_key(product_name)] = (lock, users + 1)
+        return lock
+
+    def _release_name_lock(self, product_name):
+        with self._lock:
+            lock, users = self.name_locks.pop(summary_key(product_name))
+            if users > 1:
+                self.name_locks[summary_key(product_name)] = (lock, users - 1)
+
+    def _run(self, app, product_id, product_name, regenerate):
+        name_lock = self._name_lock(product_name)
+        try:
+            with name_lock, app.app_context():
+                summary = None if regenerate else cached_summary(product_name)
+                if summary is None:
+                    db.session.rollback()  # Ends the lookup's transaction before the slow call
+                    summary = self.generate(product_name)
+                    if summary:
+                        store_summary(product_name, summary)
+                    app.logger.info(f"Summary generated for product {product_id}")
+                product = db.session.get(Product, product_id)
+                if product is not None:  # Unless deleted in the meantime
+                    product.summary = summary or SUMMARY_UNAVAILABLE
+                db.session.commit()
+        except Exception as e:
+            app.logger.error(f"Failed to generate the summary of product {product_id}: {str(e)}")
+        finally:
+            self._release_name_lock(product_name)
+            with self._lock:
+                self.in_flight.pop((product_id, regenerate), None)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self.in_flight), "max_pending": self.max_pending}
+
+
+SUMMARY_QUEUE = SummaryQueue(
+    workers=int(os.getenv("SUMMARY_WORKERS", 4)),
+    max_pending=int(os.getenv("SUMMARY_QUEUE_SIZE", 100)),
+)
+
+
+def summary_status(product):
+    """Returns 'pending' while the product's summary is queued or being generated, 'ready' otherwise."""
+    if SUMMARY_QUEUE.is_pending(product.id) or not product.summary:
+        return "pending"
+    return "ready"
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for calls to a rate limited API. A rate limit halves the limit and pauses all callers
+    (for the server's 'Retry-After', or an exponential backoff); every 'limit' successes in a row raise it
+    by one again, up to 'maximum'.
+    """
+
+    def __init__(self, maximum, backoff=1.0, max_backoff=60.0):
+        self.maximum = maximum
+        self.limit = maximum
+        self.active = 0
+        self.backoff = backoff
+        self.delay = backoff
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self.successes = 0
+        self.rate_limits = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.active < self.limit:
+                    self.active += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def release(self, rate_limited=False, retry_after=None):
+        with self._condition:
+            self.active -= 1
+            if rate_limited:
+                self.rate_limits += 1
+                self.limit = max(1, self.limit // 2)
+                self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or self.delay))
+                self.delay = min(self.delay * 2, self.max_backoff)
+                self.successes = 0
+            else:
+                self.delay = self.backoff
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.successes = 0
+            self._condition.notify_all()
+
+
+def retry_after(error):
+    """Seconds to wait asked by the server's 'Retry-After' header of an OpenAI error, if any."""
+    try:
+        return float((error.headers or {}).get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def generate_with_backoff(generate, limiter, product_name, max_retries=5):
+    """Calls 'generate' within the limiter, retrying rate limited calls. Returns None once the retries are exhausted."""
+    import openai
+
+    for _ in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            summary = generate(product_name)
+        except openai.error.RateLimitError as e:
+            limiter.release(rate_limited=True, retry_after=retry_after(e))
+            continue
+        except Exception:
+            limiter.release()
+            raise
+        limiter.release()
+        return summary
+    return None
+
+
+def read_checkpoint(path):
+    """Last product id a previous backfill got through, 0 without a checkpoint."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as file:
+        return json.load(file)["last_product_id"]
+
+
+def write_checkpoint(path, last_product_id):
+    if path:
+        with open(path, "w") as file:
+            json.dump({"last_product_id": last_product_id}, file)
+
+
+def backfill_summaries(generate, concurrency=4, batch_size=100, checkpoint=None, resume=True, retry_unavailable=False,
+                       max_retries=5, backoff=1.0, on_batch=None):
+    """
+    Fills the summaries of the products having none, in batches of 'batch_size' products by id. Each name is
+    generated once (cached names are not generated at all), with at most 'concurrency' calls in flight, fewer
+    while rate limited. The batch is committed and the last product id saved to the 'checkpoint' file, so an
+    interrupted run resumes after it (products that failed are retried by a run with 'resume' off).
+    'on_batch' is called with the running totals after each batch, which are returned at the end.
+    """
+    missing = [Product.summary.is_(None)]
+    if retry_unavailable:
+        missing.append(Product.summary == SUMMARY_UNAVAILABLE)
+    last_id = read_checkpoint(checkpoint) if resume else 0
+    limiter = AdaptiveLimiter(concurrency, backoff=backoff)
+    totals = {"products": 0, "cached": 0, "generated": 0, "failed": 0}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="backfill") as executor:
+        while True:
+            rows = db.session.execute(
+                db.select(Product.id, Product.name)
+                .where(or_(*missing), Product.id > last_id)
+                .order_by(Product.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            names = {}  # Name key: (product name, ids)
+            for product_id, name in rows:
+                names.setdefault(summary_key(name), (name, []))[1].append(product_id)
+            summaries = dict(db.session.execute(
+                db.select(ProductSummaryCache.name_key, ProductSummaryCache.summary)
+                .where(ProductSummaryCache.name_key.in_(names), ProductSummaryCache.prompt_version == SUMMARY_PROMPT_VERSION)
+            ).all())
+            totals["cached"] += sum(len(names[key][1]) for key in summaries)
+            db.session.rollback()  # No transaction stays open during the calls
+
+            jobs = {key: executor.submit(generate_with_backoff, generate, limiter, name, max_retries)
+                    for key, (name, ids) in names.items() if key not in summaries}
+            for key, job in jobs.items():
+                name, ids = names[key]
+                try:
+                    summary = job.result()
+                except Exception as e:
+                    current_app.logger.error(f"Failed to generate the summary of '{name}': {str(e)}")
+                    summary = None
+                if summary:
+                    store_summary(name, summary)
+                    summaries[key] = summary
+                    totals["generated"] += 1
+                else:
+                    totals["failed"] += len(ids)
+
+            for key, summary in summaries.items():
+                # Unless filled by the summary queue in the meantime
+                db.session.execute(
+                    db.update(Product).where(Product.id.in_(names[key][1]), or_(*missing)).values(summary=summary)
+                )
+            db.session.commit()
+
+            last_id = rows[-1].id
+            write_checkpoint(checkpoint, last_id)
+            totals["products"] += len(rows)
+            if on_batch:
+                on_batch(dict(totals, last_product_id=last_id, rate_limits=limiter.rate_limits,
+                              concurrency=limiter.limit, seconds=time.perf_counter() - started))
+
+    return dict(totals, last_product_id=last_id, rate_limits=limiter.rate_limits,
+                seconds=time.perf_counter() - started)
@@ -1,4 +1,5 @@
 import pytest
+from contextlib import contextmanager
 from flask import Flask
 import sys
 import os
@@ -13,6 +14,119 @@ def app():
     with app.app_context():  # <--- Ensures that an application context is created
         yield app
 
+@pytest.fixture
+def db_app():
+    """An app bound to an in-memory SQLite database with the full schema created."""
+    from extensions import db
+    import models
+
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def make_catalogue(db_app):
+    """Factory creating a user (id 'user_id') with its companies and products, each product holding 'stock'.
+    'companies' and 'products' are lists of names, or counts of generated names ("Company 0", "Product 0", ...).
+    Returns the user."""
+    from extensions import db
+    from models import User, Company, Product
+
+    def create(products=2, companies=("Talk O' Clock",), stock=0, user_id=1):
+        if isinstance(products, int):
+            products = [f"Product {i}" for i in range(products)]
+        if isinstance(companies, int):
+            companies = [f"Company {i}" for i in range(companies)]
+        user = User(id=user_id, name=f"User {user_id}", email=f"user{user_id}@example.com", auth0_sub=f"okta|{user_id}")
+        db.session.add(user)
+        db.session.add_all([Company(name=name, address="Wałbrzych", contact_number="+48123456789", user=user)
+                            for name in companies])
+        db.session.add_all([Product(name=name, stock=stock, customs_code="22375", img_url="https://example.com", user=user)
+                            for name in products])
+        db.session.commit()
+        return user
+
+    return create
+
+@pytest.fixture
+def make_entry():
+    """Factory of entry payloads (as posted to '/entries') for a catalogue made by 'make_catalogue': one line item
+    per product, "Product 0" first, of the given 'quantities' (zeros skipped) at 10 per unit, or of 2 units of
+    each of the first 'products'. Any other field can be overridden."""
+    from datetime import date
+
+    def create(number, transaction_type="Supply", quantities=None, products=2, company="Talk O' Clock",
+               day="2025-02-01", **overrides):
+        quantities = [2] * products if quantities is None else quantities
+        entry = {
+            "date": day.isoformat() if isinstance(day, date) else day,
+            "document_nr": f"WZ {number}/02/2025",
+            "transaction_type": transaction_type,
+            "company": company,
+            "line_items": [{"product": f"Product {i}", "quantity": quantity, "price_per_unit": 10}
+                           for i, quantity in enumerate(quantities) if quantity]
+        }
+        entry.update(overrides)
+        return entry
+
+    return create
+
+@pytest.fixture
+def seed_entries(make_catalogue):
+    """Factory creating a user with 'count' entries (alternating Purchase/Supply, on consecutive days)
+    with one line item per product, and their daily totals rollup. Returns the user."""
+    from extensions import db
+    from models import Entry, LineItem
+    from rollups import rebuild_daily_totals
+    from datetime import date
+
+    def seed(count, products_per_entry=2):
+        user = make_catalogue(products=products_per_entry)
+        company, products = user.companies[0], user.products
+        for i in range(count):
+            entry = Entry(date=date(2025, 1, i + 1), document_nr=f"WZ {i + 1}/01/2025",
+                          transaction_type="Supply" if i % 2 else "Purchase", company=company, user=user)
+            db.session.add(entry)
+            for product in products:
+                db.session.add(LineItem(quantity=1, price_per_unit=10, product=product, entry=entry))
+        db.session.commit()
+        rebuild_daily_totals()
+        db.session.commit()
+        return user
+
+    return seed
+
+@pytest.fixture
+def max_queries(db_app):
+    """Guard failing the test when the wrapped code issues more than 'limit' SQL statements.
+    Usage: 'with max_queries(3): ...'. The context yields the list of executed statements."""
+    from sqlalchemy import event
+    from extensions import db
+
+    @contextmanager
+    def guard(limit):
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", count_statement)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_statement)
+        assert len(statements) <= limit, (
+            f"Expected at most {limit} SQL statements, got {len(statements)}:\n" + "\n".join(statements)
+        )
+
+    return guard
+
 @pytest.fixture
 def client(app):
 
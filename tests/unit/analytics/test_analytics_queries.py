@@ -0,0 +1,240 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from extensions import db
+from models import User, Company, Product, Entry, LineItem
+from rollups import rebuild_daily_totals
+from analytics.utils import (get_entry_totals_filtered, get_companies_tally, get_products_tally, get_month_periods,
+                             calculate_transaction_stats, get_monthly_totals, get_timeseries, get_periods_totals,
+                             compare_period_series)
+
+
+class TestDateFilters:
+
+    def test_totals_filtered_by_date_range(self, db_app, seed_entries):
+        """Entries of 2025-01-02..2025-01-04: two Supply (2nd, 4th) and one Purchase (3rd), 2 x 10 each."""
+        seed_entries(10)
+
+        totals = get_entry_totals_filtered(1, start=date(2025, 1, 2), end=date(2025, 1, 4))
+
+        assert (totals["supply"], totals["purchase"]) == (40, 20)
+
+    def test_tallies_filtered_by_date_range(self, db_app, seed_entries):
+        seed_entries(10)
+
+        companies = get_companies_tally(1, start=date(2025, 1, 1), end=date(2025, 1, 1))
+        products = get_products_tally(1, start=date(2025, 1, 1), end=date(2025, 1, 1))
+
+        assert companies == {"supply": {}, "purchase": {"Talk O' Clock": 20}}
+        assert products == {"supply": {}, "purchase": {"Product 0": 10, "Product 1": 10}}
+
+    def test_date_filters_are_sargable(self, db_app):
+        """The range predicate compares the rollup's DATE column directly, so its (company_id, date)
+        and primary key (user_id, date, ...) indexes can serve it."""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(context.compiled.statement.compile(dialect=postgresql.dialect()))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            get_entry_totals_filtered(1, start=date(2025, 1, 1), end=date(2025, 1, 31))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        sql = str(statements[0])
+        assert "daily_totals.date >= %(date_1)s" in sql
+        assert "CAST" not in sql
+
+    def test_month_periods_are_dates(self):
+        start, end = get_month_periods(1)
+
+        assert start.day == 1
+        assert (end + (date.resolution)).day == 1
+
+
+class TestTransactionStats:
+
+    def test_company_stats_in_one_query(self, db_app, seed_entries, max_queries):
+        """3 Purchase and 2 Supply entries, each with 2 line items of 1 x 10."""
+        seed_entries(5)
+
+        with max_queries(1):
+            stats = calculate_transaction_stats(1, company_id=1)
+
+        assert stats["transaction_counts"] == {"purchase": 3, "supply": 2}
+        assert stats["totals"] == {
+            "quantitative": {"purchase": 6, "supply": 4},
+            "monetary": {"purchase": 60, "supply": 40},
+        }
+        assert stats["average_quantity_per_transaction"] == {"purchase": 2, "supply": 2}
+        assert stats["average_value_per_transaction"] == {"purchase": 20, "supply": 20}
+
+    def test_product_stats_count_only_its_line_items(self, db_app, seed_entries, max_queries):
+        seed_entries(5)
+
+        with max_queries(1):
+            stats = calculate_transaction_stats(1, company_id=1, product_id=1)
+
+        assert stats["transaction_counts"] == {"purchase": 3, "supply": 2}
+        assert stats["totals"]["monetary"] == {"purchase": 30, "supply": 20}
+        assert stats["average_value_per_transaction"] == {"purchase": 10, "supply": 10}
+
+    def test_stats_without_entries(self, db_app, seed_entries):
+        seed_entries(0)
+
+        stats = calculate_transaction_stats(1, product_id=1)
+
+        assert stats["transaction_counts"] == {"purchase": 0, "supply": 0}
+        assert stats["average_value_per_transaction"] == {"purchase": 0, "supply": 0}
+
+
+@pytest.fixture
+def other_tenant(db_app):
+    """A second user with one big Supply entry on a day the first user also has data."""
+    user = User(id=2, name="Ola", email="ola@example.com", auth0_sub="okta|2")
+    company = Company(id=9, name="Other Company", address="Kraków", contact_number="+48987654321", user=user)
+    product = Product(id=9, name="Other Product", stock=0, customs_code="22375", img_url="https://example.com", user=user)
+    entry = Entry(date=date(2025, 1, 2), document_nr="FV 1/01/2025", transaction_type="Supply", company=company,
+                  user=user)
+    db.session.add_all([user, company, product, entry, LineItem(quantity=100, price_per_unit=10, product=product,
+                                                                entry=entry)])
+    db.session.commit()
+    rebuild_daily_totals(user_id=2)
+    db.session.commit()
+    return user
+
+
+class TestTenantScoping:
+
+    def test_aggregates_only_read_the_users_data(self, db_app, seed_entries, other_tenant):
+        seed_entries(4)
+
+        totals = get_entry_totals_filtered(1, start=date(2025, 1, 1), end=date(2025, 1, 31))
+        companies = get_companies_tally(1, start=date(2025, 1, 1), end=date(2025, 1, 31))
+        products = get_products_tally(2, start=date(2025, 1, 1), end=date(2025, 1, 31))
+        stats = calculate_transaction_stats(2, product_id=9)
+
+        assert (totals["supply"], totals["purchase"]) == (40, 40)
+        assert "Other Company" not in companies["supply"]
+        assert products == {"supply": {"Other Product": 1000}, "purchase": {}}
+        assert stats["transaction_counts"] == {"supply": 1, "purchase": 0}
+
+    def test_other_users_ids_find_nothing(self, db_app, seed_entries, other_tenant):
+        """Filtering by another tenant's company/product ids still only reads the caller's rows."""
+        seed_entries(2)
+
+        stats = calculate_transaction_stats(1, product_id=9)
+
+        assert stats["transaction_counts"] == {"supply": 0, "purchase": 0}
+
+    def test_user_is_required(self, db_app):
+        with pytest.raises(ValueError):
+            get_entry_totals_filtered(None, start=date(2025, 1, 1), end=date(2025, 1, 31))
+
+
+class FrozenDatetime(datetime):
+
+    @classmethod
+    def today(cls):
+        return cls(2025, 3, 15)
+
+
+@patch("analytics.utils.datetime", FrozenDatetime)
+class TestMonthlyTotals:
+
+    def test_month_periods_go_back_any_number_of_months(self):
+        assert get_month_periods(0) == (date(2025, 3, 1), date(2025, 3, 15))
+        assert get_month_periods(1) == (date(2025, 2, 1), date(2025, 2, 28))
+        assert get_month_periods(14) == (date(2024, 1, 1), date(2024, 1, 31))
+        with pytest.raises(ValueError):
+            get_month_periods(-1)
+
+    def test_months_totals_in_one_query(self, db_app, seed_entries, max_queries):
+        """10 entries in January 2025 (5 Purchase, 5 Supply, 20 each), none since."""
+        seed_entries(10)
+
+        with max_queries(1):
+            months = get_monthly_totals(1, 3)
+
+        assert [(month["month"], month["supply"], month["purchase"]) for month in months] == [
+            ("2025-03", 0, 0), ("2025-02", 0, 0), ("2025-01", 100, 100)
+        ]
+        assert (months[0]["start"], months[0]["end"]) == ("2025-03-01", "2025-03-15")
+
+    def test_months_out_of_range_are_ignored(self, db_app, seed_entries):
+        seed_entries(10)
+
+        months = get_monthly_totals(1, 2)
+
+        assert [(month["supply"], month["purchase"]) for month in months] == [(0, 0), (0, 0)]
+        assert len(get_monthly_totals(1, 24)) == 24
+
+
+class TestTimeseries:
+
+    def test_daily_series_is_dense(self, db_app, seed_entries, max_queries):
+        """10 entries on 2025-01-01..10 alternating Purchase/Supply, 20 each; nothing on the 11th and 12th."""
+        seed_entries(10)
+
+        with max_queries(1):
+            series = get_timeseries(1, date(2025, 1, 1), date(2025, 1, 12), bucket="day")
+
+        assert len(series) == 12
+        assert series[0] == {"date": "2025-01-01", "supply": 0, "purchase": 20}
+        assert series[1] == {"date": "2025-01-02", "supply": 20, "purchase": 0}
+        assert series[-1] == {"date": "2025-01-12", "supply": 0, "purchase": 0}
+
+    def test_weekly_series_starts_on_mondays(self, db_app, seed_entries):
+        seed_entries(10)
+
+        series = get_timeseries(1, date(2025, 1, 1), date(2025, 1, 14), bucket="week")
+
+        assert series == [
+            {"date": "2024-12-30", "supply": 40, "purchase": 60},
+            {"date": "2025-01-06", "supply": 60, "purchase": 40},
+            {"date": "2025-01-13", "supply": 0, "purchase": 0},
+        ]
+
+    def test_monthly_series_with_product_filter(self, db_app, seed_entries):
+        seed_entries(10)
+        product = db.session.get(Product, 1)
+
+        series = get_timeseries(1, date(2024, 12, 15), date(2025, 2, 10), bucket="month", product=product)
+
+        assert series == [
+            {"date": "2024-12-01", "supply": 0, "purchase": 0},
+            {"date": "2025-01-01", "supply": 50, "purchase": 50},
+            {"date": "2025-02-01", "supply": 0, "purchase": 0},
+        ]
+
+    def test_invalid_bucket(self, db_app):
+        with pytest.raises(ValueError):
+            get_timeseries(1, date(2025, 1, 1), date(2025, 1, 31), bucket="year")
+
+
+class TestPeriodComparison:
+
+    def test_periods_in_one_query(self, db_app, seed_entries, max_queries):
+        """Entries on 2025-01-01..10: Purchase on odd days, Supply on even days, 20 each."""
+        seed_entries(10)
+        periods = [(date(2025, 1, 1), date(2025, 1, 5)), (date(2025, 1, 6), date(2025, 1, 10)),
+                   (date(2025, 1, 1), date(2025, 1, 10)), (date(2025, 2, 1), date(2025, 2, 28))]
+
+        with max_queries(1):
+            totals = get_periods_totals(1, periods)
+
+        assert [(period["supply"], period["purchase"]) for period in totals] == [(40, 60), (60, 40), (100, 100), (0, 0)]
+        assert (totals[0]["start"], totals[0]["end"]) == ("2025-01-01", "2025-01-05")
+
+    def test_each_period_is_compared_with_the_next(self):
+        periods = [{"supply": 60, "purchase": 0}, {"supply": 40, "purchase": 0}, {"supply": 0, "purchase": 10}]
+
+        assert compare_period_series(periods) == [
+            {"period": 1, "vs_period": 2, "supply": 50.0, "purchase": None},
+            {"period": 2, "vs_period": 3, "supply": 100.0, "purchase": -100.0},
+        ]
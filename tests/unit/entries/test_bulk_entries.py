@@ -0,0 +1,137 @@
+import pytest
+from flask import request
+
+from extensions import db
+from models import Product, ProductCompany, Entry, LineItem
+from entries.EntryService import EntryService
+from entries.routes import parse_bulk_payload
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """A user with one company and 5 products without stock."""
+    return make_catalogue(products=5)
+
+
+class TestBulkCreateEntries:
+
+    def test_creates_all_valid_entries(self, catalogue, make_entry, db_app, max_queries):
+        """A batch of valid entries costs a fixed number of statements and updates stock and connections."""
+        entries = [make_entry(i + 1, products=5) for i in range(100)]
+
+        with db_app.test_request_context():
+            with max_queries(15):
+                results = EntryService.bulk_create_entries(entries, catalogue)
+
+        assert [result["status"] for result in results] == ["created"] * 100
+        assert Entry.query.count() == 100
+        assert LineItem.query.count() == 500
+        assert ProductCompany.query.count() == 5
+        assert db.session.get(Product, 1).stock == 200
+        assert ProductCompany.query.filter_by(product_id=1).one().total_quantity_supplied == 200
+
+    def test_reports_per_entry_errors(self, catalogue, make_entry, db_app):
+        """Invalid entries get their own error, without blocking the valid ones."""
+        entries = [
+            make_entry(1, products=5),
+            make_entry(1, products=5),  # duplicate within the batch
+            make_entry(2, company="Unknown Ltd.", products=5),
+            make_entry(3, line_items=[{"product": "Missing", "quantity": 1, "price_per_unit": 1}]),
+            make_entry(4, date="01-02-2025", products=5),
+            None,
+            make_entry(5, transaction_type="Purchase",
+                       line_items=[{"product": "Product 0", "quantity": 3, "price_per_unit": 10}]),  # only 2 in stock
+            make_entry(6, transaction_type="Purchase",
+                       line_items=[{"product": "Product 0", "quantity": 2, "price_per_unit": 10}]),
+        ]
+
+        with db_app.test_request_context():
+            results = EntryService.bulk_create_entries(entries, catalogue)
+
+        assert [result["status"] for result in results] == \
+               ["created", "error", "error", "error", "error", "error", "error", "created"]
+        assert "already exists" in results[1]["error"]
+        assert "Insufficient stock" in results[6]["error"]
+        assert Entry.query.count() == 2
+        assert db.session.get(Product, 1).stock == 0
+
+    def test_accepts_numeric_strings(self, catalogue, make_entry, db_app):
+        """Quantities and prices sent as numeric strings are saved as numbers, next to regular entries."""
+        entries = [
+            make_entry(1, products=5),
+            make_entry(2, line_items=[{"product": "Product 0", "quantity": "2", "price_per_unit": "10.5"}]),
+            make_entry(3, products=5),
+        ]
+
+        with db_app.test_request_context():
+            results = EntryService.bulk_create_entries(entries, catalogue)
+
+        assert [result["status"] for result in results] == ["created"] * 3
+        assert db.session.get(Product, 1).stock == 6
+        assert ProductCompany.query.filter_by(product_id=1).one().total_quantity_supplied == 6
+        assert LineItem.query.filter_by(entry_id=results[1]["entry_id"]).one().price_per_unit == 10.5
+
+    def test_products_of_other_accounts_are_not_found(self, catalogue, make_catalogue, make_entry, db_app):
+        """Line items naming another account's products fail like unknown products and leave its stock alone."""
+        other = make_catalogue(products=["Other 0"], companies=("Other Ltd.",), stock=5, user_id=2)
+        entries = [
+            make_entry(1, transaction_type="Purchase",
+                       line_items=[{"product": "Other 0", "quantity": 3, "price_per_unit": 10}]),
+            make_entry(2, products=5),
+        ]
+
+        with db_app.test_request_context():
+            results = EntryService.bulk_create_entries(entries, catalogue)
+
+        assert [result["status"] for result in results] == ["error", "created"]
+        assert "No such product: Other 0" in results[0]["error"]
+        assert Product.query.filter_by(name="Other 0").one().stock == 5
+        assert ProductCompany.query.join(Product).filter(Product.user_id == other.id).count() == 0
+
+    def test_rejects_existing_document_numbers(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            EntryService.bulk_create_entries([make_entry(1, products=5)], catalogue)
+            results = EntryService.bulk_create_entries([make_entry(1, products=5)], catalogue)
+
+        assert results[0]["status"] == "error"
+        assert Entry.query.count() == 1
+
+    def test_dry_run_writes_nothing(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            results = EntryService.bulk_create_entries([make_entry(1, products=5), make_entry(2, products=5)], catalogue,
+                                                       dry_run=True)
+
+        assert [result["status"] for result in results] == ["valid", "valid"]
+        assert Entry.query.count() == 0
+        assert db.session.get(Product, 1).stock == 0
+
+    def test_commits_in_chunks(self, catalogue, make_entry, db_app):
+        entries = [make_entry(i + 1, products=5) for i in range(7)]
+
+        with db_app.test_request_context():
+            results = EntryService.bulk_create_entries(entries, catalogue, chunk_size=3)
+
+        assert all(result["status"] == "created" for result in results)
+        assert sorted(result["entry_id"] for result in results) == list(range(1, 8))
+
+
+class TestParseBulkPayload:
+
+    def test_json_array_and_object(self, make_entry, db_app):
+        with db_app.test_request_context(json=[make_entry(1)]):
+            assert len(parse_bulk_payload(request)) == 1
+        with db_app.test_request_context(json={"entries": [make_entry(1), make_entry(2)]}):
+            assert len(parse_bulk_payload(request)) == 2
+
+    def test_ndjson_keeps_malformed_lines(self, db_app):
+        body = '{"document_nr": "WZ 1/02/2025"}\nnot json\n\n{"document_nr": "WZ 2/02/2025"}\n'
+        with db_app.test_request_context(data=body, content_type="application/x-ndjson"):
+            entries = parse_bulk_payload(request)
+
+        assert len(entries) == 3
+        assert entries[1] is None
+
+    def test_invalid_payload(self, db_app):
+        with db_app.test_request_context(json={"document_nr": "WZ 1/02/2025"}):
+            with pytest.raises(ValueError):
+                parse_bulk_payload(request)
@@ -0,0 +1,79 @@
+import pytest
+from datetime import date
+
+from models import DailyTotal
+from entries.EntryService import EntryService
+from rollups import record_daily_totals, rebuild_daily_totals
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """A user with one company and 2 products in stock."""
+    return make_catalogue(products=2, stock=100)
+
+
+def rollup():
+    return sorted(
+        (row.date, row.product_id, row.transaction_type, row.value, row.quantity, row.count)
+        for row in DailyTotal.query.all()
+    )
+
+
+class TestDailyTotals:
+
+    def test_entries_update_the_rollup(self, catalogue, make_entry, db_app):
+        """Entries of the same day and type accumulate in one row per product."""
+        with db_app.test_request_context():
+            EntryService.pre_entry_validation(make_entry(1), catalogue)
+            EntryService.pre_entry_validation(make_entry(2), catalogue)
+            EntryService.pre_entry_validation(make_entry(3, "Purchase"), catalogue)
+
+        assert rollup() == [
+            (date(2025, 2, 1), 1, "Purchase", 20, 2, 1),
+            (date(2025, 2, 1), 1, "Supply", 40, 4, 2),
+            (date(2025, 2, 1), 2, "Purchase", 20, 2, 1),
+            (date(2025, 2, 1), 2, "Supply", 40, 4, 2),
+        ]
+
+    def test_bulk_entries_update_the_rollup(self, catalogue, make_entry, db_app):
+        entries = [make_entry(i + 1, day=f"2025-02-0{i % 2 + 1}") for i in range(10)]
+
+        with db_app.test_request_context():
+            EntryService.bulk_create_entries(entries, catalogue, chunk_size=3)
+
+        assert rollup() == [
+            (date(2025, 2, 1), 1, "Supply", 100, 10, 5),
+            (date(2025, 2, 1), 2, "Supply", 100, 10, 5),
+            (date(2025, 2, 2), 1, "Supply", 100, 10, 5),
+            (date(2025, 2, 2), 2, "Supply", 100, 10, 5),
+        ]
+
+    def test_rebuild_matches_incremental_rollup(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            for i in range(4):
+                EntryService.pre_entry_validation(make_entry(i + 1, day=f"2025-02-0{i + 1}"), catalogue)
+            incremental = rollup()
+
+            DailyTotal.query.delete()
+            assert rebuild_daily_totals() == 8
+            assert rollup() == incremental
+
+            # A partial rebuild only replaces the rows in range
+            assert rebuild_daily_totals(user_id=catalogue.id, start=date(2025, 2, 2), end=date(2025, 2, 3)) == 4
+            assert rollup() == incremental
+
+    def test_failed_entry_leaves_no_rollup(self, catalogue, make_entry, db_app):
+        """The rollup is written in the Entry's transaction, so a rejected Entry rolls it back."""
+        entry = make_entry(1, "Purchase")
+        entry["line_items"][1]["quantity"] = 1000  # More than in stock
+
+        with db_app.test_request_context():
+            _, status_code = EntryService.pre_entry_validation(entry, catalogue)
+
+        assert status_code == 400
+        assert DailyTotal.query.count() == 0
+
+    def test_record_ignores_empty_batches(self, db_app):
+        record_daily_totals([])
+
+        assert DailyTotal.query.count() == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from extensions import db
+from models import Product, ProductCompany, LineItem
+from entries.EntryService import EntryService
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """A user with one company and 50 products, one of which already trades with the company."""
+    user = make_catalogue(products=50)
+    db.session.add(ProductCompany(product_id=1, company_id=1, total_quantity_bought=0, total_quantity_supplied=5,
+                                  last_transaction_date="2025-01-01"))
+    db.session.commit()
+    return user
+
+
+class TestEntryCreationQueries:
+
+    @pytest.mark.parametrize("line_item_count", [1, 50])
+    def test_entry_creation_round_trips_do_not_grow_with_line_items(self, line_item_count, catalogue, make_entry,
+                                                                     db_app, max_queries):
+        """Creating an entry costs the same number of statements for 1 or 50 line items."""
+        data = make_entry(1, products=line_item_count)
+
+        with db_app.test_request_context():
+            with max_queries(15):
+                response, status_code = EntryService.pre_entry_validation(data, catalogue)
+
+        assert status_code == 201
+        assert LineItem.query.count() == line_item_count
+        assert ProductCompany.query.count() == max(line_item_count, 1)
+        assert ProductCompany.query.filter_by(product_id=1).one().total_quantity_supplied == 7
+        assert db.session.get(Product, line_item_count).stock == 2
+
+    def test_products_of_other_accounts_are_not_found(self, catalogue, make_catalogue, make_entry, db_app):
+        """A product named after another account's product is rejected like an unknown one."""
+        make_catalogue(products=["Other 0"], companies=("Other Ltd.",), stock=5, user_id=2)
+        data = make_entry(1, line_items=[{"product": "Other 0", "quantity": 1, "price_per_unit": 10}])
+
+        with db_app.test_request_context():
+            response, status_code = EntryService.pre_entry_validation(data, catalogue)
+
+        assert status_code == 400
+        assert "No such product: Other 0" in response.get_json()["error"]
+        assert LineItem.query.count() == 0
+        assert Product.query.filter_by(name="Other 0").one().stock == 5
@@ -0,0 +1,49 @@
+import pytest
+from flask import g
+
+from extensions import db
+from models import Entry, User
+from entries.loaders import with_entry_serialisation, entry_serialisation_options
+from analytics.utils import query_results
+from utils import get_user_item_or_404
+
+
+class TestEntrySerialisationLoading:
+
+    @pytest.mark.parametrize("entry_count, products_per_entry", [(1, 1), (10, 5)])
+    def test_serialising_entries_is_constant_in_statements(self, entry_count, products_per_entry, db_app, seed_entries, max_queries):
+        """Serialising any number of entries and line items costs the same number of statements."""
+        seed_entries(entry_count, products_per_entry=products_per_entry)
+        db.session.expunge_all()
+
+        with max_queries(3):
+            entries = with_entry_serialisation(db.session.query(Entry)).all()
+            serialised = [entry.to_dict() for entry in entries]
+
+        assert len(serialised) == entry_count
+        assert all(len(entry["line_items"]) == products_per_entry for entry in serialised)
+        assert serialised[0]["company"] == "Talk O' Clock"
+
+    def test_single_entry_lookup_is_eager_loaded(self, db_app, seed_entries, max_queries):
+        """get_user_item_or_404 with the serialisation options loads a whole entry up front."""
+        seed_entries(1, products_per_entry=4)
+        db.session.expunge_all()
+
+        with db_app.test_request_context():
+            g.user = db.session.get(User, 1)
+            with max_queries(3):
+                entry = get_user_item_or_404(Entry, 1, options=entry_serialisation_options())
+                serialised = entry.to_dict()
+
+        assert [line_item["product"] for line_item in serialised["line_items"]] == [f"Product {i}" for i in range(4)]
+
+    def test_analytics_entries_are_eager_loaded(self, db_app, seed_entries, max_queries):
+        """The analytics transaction history path serialises line items without lazy loads."""
+        seed_entries(8, products_per_entry=3)
+        db.session.expunge_all()
+
+        with max_queries(3):
+            entries = query_results(company_id=1).all()
+            serialised = [[line_item.to_dict() for line_item in entry.line_items] for entry in entries]
+
+        assert len(serialised) == 8
@@ -3,7 +3,7 @@ import sys
 from unittest.mock import MagicMock, patch
 
 import pytest
-from flask import current_app, jsonify
+from flask import current_app, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.exceptions import NotFound
 
@@ -21,6 +21,7 @@ patch('validator_funcs.validate_line_items', lambda x: x).start()
 from entries.routes import get_entry, get_entries
 from entries.EntryService import EntryService
 from models import Entry, User, Company, Product, LineItem
+from extensions import db
 
 
 # Helper function to mock the g.user
@@ -107,110 +108,65 @@ class TestEntryModels:
         if status_code == 200:
             assert response_data == {"entry": mock_entry_data}
 
+    def test_get_entries_paginates_with_cursor(self, db_app, seed_entries):
+        """Following next_cursor returns every entry exactly once, newest first."""
+        user = seed_entries(5)
+        seen = []
+        cursor = None
+
+        while True:
+            query = f"?limit=2&after={cursor}" if cursor else "?limit=2"
+            with db_app.test_request_context(f"/entries{query}"):
+                g.user = user
+                response, status_code = get_entries()
+
+            assert status_code == 200
+            page = response.json
+            assert len(page["entries"]) <= 2
+            seen.extend(entry["document_nr"] for entry in page["entries"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert seen == [f"WZ {i}/01/2025" for i in range(5, 0, -1)]
+
+    def test_get_entries_query_count_is_constant(self, db_app, seed_entries, max_queries):
+        """A page costs the same number of statements no matter how many line items it serialises."""
+        user = seed_entries(12)
+
+        with db_app.test_request_context("/entries?limit=10"):
+            g.user = user
+            with max_queries(3):
+                response, status_code = get_entries()
+
+        assert status_code == 200
+        assert len(response.json["entries"]) == 10
+        assert response.json["entries"][0]["line_items"][0]["product"] == "Product 0"
+
     @pytest.mark.parametrize(
-        "mock_entry_data, response_keyword, expected_status_code, expected_entry_count",
+        "query_string, expected_count",
         [
-            # Scenario 1: Valid return with multiple entries
-            (
-                    [
-                        {
-                            "company_id": 2,
-                            "date": "2024-02-07",
-                            "document_nr": "WZ 10/01/2025",
-                            "id": 1,
-                            "line_items": [
-                                {"id": 1, "price_per_unit": 13.0, "product_id": 1, "quantity": 12.0},
-                                {"id": 2, "price_per_unit": 13.0, "product_id": 2, "quantity": 36.0}
-                            ],
-                            "transaction_type": "Purchase",
-                            "user_id": 1
-                        },
-                        {
-                            "company_id": 1,
-                            "date": "2024-02-07",
-                            "document_nr": "WZ 1/01/2025",
-                            "id": 2,
-                            "line_items": [
-                                {"id": 3, "price_per_unit": 13.0, "product_id": 1, "quantity": 12.0},
-                                {"id": 4, "price_per_unit": 13.0, "product_id": 2, "quantity": 36.0}
-                            ],
-                            "transaction_type": "Purchase",
-                            "user_id": 1
-                        },
-                        {
-                            "company_id": 1,
-                            "date": "2024-02-07",
-                            "document_nr": "WZ 2/01/2025",
-                            "id": 3,
-                            "line_items": [
-                                {"id": 5, "price_per_unit": 13.0, "product_id": 1, "quantity": 120.0},
-                                {"id": 6, "price_per_unit": 13.0, "product_id": 2, "quantity": 48.0}
-                            ],
-                            "transaction_type": "Purchase",
-                            "user_id": 1
-                        }
-                    ],
-                    "entries",
-                    200,
-                    3
-            ),
-            # Scenario 2: Valid return with no entries
-            ([], "entries", 200, 0),
-            # Scenario 3: Invalid return (server error)
-            (Exception("Database connection failed"), "error", 500, 0),
+            ("?transaction_type=Supply", 2),
+            ("?start=2025-01-02&end=2025-01-04", 3),
+            ("?limit=abc", None),
+            ("?transaction_type=Gift", None),
+            ("?after=not-a-cursor", None),
         ]
     )
-    @patch('entries.g')
-    def test_get_entries(self, mock_g, mock_entry_data, response_keyword, expected_status_code, expected_entry_count, app):
-        """Test of get_entries function in routes.py"""
-
-        # noinspection PyUnusedFunction
-        def dynamic_to_dict(entry, i):
-            return {key: getattr(entry, key) for key in mock_entry_data[i].keys()}
-
-        mock_user = MagicMock(spec=User, id=1)
+    def test_get_entries_filters(self, query_string, expected_count, db_app, seed_entries):
+        """Filters narrow the listing; invalid parameters are rejected with 400."""
+        user = seed_entries(5)
 
-        if isinstance(mock_entry_data, list):
-            mock_entries = [MagicMock(spec=Entry, **entry_data) for entry_data in mock_entry_data] # Prepare the mock entries list
+        with db_app.test_request_context(f"/entries{query_string}"):
+            g.user = user
+            response, status_code = get_entries()
 
-            # Loop through mock_entries and mock_entry_data correctly
-            for i, entry_data in enumerate(mock_entry_data):
-                mock_entries[i].to_dict.side_effect = lambda entry=mock_entries[i], idx=i: dynamic_to_dict(entry, idx) # Using lambda to prevent the late binding issue, capturing right variables at the right time
-
-            mock_user.entries = mock_entries
-
-        # Simulating a Server Error by raising an Exception
+        if expected_count is None:
+            assert status_code == 400
+            assert "error" in response.json
         else:
-            def raise_db_error():
-                raise Exception("Database connection failed")
-            print("Lack of list detected, proceeding to stimulate 500 error...")
-            mock_user.entries = MagicMock(side_effect=raise_db_error)
-            print(f"The error??? :{mock_user.entries.name}")
-        mock_g.user = mock_user  # Mock g.user to return a valid user
-
-        with app.app_context():
-            with app.test_request_context():
-                response = get_entries()
-
-        response_data = response[0].json
-        status_code = response[1]
-
-        print(f"Response: {response_data}. Status: {status_code}")
-        print(f"Current length of companies list: {len(response_data)}")
-        print(f"Expected company count: {expected_entry_count}")
-
-        # Assertions
-
-        assert status_code == expected_status_code, f"Expected status {expected_status_code}, got {status_code}"
-        assert len(
-            response_data) == expected_entry_count, f"Expected {expected_entry_count} companies, got {len(response_data)}"
-
-        if status_code == 200 and expected_entry_count == 3:
-            assert response_data == mock_entry_data
-        elif status_code == 200 and expected_entry_count == 0:
-            assert response_data == []
-        elif status_code == 500:
-            assert "error" in response_data
+            assert status_code == 200
+            assert len(response.json["entries"]) == expected_count
 
     # Now testing the chain of 3 functions inside EntryService.py that make up the 'add_entry(*args, **kwargs)' function,
     # testing each one separately since these are unit tests:
@@ -0,0 +1,147 @@
+import io
+import json
+import pytest
+
+from extensions import db
+from models import Product, Entry, LineItem
+from entries.importer import read_entries, import_entries, chunked, read_checkpoint
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """A user with one company and 3 products without stock."""
+    return make_catalogue(products=3)
+
+
+def csv_lines(count):
+    yield "date,document_nr,transaction_type,company,product,quantity,price_per_unit\n"
+    for i in range(count):
+        for product in range(3):
+            yield f"2025-02-01,WZ {i + 1}/02/2025,Supply,Talk O' Clock,Product {product},2,10.5\n"
+
+
+class TestReaders:
+
+    def test_csv_rows_are_grouped_by_document(self):
+        entries = list(read_entries(csv_lines(2), "csv"))
+
+        assert [entry["document_nr"] for entry in entries] == ["WZ 1/02/2025", "WZ 2/02/2025"]
+        assert entries[0]["line_items"][0] == {"product": "Product 0", "quantity": 2, "price_per_unit": 10.5}
+
+    def test_csv_missing_columns(self):
+        with pytest.raises(ValueError):
+            list(read_entries(io.StringIO("date,document_nr\n2025-02-01,WZ 1/02/2025\n"), "csv"))
+
+    def test_ndjson_malformed_lines(self):
+        lines = io.StringIO('{"document_nr": "WZ 1/02/2025"}\n{broken\n')
+        assert list(read_entries(lines, "ndjson")) == [{"document_nr": "WZ 1/02/2025"}, None]
+
+    def test_chunked_is_lazy(self):
+        consumed = []
+        source = (consumed.append(i) or i for i in range(10))
+        chunks = chunked(source, 4)
+
+        assert next(chunks) == [0, 1, 2, 3]
+        assert len(consumed) == 4
+
+
+class TestImportEntries:
+
+    def test_imports_in_chunks_with_checkpoint(self, catalogue, db_app, tmp_path):
+        checkpoint = tmp_path / "checkpoint.json"
+
+        with db_app.test_request_context():
+            report = import_entries(read_entries(csv_lines(10), "csv"), catalogue, chunk_size=4,
+                                    checkpoint_path=str(checkpoint))
+
+        assert (report["processed"], report["created"], report["failed"]) == (10, 10, 0)
+        assert Entry.query.count() == 10
+        assert LineItem.query.count() == 30
+        assert db.session.get(Product, 1).stock == 20
+        assert json.loads(checkpoint.read_text()) == {"last_document_nr": "WZ 10/02/2025", "processed": 10}
+
+    def test_resume_skips_imported_entries(self, catalogue, db_app, tmp_path):
+        checkpoint = tmp_path / "checkpoint.json"
+
+        with db_app.test_request_context():
+            import_entries(read_entries(csv_lines(4), "csv"), catalogue, checkpoint_path=str(checkpoint))
+            report = import_entries(read_entries(csv_lines(6), "csv"), catalogue,
+                                    resume_after=read_checkpoint(str(checkpoint)))
+
+        assert (report["processed"], report["created"], report["failed"]) == (2, 2, 0)
+        assert Entry.query.count() == 6
+
+    def test_resume_after_unknown_document_fails(self, catalogue, db_app):
+        with db_app.test_request_context(), pytest.raises(ValueError, match="not found"):
+            import_entries(read_entries(csv_lines(4), "csv"), catalogue, resume_after="WZ 99/02/2025")
+
+        assert Entry.query.count() == 0
+
+    def test_checkpoint_stops_before_failed_chunks(self, catalogue, db_app, tmp_path):
+        checkpoint = tmp_path / "checkpoint.json"
+        entries = list(read_entries(csv_lines(6), "csv"))
+        entries[2]["company"] = "Unknown Ltd."
+
+        with db_app.test_request_context():
+            report = import_entries(entries, catalogue, chunk_size=2, checkpoint_path=str(checkpoint))
+
+            assert (report["created"], report["failed"], report["checkpoint"]) == (5, 1, "WZ 2/02/2025")
+            assert read_checkpoint(str(checkpoint)) == "WZ 2/02/2025"
+
+            entries[2]["company"] = "Talk O' Clock"
+            report = import_entries(entries, catalogue, resume_after=read_checkpoint(str(checkpoint)))
+
+        assert (report["created"], report["failed"]) == (1, 3)  # The rest already exists
+        assert Entry.query.count() == 6
+
+    def test_dry_run_reports_errors_without_writing(self, catalogue, db_app, tmp_path):
+        entries = [*read_entries(csv_lines(2), "csv"), None]
+
+        with db_app.test_request_context():
+            report = import_entries(entries, catalogue, dry_run=True, checkpoint_path=str(tmp_path / "checkpoint.json"))
+
+        assert (report["processed"], report["valid"], report["failed"]) == (3, 2, 1)
+        assert report["errors"][0]["index"] == 2
+        assert Entry.query.count() == 0
+        assert not (tmp_path / "checkpoint.json").exists()
+
+    def test_products_of_other_accounts_are_not_imported(self, catalogue, make_catalogue, db_app):
+        make_catalogue(products=["Other 0"], companies=("Other Ltd.",), stock=5, user_id=2)
+        lines = ["date,document_nr,transaction_type,company,product,quantity,price_per_unit\n",
+                 "2025-02-01,WZ 1/02/2025,Purchase,Talk O' Clock,Other 0,3,10\n"]
+
+        with db_app.test_request_context():
+            report = import_entries(read_entries(lines, "csv"), catalogue)
+
+        assert (report["valid"], report["failed"]) == (0, 1)
+        assert "No such product: Other 0" in report["errors"][0]["error"]
+        assert Product.query.filter_by(name="Other 0").one().stock == 5
+
+    def test_cli_rejects_a_checkpoint_from_another_file(self, catalogue, db_app, tmp_path):
+        from entries import entries_bp
+        db_app.register_blueprint(entries_bp)
+        source = tmp_path / "entries.csv"
+        source.write_text("".join(csv_lines(2)))
+        checkpoint = tmp_path / "checkpoint.json"
+        checkpoint.write_text(json.dumps({"last_document_nr": "WZ 99/02/2025", "processed": 99}))
+
+        result = db_app.test_cli_runner().invoke(args=[
+            "entries", "import", str(source), "--user-email", catalogue.email,
+            "--checkpoint", str(checkpoint), "--resume"
+        ])
+
+        assert result.exit_code == 1
+        assert "WZ 99/02/2025 not found in the input" in result.output
+        assert Entry.query.count() == 0
+
+    def test_cli_warns_that_servers_keep_their_cached_analytics(self, catalogue, db_app, tmp_path):
+        from entries import entries_bp
+        db_app.register_blueprint(entries_bp)
+        source = tmp_path / "entries.csv"
+        source.write_text("".join(csv_lines(2)))
+
+        result = db_app.test_cli_runner().invoke(args=["entries", "import", str(source), "--user-email", catalogue.email])
+
+        assert result.exit_code == 0
+        assert "Imported 2 entries" in result.output
+        assert "Running servers keep serving their cached analytics" in result.output
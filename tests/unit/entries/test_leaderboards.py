@@ -0,0 +1,104 @@
+import pytest
+from datetime import date, timedelta
+
+from models import Leaderboard
+from entries.EntryService import EntryService
+from rollups import rebuild_leaderboards, rebuild_daily_totals
+from analytics.utils import get_leaderboard
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """A user with two companies and three products in stock."""
+    return make_catalogue(products=3, companies=2, stock=100)
+
+
+def boards():
+    return sorted(
+        (row.board, row.period_start, row.subject, row.subject_id, row.transaction_type, row.value)
+        for row in Leaderboard.query.all()
+    )
+
+
+class TestLeaderboards:
+
+    def test_entries_update_all_time_and_month_boards(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            for number, transaction_type, company, quantities in [(1, "Supply", "Company 0", [1, 2, 3]),
+                                                                  (2, "Supply", "Company 1", [0, 0, 1]),
+                                                                  (3, "Purchase", "Company 1", [1, 0, 0])]:
+                EntryService.pre_entry_validation(
+                    make_entry(number, transaction_type, quantities, company=company, day=date.today()), catalogue
+                )
+
+            for board in ("all_time", "month"):
+                assert get_leaderboard(1, "company", board) == {
+                    "supply": {"Company 0": 60, "Company 1": 10}, "purchase": {"Company 1": 10}
+                }
+            assert get_leaderboard(1, "product", "all_time", limit=2) == {
+                "supply": {"Product 2": 40, "Product 1": 20}, "purchase": {"Product 0": 10}
+            }
+
+    def test_backdated_entries_update_their_month(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            EntryService.pre_entry_validation(make_entry(1, quantities=[1], company="Company 0", day=date(2024, 5, 20)),
+                                              catalogue)
+
+            assert get_leaderboard(1, "company", "month") is None
+            assert get_leaderboard(1, "company", "all_time") == {"supply": {"Company 0": 10}, "purchase": {}}
+        assert ("month", date(2024, 5, 1), "company", 1, "Supply", 10) in boards()
+
+    def test_rolling_board_needs_a_rebuild_for_todays_window(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            EntryService.pre_entry_validation(make_entry(1, quantities=[1], company="Company 0", day=date.today()),
+                                              catalogue)
+            assert get_leaderboard(1, "company", "rolling_30d") is None
+
+            rebuild_leaderboards()
+            EntryService.pre_entry_validation(make_entry(2, quantities=[2], company="Company 0", day=date.today()),
+                                              catalogue)
+            # Older than the window: not counted
+            EntryService.pre_entry_validation(
+                make_entry(3, quantities=[4], company="Company 0", day=date.today() - timedelta(days=30)), catalogue
+            )
+
+            assert get_leaderboard(1, "company", "rolling_30d") == {"supply": {"Company 0": 30}, "purchase": {}}
+
+    def test_rebuild_ages_out_the_rolling_window(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            EntryService.pre_entry_validation(
+                make_entry(1, quantities=[1], company="Company 0", day=date.today() - timedelta(days=29)), catalogue
+            )
+            rebuild_leaderboards()
+            assert get_leaderboard(1, "company", "rolling_30d") == {"supply": {"Company 0": 10}, "purchase": {}}
+
+            rebuild_leaderboards(today=date.today() + timedelta(days=1))
+
+        assert not [row for row in boards() if row[0] == "rolling_30d"]
+
+    def test_future_entries_join_all_time_on_their_day(self, catalogue, make_entry, db_app):
+        tomorrow = date.today() + timedelta(days=1)
+        with db_app.test_request_context():
+            EntryService.pre_entry_validation(make_entry(1, quantities=[1], company="Company 0", day=tomorrow), catalogue)
+            assert get_leaderboard(1, "company", "all_time") is None
+
+            rebuild_leaderboards()
+            assert get_leaderboard(1, "company", "all_time") is None
+
+            rebuild_leaderboards(today=tomorrow)
+            assert get_leaderboard(1, "company", "all_time") == {"supply": {"Company 0": 10}, "purchase": {}}
+        assert ("month", tomorrow.replace(day=1), "company", 1, "Supply", 10) in boards()
+
+    def test_rebuild_matches_incremental_boards(self, catalogue, make_entry, db_app):
+        with db_app.test_request_context():
+            rebuild_leaderboards()
+            for number, day in enumerate([date.today(), date(2024, 5, 20), date(2024, 6, 1)]):
+                EntryService.pre_entry_validation(
+                    make_entry(number + 1, quantities=[1, 2], company=f"Company {number % 2}", day=day), catalogue
+                )
+            incremental = boards()
+
+            rebuild_daily_totals()
+            rebuild_leaderboards()
+
+            assert boards() == incremental
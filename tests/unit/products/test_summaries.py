@@ -0,0 +1,179 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from flask import g
+
+from extensions import db
+from models import User, Product, ProductSummaryCache
+from summaries import SummaryQueue, SUMMARY_UNAVAILABLE, cached_summary, store_summary
+
+
+@pytest.fixture
+def product(db_app):
+    user = User(id=1, name="Kaja", email="kaja@example.com", auth0_sub="okta|1")
+    product = Product(id=1, name="Acetone", stock=0, customs_code="22375", img_url="https://example.com", user=user)
+    db.session.add_all([user, product])
+    db.session.commit()
+    return product
+
+
+@pytest.fixture
+def other_tenant_product(product):
+    user = User(id=2, name="Ola", email="ola@example.com", auth0_sub="okta|2")
+    db.session.add_all([user, Product(id=2, name=" ACETONE", stock=0, customs_code="22375",
+                                      img_url="https://example.com", user=user)])
+    db.session.commit()
+
+
+@pytest.fixture
+def gated_queue():
+    """A queue on the fake backend whose jobs wait for 'release' and record the products they were called for."""
+    queue = SummaryQueue(workers=2, max_pending=2, backend="fake")
+    release, calls = threading.Event(), []
+
+    def generate(product_name):
+        calls.append(product_name)
+        release.wait(5)
+        return f"Summary of {product_name}"
+
+    queue.generate = generate
+    yield queue, release, calls
+    release.set()
+    queue.executor.shutdown(wait=True)
+
+
+class TestSummaryQueue:
+
+    def test_requests_for_a_product_share_one_job(self, product, gated_queue, db_app):
+        queue, release, calls = gated_queue
+
+        first = queue.submit(1, "Acetone")
+        second = queue.submit(1, "Acetone")
+        assert first is second and queue.is_pending(1)
+
+        release.set()
+        first.result(5)
+
+        assert calls == ["Acetone"]
+        assert not queue.is_pending(1)
+        db.session.expire_all()
+        assert db.session.get(Product, 1).summary == "Summary of Acetone"
+
+    def test_failed_call_stores_the_fallback_uncached(self, product, db_app):
+        queue = SummaryQueue(workers=1, backend="fake")
+        queue.generate = lambda product_name: None
+
+        queue.submit(1, "Acetone").result(5)
+
+        db.session.expire_all()
+        assert db.session.get(Product, 1).summary == SUMMARY_UNAVAILABLE
+        assert cached_summary("Acetone") is None
+
+    def test_full_queue_drops_new_products(self, db_app, gated_queue):
+        queue, release, calls = gated_queue
+        queue.submit(1, "Acetone")
+        queue.submit(2, "Ethanol")
+
+        assert queue.submit(3, "Toluene") is None
+        assert queue.stats() == {"pending": 2, "max_pending": 2}
+
+    def test_same_name_is_generated_once_across_tenants(self, other_tenant_product, gated_queue, db_app):
+        queue, release, calls = gated_queue
+
+        jobs = [queue.submit(1, "Acetone"), queue.submit(2, " ACETONE")]
+        release.set()
+        for job in jobs:
+            job.result(5)
+
+        assert len(calls) == 1
+        db.session.expire_all()
+        assert len({product.summary for product in Product.query.all()}) == 1
+
+    def test_regeneration_bypasses_and_replaces_the_cache(self, product, gated_queue, db_app):
+        queue, release, calls = gated_queue
+        store_summary("acetone", "Old summary")
+        db.session.commit()
+        release.set()
+
+        queue.submit(1, "Acetone", regenerate=True).result(5)
+
+        assert calls == ["Acetone"]
+        assert cached_summary("  Acetone") == "Summary of Acetone"
+        assert ProductSummaryCache.query.count() == 1
+
+    def test_regeneration_does_not_join_a_plain_job(self, product, gated_queue, db_app):
+        """A plain job may only copy the cached summary: a regeneration requested meanwhile runs after it."""
+        queue, release, calls = gated_queue
+        store_summary("Acetone", "Old summary")
+        db.session.commit()
+        queue.generate = lambda product_name: calls.append(product_name) or "New summary"
+
+        with db_app.test_request_context():
+            with queue._name_lock("Acetone"):  # Holds both jobs until both are queued
+                plain = queue.submit(1, "Acetone")
+                regeneration = queue.submit(1, "Acetone", regenerate=True)
+                assert plain is not regeneration
+            queue._release_name_lock("Acetone")
+        plain.result(5)
+        regeneration.result(5)
+
+        assert calls == ["Acetone"]
+        db.session.expire_all()
+        assert db.session.get(Product, 1).summary == "New summary"
+        assert cached_summary("Acetone") == "New summary"
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            SummaryQueue(backend="gpt-9")
+
+
+class TestProductSummaryRoutes:
+
+    def test_get_product_returns_before_the_summary(self, product, gated_queue, db_app):
+        from products.routes import get_product, get_product_summary
+        queue, release, calls = gated_queue
+
+        with patch("products.routes.SUMMARY_QUEUE", queue), patch("summaries.SUMMARY_QUEUE", queue), \
+                db_app.test_request_context():
+            g.user = db.session.get(User, 1)
+            response, status = get_product(1)
+
+            assert status == 200
+            assert response.json["summary_status"] == "pending"
+            assert response.json["product"]["summary"] is None
+
+            job = queue.in_flight[(1, False)]
+            release.set()
+            job.result(5)
+            db.session.expire_all()
+            response, status = get_product_summary(1)
+
+        assert response.json == {"summary": "Summary of Acetone", "status": "ready"}
+        assert calls == ["Acetone"]
+
+    def test_new_products_take_the_cached_summary(self, product, db_app):
+        from products.routes import add_product
+        store_summary("Sodium hydroxide", "Caustic soda.")
+        db.session.commit()
+
+        with db_app.test_request_context(json={"name": "Sodium Hydroxide", "customs_code": "28151100",
+                                               "img_url": "https://example.com"}):
+            g.user = db.session.get(User, 1)
+            response, status = add_product()
+
+        assert status == 201
+        assert db.session.get(Product, response.json["product_id"]).summary == "Caustic soda."
+
+    def test_name_taken_by_another_account_is_a_conflict(self, product, db_app):
+        from products.routes import add_product
+        db.session.add(User(id=2, name="Ola", email="ola@example.com", auth0_sub="okta|2"))
+        db.session.commit()
+
+        with db_app.test_request_context(json={"name": "Acetone", "customs_code": "29141100",
+                                               "img_url": "https://example.com"}):
+            g.user = db.session.get(User, 2)
+            response, status = add_product()
+
+        assert status == 409
+        assert Product.query.count() == 1
@@ -0,0 +1,136 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from extensions import db
+from models import Product
+from utils import request_product_summary
+from summaries import AdaptiveLimiter, backfill_summaries, cached_summary, SUMMARY_UNAVAILABLE
+
+
+@pytest.fixture
+def openai_stub(monkeypatch):
+    """Local chat completions endpoint answering the first 'rate_limited' requests with 429, the others with a
+    summary naming the product. Records the product of each request."""
+    state = {"rate_limited": 0, "products": []}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            product = body["messages"][1]["content"].split(": ", 1)[1].split(" in 2-3")[0]
+            with lock:
+                state["products"].append(product)
+                limited = state["rate_limited"] > 0
+                state["rate_limited"] -= limited
+            if limited:
+                self.send_response(429)
+                payload = {"error": {"message": "Rate limit reached", "type": "requests"}}
+            else:
+                self.send_response(200)
+                payload = {"choices": [{"index": 0, "message": {"role": "assistant", "content": f"About {product}."}}]}
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Retry-After", "0.01")
+            self.end_headers()
+            self.wfile.write(json.dumps(payload).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_BASE", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    yield state
+    server.shutdown()
+
+
+@pytest.fixture
+def catalogue(make_catalogue):
+    """Two tenants' products, the second tenant sharing two names with the first."""
+    make_catalogue(products=["Acetone", "Ethanol", "Toluene", "Xylene"], companies=[])
+    make_catalogue(products=["acetone", "ETHANOL "], companies=[], user_id=2)
+
+
+def summaries():
+    db.session.expire_all()
+    return {product.id: product.summary for product in Product.query.all()}
+
+
+class TestBackfillSummaries:
+
+    def test_generates_each_name_once(self, catalogue, openai_stub, db_app):
+        totals = backfill_summaries(request_product_summary, concurrency=3, batch_size=4)
+
+        assert sorted(openai_stub["products"]) == ["Acetone", "Ethanol", "Toluene", "Xylene"]
+        assert summaries() == {1: "About Acetone.", 2: "About Ethanol.", 3: "About Toluene.", 4: "About Xylene.",
+                               5: "About Acetone.", 6: "About Ethanol."}
+        assert (totals["products"], totals["generated"], totals["cached"], totals["failed"]) == (6, 4, 2, 0)
+
+    def test_backs_off_on_rate_limits(self, catalogue, openai_stub, db_app):
+        openai_stub["rate_limited"] = 3
+
+        totals = backfill_summaries(request_product_summary, concurrency=2, backoff=0.01)
+
+        assert totals["rate_limits"] == 3
+        assert totals["failed"] == 0
+        assert None not in summaries().values()
+
+    def test_gives_up_after_the_retries(self, catalogue, openai_stub, db_app):
+        openai_stub["rate_limited"] = 100
+
+        totals = backfill_summaries(request_product_summary, concurrency=1, max_retries=1, backoff=0.01)
+
+        assert totals["failed"] == 6
+        assert set(summaries().values()) == {None}
+        assert cached_summary("Acetone") is None
+
+    def test_resumes_after_the_checkpoint(self, catalogue, openai_stub, db_app, tmp_path):
+        checkpoint = str(tmp_path / "backfill.json")
+        openai_stub["rate_limited"] = 4  # The whole first batch fails
+        totals = backfill_summaries(request_product_summary, batch_size=4, checkpoint=checkpoint, max_retries=0)
+        assert (totals["failed"], totals["generated"]) == (4, 2)
+
+        assert backfill_summaries(request_product_summary, checkpoint=checkpoint)["products"] == 0
+
+        totals = backfill_summaries(request_product_summary, checkpoint=checkpoint, resume=False)
+        assert (totals["products"], totals["cached"], totals["generated"]) == (4, 2, 2)
+        assert None not in summaries().values()
+
+    def test_retries_the_fallbacks_on_request(self, catalogue, openai_stub, db_app):
+        db.session.get(Product, 1).summary = SUMMARY_UNAVAILABLE
+        db.session.commit()
+        backfill_summaries(request_product_summary)
+        assert summaries()[1] == SUMMARY_UNAVAILABLE
+
+        backfill_summaries(request_product_summary, retry_unavailable=True)
+        assert summaries()[1] == summaries()[5] == "About acetone."
+
+    def test_cli_reports_throughput(self, catalogue, db_app, tmp_path):
+        from products import products_bp
+        db_app.register_blueprint(products_bp)
+
+        result = db_app.test_cli_runner().invoke(args=[
+            "products", "backfill-summaries", "--backend", "fake", "--checkpoint", str(tmp_path / "backfill.json")
+        ])
+
+        assert result.exit_code == 0, result.output
+        assert "6 product(s), 0 from cache, 4 generated, 0 failed" in result.output
+        assert "products/s" in result.output
+
+
+class TestAdaptiveLimiter:
+
+    def test_rate_limits_halve_and_successes_restore_the_limit(self):
+        limiter = AdaptiveLimiter(4, backoff=0.001)
+        limiter.acquire()
+        limiter.release(rate_limited=True)
+        assert limiter.limit == 2
+
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release()
+
+        assert limiter.limit == 4
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import pytest
+from flask import request
+from sqlalchemy import event
+
+from extensions import db
+from models import User
+from users import get_or_create_user_from_token, IDENTITY_CACHE, upsert_user
+
+
+@pytest.fixture(autouse=True)
+def clear_identity_cache():
+    IDENTITY_CACHE.clear()
+    yield
+    IDENTITY_CACHE.clear()
+
+
+class TestUserIdentityCache:
+
+    def test_cached_identity_needs_no_query(self, db_app):
+        """A cached identity is turned into a session-bound User without any SQL statement."""
+        db.session.add(User(id=7, auth0_sub="okta|7", name="Kaja Maja", email="kaja@example.com"))
+        db.session.commit()
+        db.session.remove()
+        IDENTITY_CACHE.set("okta|7", {"id": 7, "auth0_sub": "okta|7", "name": "Kaja Maja", "email": "kaja@example.com"})
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        with db_app.test_request_context():
+            request.user = {"sub": "okta|7"}
+            user = get_or_create_user_from_token()
+
+            assert user.id == 7
+            assert user.email == "kaja@example.com"
+            assert statements == []
+            # Relationships still load on access
+            assert user.entries == []
+
+    @patch("users.upsert_user")
+    def test_identity_cached_after_upsert(self, mock_upsert, db_app):
+        """The first request for a subject upserts the User once; later requests use the cache."""
+        mock_upsert.return_value = {"id": 3, "auth0_sub": "okta|3", "name": "Jan", "email": "jan@example.com"}
+
+        for _ in range(3):
+            with db_app.test_request_context():
+                request.user = {"sub": "okta|3", "name": "Jan", "email": "jan@example.com"}
+                user = get_or_create_user_from_token()
+                assert user.id == 3
+
+        mock_upsert.assert_called_once_with("okta|3", name="Jan", email="jan@example.com")
+
+    def test_missing_subject_returns_401(self, db_app):
+        with db_app.test_request_context():
+            request.user = {"name": "No sub"}
+            response, status_code = get_or_create_user_from_token()
+
+        assert status_code == 401
+
+
+class TestUpsertUser:
+
+    def test_creates_the_user(self, db_app):
+        identity = upsert_user("okta|5", name="Ola", email="ola@example.com")
+
+        user = User.query.filter_by(auth0_sub="okta|5").one()
+        assert identity == {"id": user.id, "auth0_sub": "okta|5", "name": "Ola", "email": "ola@example.com"}
+
+    def test_returns_the_existing_user_on_conflict(self, db_app):
+        db.session.add(User(id=4, auth0_sub="okta|4", name="Jan", email="jan@example.com"))
+        db.session.commit()
+
+        identity = upsert_user("okta|4", name="Jan Kowalski", email="other@example.com")
+
+        assert identity == {"id": 4, "auth0_sub": "okta|4", "name": "Jan", "email": "jan@example.com"}
+        assert User.query.count() == 1
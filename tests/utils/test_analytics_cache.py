@@ -0,0 +1,152 @@
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, g, jsonify
+
+from cache import TTLCache
+from analytics_cache import ResponseCache, cached_response, invalidate_analytics, unshared_invalidation_warning, \
+    ANALYTICS_CACHE
+
+
+class TestResponseCache:
+
+    def test_equivalent_arguments_share_a_key(self):
+        cache = ResponseCache("test_response_keys", maxsize=10, ttl=60, backend="memory")
+
+        first = cache.key(1, "analytics.global_summary", [("start", "2025-01-01"), ("end", " 2025-01-31 "), ("product_id", "")])
+        second = cache.key(1, "analytics.global_summary", [("end", "2025-01-31"), ("start", "2025-01-01")])
+
+        assert first == second
+        assert cache.key(2, "analytics.global_summary", [("end", "2025-01-31"), ("start", "2025-01-01")]) != first
+
+    def test_bump_hides_the_users_responses_only(self):
+        cache = ResponseCache("test_response_bump", maxsize=10, ttl=60, backend="memory")
+        cache.set(cache.key(1, "view", []), "{}", 200, 0.5)
+        cache.set(cache.key(2, "view", []), "{}", 200, 0.5)
+
+        cache.bump(1)
+
+        assert cache.get(cache.key(1, "view", [])) is None
+        assert cache.get(cache.key(2, "view", [])) is not None
+
+    def test_evicted_generation_only_causes_misses(self):
+        cache = ResponseCache("test_response_eviction", maxsize=10, ttl=60, backend="memory")
+        cache.set(cache.key(1, "view", []), "{}", 200, 0.5)
+
+        cache.generations.clear()
+
+        assert cache.get(cache.key(1, "view", [])) is None
+        assert not cache.shared
+
+    def test_bump_reaches_caches_sharing_the_generations(self):
+        """Two processes' caches reading the same generation store: a write handled by one hides the user's
+        responses cached by the other."""
+        generations = TTLCache("test_shared_generations", maxsize=10, ttl=60)
+        first = ResponseCache("test_response_worker_1", maxsize=10, ttl=60, backend="memory", generations=generations)
+        second = ResponseCache("test_response_worker_2", maxsize=10, ttl=60, backend="memory", generations=generations)
+        second.set(second.key(1, "view", []), "{}", 200, 0.5)
+        second.set(second.key(2, "view", []), "{}", 200, 0.5)
+
+        first.bump(1)
+
+        assert second.get(second.key(1, "view", [])) is None
+        assert second.get(second.key(2, "view", [])) is not None
+
+    def test_generations_default_to_redis_when_configured(self, monkeypatch):
+        monkeypatch.setenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        created = []
+        monkeypatch.setattr("analytics_cache.get_cache_backend",
+                            lambda name, backend=None, **kwargs: created.append((name, backend)) or object())
+
+        cache = ResponseCache("test_response_redis", backend="memory")
+
+        assert created == [("test_response_redis", "memory"), ("test_response_redis_generations", "redis")]
+        assert cache.shared
+
+    def test_stats_report_saved_time(self):
+        cache = ResponseCache("test_response_stats", maxsize=10, ttl=60, backend="memory")
+        key = cache.key(1, "view", [])
+        cache.set(key, "{}", 200, 0.25)
+        cache.get(key)
+        cache.get(key)
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["saved_seconds"]) == (2, 0.5)
+
+
+class TestCachedResponse:
+
+    @pytest.fixture
+    def view_app(self):
+        """A view counting its calls, run as user 1 (set by 'requires_auth' in the real routes)."""
+        ANALYTICS_CACHE.clear()
+        app = Flask(__name__)
+        calls = []
+
+        @app.before_request
+        def authenticate():
+            g.user = SimpleNamespace(id=1)
+
+        @app.route("/summary/<int:company_id>")
+        @cached_response
+        def summary(company_id):
+            calls.append(company_id)
+            if company_id == 0:
+                return jsonify(error="Not found"), 404
+            return jsonify(total=len(calls))
+
+        yield app.test_client(), calls
+        ANALYTICS_CACHE.clear()
+
+    def test_repeated_requests_are_served_from_cache(self, view_app):
+        client, calls = view_app
+
+        first = client.get("/summary/1?start=2025-01-01")
+        second = client.get("/summary/1?start=2025-01-01")
+
+        assert first.get_json() == second.get_json() == {"total": 1}
+        assert second.mimetype == "application/json"
+        assert calls == [1]
+
+    def test_writes_invalidate_the_users_responses(self, view_app):
+        client, calls = view_app
+        client.get("/summary/1")
+
+        invalidate_analytics(1)
+
+        assert client.get("/summary/1").get_json() == {"total": 2}
+
+    def test_errors_are_not_cached(self, view_app):
+        client, calls = view_app
+
+        client.get("/summary/0")
+        client.get("/summary/0")
+
+        assert calls == [0, 0]
+
+    def test_disabled_cache_calls_the_view(self, view_app):
+        client, calls = view_app
+        ANALYTICS_CACHE.enabled = False
+        try:
+            client.get("/summary/1")
+            client.get("/summary/1")
+        finally:
+            ANALYTICS_CACHE.enabled = True
+
+        assert calls == [1, 1]
+
+    def test_gunicorn_disables_the_cache_of_several_workers_without_shared_generations(self):
+        config = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py"))
+
+        assert not ANALYTICS_CACHE.shared
+        assert config["local_analytics_cache"](SimpleNamespace(num_workers=4))
+        assert not config["local_analytics_cache"](SimpleNamespace(num_workers=1))
+
+    def test_commands_warn_when_servers_cannot_see_their_invalidations(self, monkeypatch):
+        assert "CACHE_REDIS_URL" in unshared_invalidation_warning()
+
+        monkeypatch.setattr(ANALYTICS_CACHE, "generations", object())
+
+        assert unshared_invalidation_warning() is None
@@ -0,0 +1,47 @@
+import pytest
+
+from extensions import db
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Factory of apps in testing mode, on a SQLite file by default."""
+    from main import create_app
+
+    def make(**config):
+        return create_app({"TESTING": True, "MIGRATIONS": False,
+                           "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}", **config})
+
+    return make
+
+
+class TestCreateApp:
+
+    def test_startup_does_not_touch_the_database(self, make_app):
+        app = make_app(SQLALCHEMY_DATABASE_URI="postgresql://nobody@127.0.0.1:9/none")
+
+        assert app.test_client().get("/health").status_code == 200
+        assert "migrate" not in app.extensions
+
+    def test_not_ready_without_a_database(self, make_app):
+        app = make_app(SQLALCHEMY_DATABASE_URI="postgresql://nobody@127.0.0.1:9/none")
+
+        response = app.test_client().get("/ready")
+
+        assert response.status_code == 503
+        assert response.get_json() == {"ready": False, "error": "Database unavailable."}
+
+    def test_not_ready_before_the_migrations(self, make_app):
+        app = make_app()
+
+        assert app.test_client().get("/ready").status_code == 503
+
+    def test_ready_once_migrated(self, make_app):
+        app = make_app(MIGRATIONS=True)
+        with app.app_context():
+            db.create_all()
+
+        assert app.test_client().get("/ready").get_json() == {"ready": True}
+        assert "migrate" in app.extensions
+        with app.app_context():
+            db.drop_all()
@@ -0,0 +1,89 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import g
+
+from cache import TTLCache, reset_local_caches
+from utils import authenticate_token, TOKEN_CACHE, cache_verified_payload, token_cache_key
+
+
+class TestTTLCache:
+
+    def test_get_set_and_counters(self):
+        """Stored values are returned and hits/misses are counted."""
+        cache = TTLCache("test_counters", maxsize=10, ttl=60)
+
+        assert cache.get("missing") is None
+        cache.set("key", {"sub": "abc"})
+        assert cache.get("key") == {"sub": "abc"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+
+    def test_expired_entries_are_dropped(self):
+        """Entries are not served past their TTL."""
+        cache = TTLCache("test_expiry", maxsize=10, ttl=60)
+        cache.set("key", "value", ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """The cache never grows past maxsize, evicting the least recently used key."""
+        cache = TTLCache("test_eviction", maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_reset_local_caches_empties_every_cache(self):
+        """Forked workers start with empty caches and counters."""
+        caches = [TTLCache(f"test_reset_{i}", maxsize=10, ttl=60) for i in range(2)]
+        for cache in caches:
+            cache.set("key", "value")
+            cache.get("key")
+
+        reset_local_caches()
+
+        assert [(len(cache), cache.stats()["hits"]) for cache in caches] == [(0, 0), (0, 0)]
+
+
+class TestVerifiedTokenCache:
+
+    @pytest.fixture(autouse=True)
+    def clear_token_cache(self):
+        TOKEN_CACHE.clear()
+        yield
+        TOKEN_CACHE.clear()
+
+    def test_token_ttl_bounded_by_expiry(self):
+        """A token about to expire is not cached past its 'exp' claim."""
+        cache_verified_payload("expiring-token", {"sub": "abc", "exp": time.time() - 1})
+        assert TOKEN_CACHE.get(token_cache_key("expiring-token")) is None
+
+        cache_verified_payload("valid-token", {"sub": "abc", "exp": time.time() + 3600})
+        assert TOKEN_CACHE.get(token_cache_key("valid-token")) == {"sub": "abc", "exp": pytest.approx(time.time() + 3600, abs=5)}
+
+    @patch("utils.get_or_create_user_from_token")
+    @patch("utils.verify_token")
+    def test_repeated_requests_verify_token_once(self, mock_verify_token, mock_get_user, app):
+        """Only the first request with a given token runs the full verification."""
+        mock_verify_token.return_value = {"sub": "abc", "exp": time.time() + 3600}
+        mock_get_user.return_value = "user"
+
+        for _ in range(3):
+            with app.test_request_context():
+                assert authenticate_token("some.jwt.token") is None
+                assert g.user == "user"
+
+        mock_verify_token.assert_called_once_with("some.jwt.token")
+        assert mock_get_user.call_count == 3
+        assert TOKEN_CACHE.stats()["hits"] == 2
@@ -0,0 +1,130 @@
+import json
+import time
+import threading
+from unittest.mock import MagicMock, patch
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from jwks import JWKSKeyManager
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwks_response(private_key, kid="key-1", cache_control="max-age=600"):
+    jwk_dict = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk_dict.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    response = MagicMock()
+    response.json.return_value = {"keys": [jwk_dict]}
+    response.headers = {"Cache-Control": cache_control}
+    return response
+
+
+class TestJWKSKeyManager:
+
+    @patch("jwks.requests.get")
+    def test_returned_key_verifies_tokens(self, mock_get, private_key):
+        """Keys are stored pre-parsed and can be passed straight to jwt.decode."""
+        mock_get.return_value = jwks_response(private_key)
+        manager = JWKSKeyManager("https://example.com/keys")
+
+        token = jwt.encode({"sub": "abc"}, private_key, algorithm="RS256", headers={"kid": "key-1"})
+        key = manager.get_key("key-1")
+
+        assert jwt.decode(token, key, algorithms=["RS256"]) == {"sub": "abc"}
+        mock_get.assert_called_once_with("https://example.com/keys", timeout=5)
+
+    @patch("jwks.requests.get")
+    def test_concurrent_misses_share_one_fetch(self, mock_get, private_key):
+        """Threads missing the same key at the same time trigger a single fetch."""
+        def slow_get(*args, **kwargs):
+            time.sleep(0.05)
+            return jwks_response(private_key)
+
+        mock_get.side_effect = slow_get
+        manager = JWKSKeyManager("https://example.com/keys")
+
+        threads = [threading.Thread(target=manager.get_key, args=("key-1",)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_get.call_count == 1
+
+    @patch("jwks.requests.get")
+    def test_unknown_kid_fetches_are_rate_limited(self, mock_get, private_key):
+        """Repeated unknown key ids do not refetch the key set within the miss interval."""
+        mock_get.return_value = jwks_response(private_key)
+        manager = JWKSKeyManager("https://example.com/keys", miss_interval=60)
+
+        assert manager.get_key("key-1") is not None
+        for i in range(20):
+            assert manager.get_key(f"forged-{i}") is None
+
+        assert mock_get.call_count == 1
+
+    @patch("jwks.requests.get")
+    def test_expired_key_set_is_refetched(self, mock_get, private_key):
+        """The key set is kept only for the max-age announced by the JWKS endpoint."""
+        mock_get.return_value = jwks_response(private_key, cache_control="public, max-age=0")
+        manager = JWKSKeyManager("https://example.com/keys")
+
+        manager.get_key("key-1")
+        manager.get_key("key-1")
+
+        assert mock_get.call_count == 2
+
+    @patch("jwks.requests.get")
+    def test_refresh_drops_removed_keys(self, mock_get, private_key):
+        """A key missing from the refreshed key set is not served from the expired one."""
+        mock_get.return_value = jwks_response(private_key, cache_control="max-age=0")
+        manager = JWKSKeyManager("https://example.com/keys")
+        assert manager.get_key("key-1") is not None
+
+        mock_get.return_value = jwks_response(private_key, kid="key-2")
+
+        assert manager.get_key("key-1") is None
+        assert manager.get_key("key-2") is not None
+
+    @patch("jwks.requests.get")
+    def test_expired_key_is_kept_while_the_endpoint_is_down(self, mock_get, private_key):
+        mock_get.return_value = jwks_response(private_key, cache_control="max-age=0")
+        manager = JWKSKeyManager("https://example.com/keys")
+        key = manager.get_key("key-1")
+
+        mock_get.side_effect = ConnectionError("JWKS endpoint down")
+
+        assert manager.get_key("key-1") is key
+
+    @patch("jwks.requests.get")
+    def test_unknown_kid_fetches_are_rate_limited_while_the_endpoint_fails(self, mock_get, private_key):
+        """Without any key set loaded, failed fetches back off instead of being repeated by every token."""
+        mock_get.side_effect = ConnectionError("JWKS endpoint down")
+        manager = JWKSKeyManager("https://example.com/keys", miss_interval=60, failure_backoff=60)
+
+        with pytest.raises(ConnectionError):
+            manager.get_key("key-1")
+        for i in range(20):
+            assert manager.get_key(f"forged-{i}") is None
+
+        assert mock_get.call_count == 1
+        assert manager.failed_fetch_count == 1
+
+    @patch("jwks.requests.get")
+    def test_fetches_resume_after_the_failure_backoff(self, mock_get, private_key):
+        mock_get.side_effect = ConnectionError("JWKS endpoint down")
+        manager = JWKSKeyManager("https://example.com/keys", miss_interval=60, failure_backoff=0.01)
+        with pytest.raises(ConnectionError):
+            manager.get_key("key-1")
+
+        time.sleep(0.02)
+        mock_get.side_effect = None
+        mock_get.return_value = jwks_response(private_key)
+
+        assert manager.get_key("key-1") is not None
@@ -0,0 +1,79 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import utils
+from utils import extra_user_info_call, USERINFO_CACHE
+
+
+class StubUserInfoHandler(BaseHTTPRequestHandler):
+    """Local stand-in for Okta's /userinfo endpoint, counting the calls it receives."""
+    calls = 0
+
+    def do_GET(self):
+        StubUserInfoHandler.calls += 1
+        body = json.dumps({"name": "Kaja Maja", "email": "kaja@example.com", "call": StubUserInfoHandler.calls})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def userinfo_server(monkeypatch):
+    StubUserInfoHandler.calls = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUserInfoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OKTA_USERINFO_URL", f"http://127.0.0.1:{server.server_port}/userinfo")
+    USERINFO_CACHE.clear()
+    yield server
+    server.shutdown()
+    USERINFO_CACHE.clear()
+
+
+def wait_for_refreshes(timeout=2):
+    deadline = time.time() + timeout
+    while utils._userinfo_refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestUserInfoCache:
+
+    def test_fresh_entry_served_from_cache(self, userinfo_server, app):
+        """Only the first call for a subject reaches the userinfo endpoint."""
+        with app.test_request_context():
+            first = extra_user_info_call("token", subject="okta|1")
+            second = extra_user_info_call("token", subject="okta|1")
+
+        assert first == second
+        assert StubUserInfoHandler.calls == 1
+
+    def test_stale_entry_served_while_refreshed_in_background(self, userinfo_server, app, monkeypatch):
+        """A stale entry is returned immediately and replaced by one background refresh."""
+        monkeypatch.setattr(utils, "USERINFO_CACHE_TTL", 0)
+
+        with app.test_request_context():
+            extra_user_info_call("token", subject="okta|1")
+            time.sleep(0.01)
+            stale = [extra_user_info_call("token", subject="okta|1") for _ in range(5)]
+            wait_for_refreshes()
+
+        assert all(info["call"] == 1 for info in stale)
+        assert StubUserInfoHandler.calls == 2
+        assert USERINFO_CACHE.get("okta|1")["info"]["call"] == 2
+
+    def test_failed_fetch_is_not_cached(self, app, monkeypatch):
+        """Errors from the userinfo endpoint are not cached."""
+        monkeypatch.setenv("OKTA_USERINFO_URL", "http://127.0.0.1:1/userinfo")
+        USERINFO_CACHE.clear()
+
+        with app.test_request_context():
+            assert extra_user_info_call("token", subject="okta|2") is None
+
+        assert USERINFO_CACHE.get("okta|2") is None
@@ -111,12 +111,18 @@ class TestUtilFunctions:
     @patch('utils.Product.query')
     def test_single_line_item_validation(self, mock_query, data, expected_return, product_found, app):
         """Test of utility function single_line_item_validation."""
-        mock_product = MagicMock(spec = Product) if product_found else None
-        mock_query.filter_by.return_value.first.return_value = mock_product  # Simulate that a product was or wasn't found
+        mock_products = []
+        if product_found and isinstance(data, list):
+            for line_item in data:
+                mock_product = MagicMock(spec = Product)
+                mock_product.name = line_item["product"]
+                mock_products.append(mock_product)
+        mock_query.filter.return_value.all.return_value = mock_products  # Simulate that the products were or weren't found
 
+        validated_products = {}
         with app.app_context():
             with app.test_request_context():
-                result = single_line_item_validation(data)
+                result = single_line_item_validation(data, 1, validated_products)
 
         # Assert for error cases
         if expected_return:
@@ -125,12 +131,10 @@ class TestUtilFunctions:
 
         else:
             # Assert: In the case of a successful validation (no error)
-            # Ensure that the products were queried correctly for each line item
-            for line_item in data:
-                product_name = line_item.get('product')
-                mock_query.filter_by.assert_any_call(name=product_name)
-                # If there's no return value, we assume success, so we can verify that line items were validated correctly
-                assert len(result) == len(data)  # Validate that the line items are returned as expected
+            # All the products are resolved with a single query and handed back to the caller
+            assert mock_query.filter.call_count == 1
+            assert set(validated_products.keys()) == {line_item["product"] for line_item in data}
+            assert len(result) == len(data)  # Validate that the line items are returned as expected
 
     def test_get_or_create_product_company(self):
 
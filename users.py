@@ -1,12 +1,47 @@
-from flask import jsonify, Blueprint, current_app
+import os
+from flask import jsonify, Blueprint, current_app, g
 from extensions import db
 from models import User
 from flask import request
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
+from cache import get_cache_backend
 
 
 users_bp = Blueprint("users", __name__)
 
+# Core User fields keyed by 'auth0_sub', so authenticated requests need no identity query.
+# The app never edits nor deletes Users, so entries are only refreshed by expiring ('IDENTITY_CACHE_TTL'):
+# a User changed or deleted directly in the database keeps its cached identity, in every replica sharing
+# the cache, until then.
+IDENTITY_CACHE = get_cache_backend(
+    "user_identities",
+    maxsize=int(os.getenv("IDENTITY_CACHE_SIZE", 4096)),
+    ttl=int(os.getenv("IDENTITY_CACHE_TTL", 3600)),
+)
+
+def attach_user(identity):
+    """Builds a User from its cached fields and attaches it to the session without querying the database.
+    Relationships (entries, products, companies) are still lazy loaded on access."""
+    user = User(**identity)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def upsert_user(user_sub, name, email):
+    """Creates the User for the given subject, or returns the existing one, in a single statement.
+    Concurrent first logins cannot fail on the unique 'auth0_sub' constraint."""
+    from utils import dialect_insert  # 'utils' imports this module
+
+    statement = dialect_insert(User).values(auth0_sub=user_sub, name=name, email=email)
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.auth0_sub],
+        set_={"auth0_sub": statement.excluded.auth0_sub}  # No-op update, so the existing row is returned
+    ).returning(User.id, User.name, User.email)
+
+    row = db.session.execute(statement).one()
+    db.session.commit()
+    return {"id": row.id, "auth0_sub": user_sub, "name": row.name, "email": row.email}
+
 def get_or_create_user_from_token():
     """Analyzes the JWT Token payload and creates a new User in the database if it doesn't exist"""
     # token = request.headers.get('Authorization').split()[1]
@@ -22,31 +57,33 @@ def get_or_create_user_from_token():
         current_app.logger.error(f"An error occurred while decoding the token: {str(e)}")
         return jsonify({"error": "Token decoding error"}), 401
 
-    user = User.query.filter_by(auth0_sub=user_sub).first()
-    if not user:
-        # If user doesn't exist in DB, create a new one (considering using profile data from Auth0 here)
-        try:
-            user = User(
-                auth0_sub=user_sub,
-                name=decoded_token.get('name'),
-                email=decoded_token.get('email')
-            )
-            db.session.add(user)
-            db.session.commit()
-            current_app.logger.info(f"New user created: {user.id}")
-
-        except IntegrityError as e:
-            db.session.rollback()
-            current_app.logger.error(f"Database Integrity Error while creating a new User: {str(e)}")
-            return jsonify({"error": "Database integrity error"}), 500
-
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            current_app.logger.error(f"SQLAlchemy error while creating a new User: {str(e)}")
-            return jsonify({"error": "Database error"}), 500
-
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"An error occurred while creating a new user: {str(e)}")
-            return jsonify({"error": "Internal server error"}), 500
-    return user
+    # Already resolved earlier in this request
+    user = g.get("user")
+    if isinstance(user, User) and user.auth0_sub == user_sub:
+        return user
+
+    identity = IDENTITY_CACHE.get(user_sub)
+    if identity:
+        return attach_user(identity)
+
+    try:
+        identity = upsert_user(user_sub, name=decoded_token.get('name'), email=decoded_token.get('email'))
+        IDENTITY_CACHE.set(user_sub, identity)
+        current_app.logger.info(f"User synced: {identity['id']}")
+
+    except IntegrityError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database Integrity Error while creating a new User: {str(e)}")
+        return jsonify({"error": "Database integrity error"}), 500
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"SQLAlchemy error while creating a new User: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"An error occurred while creating a new user: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    return attach_user(identity)
@@ -1,56 +1,78 @@
 import os
+import time
+import hashlib
+import threading
 from functools import wraps
 import requests
 from flask import jsonify, current_app, request, g
 from datetime import datetime
 from werkzeug.exceptions import NotFound
+from sqlalchemy import func, cast, literal_column, Date
 from extensions import db
 from models import Product, ProductCompany, Company
 from users import get_or_create_user_from_token
+from cache import TTLCache, get_cache_backend
+from jwks import JWKSKeyManager
 import json
 from dotenv import load_dotenv
 import jwt
-from jose import jwk
 from jose.utils import base64url_decode
 from jwt.algorithms import RSAAlgorithm
 from requests.exceptions import RequestException
-import openai
 
 # Loading the environment variables
 load_dotenv()
 
-JWKS_CACHE = {}
-
-def get_public_key_from_jwks(token):
-    """Fetch and return the matching public key from the JWKS endpoint."""
+# Verified token payloads (with the extra user info merged in), keyed by a hash of the raw token.
+# Entries never outlive the token's own 'exp' claim.
+TOKEN_CACHE = TTLCache(
+    "verified_tokens",
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("TOKEN_CACHE_TTL", 300)),
+)
+
+def token_cache_key(token):
+    """Hash of the raw token, so the bearer tokens themselves are never kept in memory as keys."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def cache_verified_payload(token, payload):
+    """Caches a verified token payload until the cache TTL or the token's expiry, whichever comes first."""
+    exp = payload.get("exp")
+    ttl = TOKEN_CACHE.ttl
+    if exp is not None:
+        ttl = min(ttl, int(exp - time.time()))
+    TOKEN_CACHE.set(token_cache_key(token), payload, ttl=ttl)
+
+def jwks_url():
+    """Okta's JWKS endpoint, overridable with 'OKTA_JWKS_URL'."""
+    return os.getenv("OKTA_JWKS_URL") or f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default/v1/keys"
+
+# Pre-parsed signing keys, shared by all requests of this process
+JWKS_KEYS = JWKSKeyManager(
+    jwks_url,
+    timeout=int(os.getenv("JWKS_TIMEOUT", 5)),
+    default_max_age=int(os.getenv("JWKS_MAX_AGE", 3600)),
+    miss_interval=int(os.getenv("JWKS_MISS_INTERVAL", 60)),
+    failure_backoff=float(os.getenv("JWKS_FAILURE_BACKOFF", 1)),
+)
+
+def get_public_key_from_jwks(unverified_header):
+    """Return the public key matching the token header's 'kid', ready to verify the signature."""
     try:
-        unverified_header = jwt.get_unverified_header(token)
         # Check algorithm
         alg = unverified_header.get("alg")
         if alg != "RS256":
             current_app.logger.error(f"Unexpected signing algorithm: {alg}")
-            return jsonify({"error": "Invalid token algorithm"}), 401
+            return None
         kid = unverified_header.get('kid')
 
         if not kid:
             raise Exception("No 'kid' found in token header")
 
-        # If the key has been caught already, return it
-        if kid in JWKS_CACHE:
-            return JWKS_CACHE[kid]
-
-        # Fetch keys from Okta's JWKS endpoint
-        jwks_url = f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default/v1/keys"
-        response = requests.get(jwks_url)
-        response.raise_for_status()
-
-        jwks = response.json()
-        for key in jwks['keys']:
-            if key['kid'] == kid:
-                JWKS_CACHE[kid] = key
-                return key
-
-        raise Exception("Matching 'kid' not found in JWKS")
+        key = JWKS_KEYS.get_key(kid)
+        if key is None:
+            raise Exception("Matching 'kid' not found in JWKS")
+        return key
 
     except Exception as e:
         current_app.logger.error(f"Error retrieving JWKS: {str(e)}")
@@ -73,13 +95,17 @@ def product_check(name):
     check_for_product = Product.query.filter_by(name=name, user_id=user_id).first()
     return check_for_product
 
-def get_user_item_or_404(model, item_id): # Instead of 3 for every model- worth considering
-    """Retrieve an item (Product, Company, etc.) that belongs to the logged-in user. Return a 404 error if unauthorized."""
+def get_user_item_or_404(model, item_id, options=None): # Instead of 3 for every model- worth considering
+    """Retrieve an item (Product, Company, etc.) that belongs to the logged-in user. Return a 404 error if unauthorized.
+    Optional loader 'options' are applied to the query (ex. eager loading for serialisation)."""
     if not g.user:
         current_app.logger.error("User not authenticated")
         raise NotFound(description="User not authenticated.")
 
-    item = model.query.filter_by(id=item_id, user_id=g.user.id).first()
+    query = model.query
+    if options:
+        query = query.options(*options)
+    item = query.filter_by(id=item_id, user_id=g.user.id).first()
     current_app.logger.debug(f"Checking item {item_id} for user {g.user}")
 
     if item is None:
@@ -97,49 +123,76 @@ def company_check(name):
     check_for_company = Company.query.filter_by(name=name, user_id=user_id).first()
     return check_for_company
 
-def single_line_item_validation(line_items_list):
-    """Validate LineItems separately before DB transactions"""
+def resolve_products_by_name(names, user_id):
+    """Fetches the user's Products with the given names in a single IN query. Returns a dict keyed by product name:
+    names of other accounts' Products are missing from it, like unknown names."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return {product.name: product for product in
+            Product.query.filter(Product.user_id == user_id, Product.name.in_(names)).all()}
+
+def single_line_item_validation(line_items_list, user_id, validated_products=None):
+    """Validate LineItems separately before DB transactions.
+    All referenced Products of the user are resolved in one query; when a 'validated_products' dict is given,
+    it is filled with them (keyed by name) so the caller can reuse the objects instead of querying again."""
     validated_line_items = []
 
     # Check if there is at least one LineItem tied to the new Entry:
-    if isinstance(line_items_list, list) and len(line_items_list) > 0:
-        for line_item in line_items_list:
-            product_to_assign = Product.query.filter_by(name=line_item.get('product')).first()
-            if not product_to_assign:
-                current_app.logger.warning(f"Product '{line_item.get('product')}' does not exist in the database. Cannot create LineItem.")
-                return jsonify(error=f"No such product: {line_item.get('product')} found in the database while trying to create new Entry."), 400
-            validated_line_items.append(line_item)
-    else:
+    if not isinstance(line_items_list, list) or len(line_items_list) == 0:
         return jsonify(error="Empty list or incorrect data format for line items."), 400
-        # One query to fetch all Product instances to avoid querying in the loop while creating LineItems, improving performance from N queries (per each product) to 1
-    validated_products = {line_item["product"] : Product.query.filter_by(name=line_item["product"]).first() for line_item in validated_line_items}
-    current_app.logger.info(f"Validated Line Items: {validated_products.keys()}, {validated_products.values()} ")
+
+    # One query to fetch all Product instances instead of one per LineItem
+    products = resolve_products_by_name((line_item.get('product') for line_item in line_items_list), user_id)
+    for line_item in line_items_list:
+        if line_item.get('product') not in products:
+            current_app.logger.warning(f"Product '{line_item.get('product')}' does not exist in the database. Cannot create LineItem.")
+            return jsonify(error=f"No such product: {line_item.get('product')} found in the database while trying to create new Entry."), 400
+        validated_line_items.append(numeric_line_item(line_item))
+
+    if validated_products is not None:
+        validated_products.update(products)
+    current_app.logger.info(f"Validated Line Items for products: {', '.join(products.keys())}")
 
     return validated_line_items
 
-def fetch_product_summary(product):
+# Version of the prompt and model below. Bump it on any change: summaries cached for older versions are not served anymore
+SUMMARY_PROMPT_VERSION = "1"
+
+def request_product_summary(product_name):
+    """Asks OpenAI for a short summary of the product, raising its errors (ex. 'RateLimitError' for callers
+    backing off). 'OPENAI_API_BASE' can point it at another endpoint (a local stub in tests and load runs)."""
+    import openai  # Slow to import: loaded by the first summary, not on the app's startup
 
     openai.api_key = os.getenv("OPENAI_API_KEY")
+    openai.api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+
+    response = openai.ChatCompletion.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a helpful assistant providing short summaries of industrial chemical products.",
+            },
+            {
+                "role": "user",
+                "content": f"""Summarize the industrial chemical product: {product_name} in 2-3 sentences for a product info section.
+                Focus on use cases and safety. You may greet website users first, as their assistant providing information
+                about this product."""
+            }
+        ],
+        temperature=0.7,
+    )
+
+    return response["choices"][0]["message"]["content"]
+
+def fetch_product_summary(product_name):
+    """Asks OpenAI for a short summary of the product. Returns None when the call fails.
+    Slow (seconds): called from the summary queue's workers, never from a request."""
+    import openai
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant providing short summaries of industrial chemical products.",
-                },
-                {
-                    "role": "user",
-                    "content": f"""Summarize the industrial chemical product: {product.name} in 2-3 sentences for a product info section.
-                    Focus on use cases and safety. You may greet website users first, as their assistant providing information
-                    about this product."""
-                }
-            ],
-            temperature=0.7,
-        )
-
-        return response["choices"][0]["message"]["content"]
+        return request_product_summary(product_name)
     
     except openai.error.RateLimitError as e:
         current_app.logger.error(f"Rate limit exceeded: {str(e)}")
@@ -182,6 +235,93 @@ def get_or_create_product_company(product_id, company_id):
         current_app.logger.error(f"An error: {str(e)} occurred while creating new ProductCompany model.")
         raise RuntimeError(f"Database error: {str(e)}")
 
+def dialect_insert(model):
+    """INSERT statement of the current database's dialect, supporting 'ON CONFLICT' (Postgres, and SQLite in tests)."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(model)
+    from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+    return postgresql_insert(model)
+
+def date_bucket(column, bucket: str):
+    """
+    First day of the bucket ('day', 'week' starting on Monday, or 'month') of a DATE column:
+    'date_trunc' on Postgres, SQLite date functions in tests.
+    """
+    if bucket == "day":
+        return column
+    if db.session.get_bind().dialect.name == "sqlite":
+        if bucket == "week":
+            return func.date(column, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+        return func.strftime(literal_column("'%Y-%m-01'"), column)
+    return cast(func.date_trunc(literal_column(f"'{bucket}'"), column), Date)
+
+def insert_on_conflict_do_nothing(model, index_elements):
+    """'INSERT ... ON CONFLICT (index_elements) DO NOTHING' for the dialect of the current database."""
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def get_or_create_product_companies(product_ids, company_id):
+    """Returns the ProductCompany connections of the given products with a company, keyed by product ID.
+    Existing connections are fetched in one query; the missing ones are created with one multi-row
+    'INSERT ... ON CONFLICT DO NOTHING' and fetched with one more query.
+    All returned connections are locked (in product ID order) for the rest of the transaction, as the caller
+    is about to update their totals."""
+
+    product_ids = set(product_ids)
+    try:
+        connections = {
+            pc.product_id: pc
+            for pc in lock_rows(ProductCompany.query.filter(
+                ProductCompany.company_id == company_id,
+                ProductCompany.product_id.in_(product_ids)
+            ), ProductCompany.product_id)
+        }
+
+        missing_ids = product_ids - connections.keys()
+        if missing_ids:
+            today = datetime.today().strftime("%Y-%m-%d")
+            # Another transaction may create the same connections meanwhile: the unique (product_id, company_id)
+            # constraint turns those rows into no-ops here, and they are fetched (and locked) below.
+            # Rows are inserted in product ID order, so two Entries inserting the same ones cannot deadlock
+            db.session.execute(insert_on_conflict_do_nothing(ProductCompany, ["product_id", "company_id"]), [
+                {
+                    "company_id": company_id,
+                    "product_id": product_id,
+                    "total_quantity_supplied": 0,
+                    "total_quantity_bought": 0,
+                    "last_transaction_date": today
+                }
+                for product_id in sorted(missing_ids)
+            ])
+            connections.update({
+                pc.product_id: pc
+                for pc in lock_rows(ProductCompany.query.filter(
+                    ProductCompany.company_id == company_id,
+                    ProductCompany.product_id.in_(missing_ids)
+                ), ProductCompany.product_id)
+            })
+            current_app.logger.info(f"Created {len(missing_ids)} new ProductCompany connection(s) for Company: {company_id}.")
+
+        return connections
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"An error: {str(e)} occurred while creating new ProductCompany models.")
+        raise RuntimeError(f"Database error: {str(e)}")
+
+def lock_rows(query, *order_by):
+    """
+    Runs the query with 'SELECT ... FOR NO KEY UPDATE', locking the rows in the given (deterministic) order,
+    so concurrent transactions updating the same rows queue up instead of deadlocking or losing updates.
+    Locked rows are re-read from the database, replacing any stale state of already loaded objects.
+    ('NO KEY' keeps the lock compatible with the FK checks of rows inserted by other transactions.)
+    """
+    return query.order_by(*order_by).with_for_update(key_share=True).populate_existing().all()
+
+def lock_products(product_ids):
+    """Locks the given Products in ID order and returns them (with their current stock) keyed by ID."""
+    return {product.id: product for product in lock_rows(Product.query.filter(Product.id.in_(set(product_ids))), Product.id)}
+
 def calculate_product_company(product_company, transaction_type, quantity):
     """
     Updates the quantity for the given ProductCompany based on the transaction type (Purchase or Supply).
@@ -198,7 +338,8 @@ def calculate_product_company(product_company, transaction_type, quantity):
         product_company.total_quantity_supplied += quantity
 
 def update_product_stock(product, transaction_type, quantity):
-    """Update the product's stock based on the transaction type and quantity."""
+    """Update the product's stock based on the transaction type and quantity.
+    The Product should be locked first (see 'lock_products'), otherwise concurrent updates may be lost."""
     if transaction_type == "Supply":
         product.stock += quantity
     elif transaction_type == "Purchase":
@@ -218,8 +359,12 @@ def validate_data_type(data, expected_type=str):
         current_app.logger.error(f"Incorrect data type(s) for: {''.join([key for key, value in data.items() if not isinstance(value, expected_type)])}")
         return type_errors
 
-def validate_numeric_fields(line_item):
-    """Check if price and quantity fields are numeric (both int and float)"""
+def parse_iso_date(value):
+    """Converts a 'YYYY-MM-DD' string to a date. Raises ValueError for other formats or impossible dates."""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def numeric_field_errors(line_item):
+    """Returns a dict of errors for non-numeric 'price_per_unit' and 'quantity' fields (empty if all are numeric)."""
     not_numeric = {}
     for key, value in line_item.items():
         if key == "quantity" or key == "price_per_unit":
@@ -230,13 +375,22 @@ def validate_numeric_fields(line_item):
             else:
                 try:
                     float(value)
-                except ValueError:
+                except (TypeError, ValueError):
                     current_app.logger.error(
                         f"Error while creating Entry: not numeric value for {key} in line_items. Received: {value}")
                     not_numeric[key] = f"Incorrect value: expected numeric value."
+    return not_numeric
 
+def validate_numeric_fields(line_item):
+    """Check if price and quantity fields are numeric (both int and float)"""
+    not_numeric = numeric_field_errors(line_item)
     if not_numeric: return jsonify(error=not_numeric), 400
 
+def numeric_line_item(line_item):
+    """Copy of a validated LineItem with 'quantity' and 'price_per_unit' as floats, as the JSON may send
+    numeric strings (ex. "2") that pass validation but cannot be summed with the stock and totals."""
+    return dict(line_item, quantity=float(line_item["quantity"]), price_per_unit=float(line_item["price_per_unit"]))
+
 def validate_product_data(data, product_instance = None, is_update = False):
     """Validate product data before adding/updating a product."""
 
@@ -290,13 +444,28 @@ def validate_company_data(data, company_instance = None, is_update = False):
                 else current_app.logger.warning(f"Unable to post a new company: name {data['name']} already taken.")
             return "A company of this name already exists for this account."
 
-def extra_user_info_call(token):
-    """A function that fetches additional user information from Auth0."""
+# Userinfo responses per token subject. Fresh for USERINFO_CACHE_TTL seconds, then served stale
+# (while a single background refresh runs) for up to USERINFO_CACHE_STALE_TTL more seconds.
+USERINFO_CACHE_TTL = int(os.getenv("USERINFO_CACHE_TTL", 300))
+USERINFO_CACHE_STALE_TTL = int(os.getenv("USERINFO_CACHE_STALE_TTL", 3600))
+USERINFO_CACHE = get_cache_backend(
+    "userinfo",
+    maxsize=int(os.getenv("USERINFO_CACHE_SIZE", 1024)),
+    ttl=USERINFO_CACHE_TTL + USERINFO_CACHE_STALE_TTL,
+)
+_userinfo_refreshing = set()
+_userinfo_refresh_lock = threading.Lock()
+
+def userinfo_url():
+    """Okta's userinfo endpoint, overridable with 'OKTA_USERINFO_URL' (ex. for a local stub server)."""
+    return os.getenv("OKTA_USERINFO_URL") or f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default/v1/userinfo"
+
+def fetch_user_info(token):
+    """A function that fetches additional user information from Okta."""
     try:
-        user_info_url = f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default/v1/userinfo"
-        user_info_response = requests.get(user_info_url, headers={
+        user_info_response = requests.get(userinfo_url(), headers={
             'Authorization': f'Bearer {token}'
-        })
+        }, timeout=int(os.getenv("USERINFO_TIMEOUT", 5)))
         s_code = user_info_response.status_code
         if s_code == 200:
             current_app.logger.info(f"Extra User info fetched successfully.")
@@ -314,6 +483,111 @@ def extra_user_info_call(token):
         current_app.logger.error(f"An error occurred while fetching extra user info: {str(e)}")
         return None
 
+def cache_user_info(subject, user_info):
+    USERINFO_CACHE.set(subject, {"info": user_info, "fetched_at": time.time()})
+
+def refresh_user_info(app, subject, token):
+    """Background refresh of a stale userinfo entry. Runs in its own thread, outside the request."""
+    try:
+        with app.app_context():
+            user_info = fetch_user_info(token)
+            if user_info:
+                cache_user_info(subject, user_info)
+    finally:
+        with _userinfo_refresh_lock:
+            _userinfo_refreshing.discard(subject)
+
+def schedule_user_info_refresh(subject, token):
+    """Starts a background refresh for the subject, unless one is already running."""
+    with _userinfo_refresh_lock:
+        if subject in _userinfo_refreshing:
+            return False
+        _userinfo_refreshing.add(subject)
+
+    app = current_app._get_current_object()
+    threading.Thread(target=refresh_user_info, args=(app, subject, token), daemon=True).start()
+    return True
+
+def extra_user_info_call(token, subject=None):
+    """Returns additional user information for the token's subject. Cached responses are served
+    immediately; stale ones trigger a single background refresh."""
+    if not subject:
+        return fetch_user_info(token)
+
+    cached = USERINFO_CACHE.get(subject)
+    if cached:
+        if time.time() - cached["fetched_at"] > USERINFO_CACHE_TTL:
+            schedule_user_info_refresh(subject, token)
+        return cached["info"]
+
+    user_info = fetch_user_info(token)
+    if user_info:
+        cache_user_info(subject, user_info)
+    return user_info
+
+def verify_token(token):
+    """Verifies the token signature and claims and merges the extra user info into its payload.
+    Returns the payload, or an error response if the token cannot be verified."""
+    unverified_header = jwt.get_unverified_header(token)
+    key_id = unverified_header.get("kid")
+
+    public_key = get_public_key_from_jwks(unverified_header)
+    if public_key is None:
+        return jsonify({"error": "Public key not found"}), 401
+
+    current_app.logger.debug(f"Decoding token with:\n"
+                f"audience={os.getenv('OKTA_AUDIENCE')}\n"
+                f"issuer=https://{os.getenv('OKTA_DOMAIN')}/oauth2/default\n"
+                f"key_id={key_id}")
+
+    try:
+        payload = jwt.decode(
+            token,
+            public_key,
+            algorithms=["RS256"],
+            audience=os.getenv("OKTA_AUDIENCE"),
+            issuer=f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default",
+        )
+    except jwt.ExpiredSignatureError as e:
+        return jsonify({'error': 'Token expired'}), 401
+    except jwt.InvalidTokenError as e:
+        return jsonify({'error': 'Invalid token'}), 401
+
+    # Fetch additional user info:
+    user_info = extra_user_info_call(token = token, subject = payload.get("sub"))
+    if user_info:
+        payload.update(user_info)  # Merge the user info into the payload
+
+    return payload
+
+def authenticate_token(token):
+    """Populates 'request.user' and 'g.user' for the given bearer token. Verified tokens are served
+    from the cache, skipping the signature check and the user info call. Returns an error response on failure."""
+    try:
+        payload = TOKEN_CACHE.get(token_cache_key(token))
+        if payload is None:
+            payload = verify_token(token)
+            if not isinstance(payload, dict):
+                return payload  # Error response
+            cache_verified_payload(token, payload)
+
+        request.user = dict(payload)
+        # Sync the user with the database
+        user = get_or_create_user_from_token()
+        if isinstance(user, tuple):
+            return user  # Error response
+        g.user = user # Store the user in the global context
+
+    except jwt.ExpiredSignatureError:
+        current_app.logger.error("Token expired")
+        return jsonify({"error": "Token expired"}), 401
+
+    except jwt.InvalidTokenError:
+        current_app.logger.error("Invalid token")
+        return jsonify({"error": "Invalid token"}), 401
+
+    return None
+
 def requires_auth(f):
 
     @wraps(f)
@@ -329,53 +603,9 @@ def requires_auth(f):
             return jsonify({"error": "Invalid Authorization header format"}), 401
 
         token = parts[1]
-        try:
-            unverified_header = jwt.get_unverified_header(token)
-            key_id = unverified_header.get("kid")
-
-            public_key_data = get_public_key_from_jwks(token)
-            if not public_key_data:
-                return jsonify({"error": "Public key not found"}), 401
-
-            public_key = jwk.construct(public_key_data)
-
-            pem_key = public_key.to_pem().decode("utf-8")
-
-            # Debug line 
-            current_app.logger.info(f"Decoding token with:\n"
-                        f"audience={os.getenv('OKTA_AUDIENCE')}\n"
-                        f"issuer=https://{os.getenv('OKTA_DOMAIN')}/oauth2/default\n"
-                        f"key_id={key_id}")
-
-            try: 
-                payload = jwt.decode(
-                    token,
-                    pem_key,
-                    algorithms=["RS256"],
-                    audience=os.getenv("OKTA_AUDIENCE"),
-                    issuer=f"https://{os.getenv('OKTA_DOMAIN')}/oauth2/default",
-                )
-            except jwt.ExpiredSignatureError as e:
-                return jsonify({'error': 'Token expired'}), 401
-            except jwt.InvalidTokenError as e:
-                return jsonify({'error': 'Invalid token'}), 401
-
-            # Fetch additional user info:
-            user_info = extra_user_info_call(token = token)
-            payload.update(user_info)  # Merge the user info into the payload
-
-            request.user = payload
-            # Sync the user with the database
-            user = get_or_create_user_from_token()
-            g.user = user # Store the user in the global context
-
-        except jwt.ExpiredSignatureError:
-            current_app.logger.error("Token expired")
-            return jsonify({"error": "Token expired"}), 401
-
-        except jwt.InvalidTokenError:
-            current_app.logger.error("Invalid token")
-            return jsonify({"error": "Invalid token"}), 401
+        auth_error = authenticate_token(token)
+        if auth_error:
+            return auth_error
 
         return f(*args, **kwargs)
     return decorated
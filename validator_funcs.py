@@ -3,7 +3,132 @@ from functools import wraps
 from flask import jsonify, current_app, request
 from models import Entry, LineItem
 from datetime import datetime
-from utils import validate_numeric_fields
+from utils import numeric_field_errors, parse_iso_date
+
+# The checks below return an error (message or dict of messages) or None. They are shared by the
+# request decorators (single Entry) and by the bulk/import paths, which validate many entries at once.
+
+def check_entry_fields(data):
+    """Ensures the entry contains only, and all of, the required fields."""
+    # If there's no data or the data is not in the expected format
+    if not data or not isinstance(data, dict):
+        return "No JSON data found in the request body."
+    # If there are any unexpected fields:
+    if any(key not in Entry.REQUIRED_FIELDS for key in data.keys()):
+        current_app.logger.error("Unable to post a new entry: invalid fields.")
+        invalid_fields = [key for key in data if key not in Entry.REQUIRED_FIELDS]
+        return f"Invalid field(s): {', '.join(invalid_fields)} while trying to create a new entry."
+    # If there are missing fields:
+    missing_fields = [key for key in Entry.REQUIRED_FIELDS if key not in data.keys()]
+    if missing_fields:
+        current_app.logger.error("Unable to post a new entry: missing fields.")
+        return f"Missing field(s): {', '.join(missing_fields)} while trying to create a new entry."
+    return None
+
+def validate_wz_number(wz_number):
+    """Function validating document_nr field for Entry creation. Ensures the data is in the proper format of:
+    ex. WZ 123/02/2025, meaning WZ (doc_nr)/(month)/(year)."""
+
+    match = re.match(r"^WZ\s(\d{1,4})/(\d{1,2})/(\d{4})$", wz_number or "")
+    if not match:
+        return False
+
+    transaction, month, year = map(int, match.groups())
+
+    if not (1 <= month <= 12):
+        return False
+
+    current_year = datetime.now().year
+    if not (2000 <= year <= current_year + 10):  # A reasonable time-frame for realistic inputs
+        return False
+
+    return True
+
+def check_document_nr(data):
+    """Ensures that given document number is of a WZ format."""
+    # Ensure that 'data' contains the required fields.
+    if 'document_nr' not in data:
+        current_app.logger.warning("Missing document number.")
+        return "Document number is required."
+
+    if not validate_wz_number(data.get('document_nr')):
+        current_app.logger.warning("Invalid document nr. format while trying to create new Entry.")
+        return (f"Invalid document number format: {data.get('document_nr')}. The accepted format example"
+                f" for document nr.: 'WZ 123/02/2025', meaning: WZ (document nr)/(month)/year).")
+    return None
+
+def check_transaction_type(data):
+    """Ensures that given transaction type is a 'Purchase' or 'Supply'"""
+    if data.get('transaction_type') not in Entry.TRANSACTION_TYPES:
+        current_app.logger.warning("Invalid data for the transaction_type property of the Entry.")
+        return f"Invalid data in the 'transaction type' field. Should be {' or '.join(Entry.TRANSACTION_TYPES)}."
+    return None
+
+def is_valid_date(value):
+    try:
+        parse_iso_date(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def check_date_format(data):
+    """Ensures that the given data is of the ISO 8601 format, meaning: YYYY-MM-DD"""
+    iso8601_date_regex = r"^\d{4}-\d{2}-\d{2}$"
+    if not re.match(iso8601_date_regex, str(data.get('date'))) or not is_valid_date(data.get('date')):
+        current_app.logger.warning("Invalid date format while trying to add the new Entry.")
+        return (f"Invalid date format: {data.get('date')} while adding new entry. The accepted date format is "
+                f"ISO 8601, meaning: YYYY-MM-DD")
+    return None
+
+def check_line_items(data):
+    """Ensures that all the given LineItems contain all the required properties and appropriate
+    values for their price and quantity. Products are checked against the database separately (requires querying)."""
+
+    # Empty line_items edge case
+    if not data.get('line_items'):
+        return "At least one line item is required."
+
+    for line_item in data.get('line_items'):
+
+        if not isinstance(line_item, dict):
+            return "Incorrect data format for line items."
+
+        quantity = line_item.get('quantity')
+        current_price = line_item.get('price_per_unit')
+        product = line_item.get('product')
+        # Check if any missing fields:
+        if quantity is None or current_price is None or product is None:
+            missing_fields = [field for field in LineItem.REQUIRED_FIELDS if field not in line_item]
+            current_app.logger.warning(f"Missing field(s): {', '.join(missing_fields)} while trying to create LineItem")
+            return f"Missing field(s): {', '.join(missing_fields)} while trying to create new LineItem."
+
+        # Validate fields for LineItem:
+        if any(key not in LineItem.REQUIRED_FIELDS for key in line_item):
+            invalid_fields = [key for key in line_item if key not in LineItem.REQUIRED_FIELDS]
+            current_app.logger.warning(
+                f"Invalid field(s): {', '.join(invalid_fields)} for the LineItem(s) while creating new Entry")
+            return f"Invalid field(s): {', '.join(invalid_fields)} while trying to create new LineItem."
+        # Check if vales for 'price' and 'quantity' are numeric (float or int):
+        type_errors = numeric_field_errors(line_item)
+        if type_errors: return type_errors
+        # Check if the quantity and price fields are greater than 0:
+        if float(quantity) <= 0 or float(current_price) <= 0:
+            current_app.logger.warning(
+                f"Fields 'quantity' or 'current_price' for LineItem received nov-positive values.")
+            return "Non-positive values for price or quantity for the product in the new Entry."
+
+    return None
+
+# Same order as the decorator chain on 'POST /entries'
+ENTRY_CHECKS = [check_entry_fields, check_document_nr, check_transaction_type, check_date_format, check_line_items]
+
+def validate_entry_data(data):
+    """Runs every entry check in order and returns the first error, or None if the entry is valid."""
+    for check in ENTRY_CHECKS:
+        error = check(data)
+        if error:
+            return error
+    return None
 
 def validate_json_payload(func):
     """Ensures request body contains only required fields."""
@@ -11,19 +136,9 @@ def validate_json_payload(func):
     def wrapper_function(*args, **kwargs):
 
         data = request.get_json()
-        # If there's no data or the data is not in the expected format
-        if not data:
-            return jsonify(error="No JSON data found in the request body."), 400
-        # If there are any unexpected fields:
-        if any(key not in Entry.REQUIRED_FIELDS for key in data.keys()):
-            current_app.logger.error("Unable to post a new entry: invalid fields.")
-            invalid_fields = [key for key in data if key not in Entry.REQUIRED_FIELDS]
-            return jsonify(error=f"Invalid field(s): {', '.join(invalid_fields)} while trying to create a new entry."), 400
-        # If there are missing fields:
-        missing_fields = [key for key in Entry.REQUIRED_FIELDS if key not in data.keys()]
-        if missing_fields:
-            current_app.logger.error("Unable to post a new entry: missing fields.")
-            return jsonify(error=f"Missing field(s): {', '.join(missing_fields)} while trying to create a new entry."), 400
+        error = check_entry_fields(data)
+        if error:
+            return jsonify(error=error), 400
 
         kwargs['data'] = data
         return func(*args, **kwargs)
@@ -36,40 +151,11 @@ def validate_document_nr(func):
     @wraps(func)
     def wrapper_function(*args, **kwargs):
 
-        data = kwargs.get('data')
-
-        def validate_wz_number(wz_number):
-            """Function validating document_nr field for Entry creation. Ensures the data is in the proper format of:
-            ex. WZ 123/02/2025, meaning WZ (doc_nr)/(month)/(year)."""
-
-            match = re.match(r"^WZ\s(\d{1,4})/(\d{1,2})/(\d{4})$", wz_number)
-            if not match:
-                return False
-
-            transaction, month, year = map(int, match.groups())
-
-            if not (1 <= month <= 12):
-                return False
-
-            current_year = datetime.now().year
-            if not (2000 <= year <= current_year + 10):  # A reasonable time-frame for realistic inputs
-                return False
-
-            return True
-
-        # Ensure that 'data' contains the required fields.
-        if 'document_nr' not in data:
-            current_app.logger.warning("Missing document number.")
-            return jsonify(error="Document number is required."), 400
+        error = check_document_nr(kwargs.get('data'))
+        if error:
+            return jsonify(error=error), 400
 
-        if not validate_wz_number(data.get('document_nr')):
-            current_app.logger.warning("Invalid document nr. format while trying to create new Entry.")
-            return jsonify(
-                error=f"Invalid document number format: {data.get('document_nr')}. The accepted format example"
-                      f" for document nr.: 'WZ 123/02/2025', meaning: WZ (document nr)/(month)/year)."), 400
-
-        else:
-            return func(*args, **kwargs)
+        return func(*args, **kwargs)
 
     return wrapper_function
 
@@ -78,15 +164,11 @@ def validate_transaction_type(func):
     @wraps(func)
     def wrapper_function(*args, **kwargs):
 
-        data = kwargs.get('data')
+        error = check_transaction_type(kwargs.get('data'))
+        if error:
+            return jsonify(error=error), 400
 
-        if data.get('transaction_type') not in Entry.TRANSACTION_TYPES:
-            current_app.logger.warning("Invalid data for the transaction_type property of the Entry.")
-            return jsonify(
-                error=f"Invalid data in the 'transaction type' field. Should be {' or '.join(Entry.TRANSACTION_TYPES)}."), 400
-
-        else:
-            return func(*args, **kwargs)
+        return func(*args, **kwargs)
 
     return wrapper_function
 
@@ -97,17 +179,11 @@ def validate_date_format(func):
     @wraps(func)
     def wrapper_function(*args, **kwargs):
 
-        data = kwargs.get('data')
+        error = check_date_format(kwargs.get('data'))
+        if error:
+            return jsonify(error=error), 400
 
-        iso8601_date_regex = r"^\d{4}-\d{2}-\d{2}$"
-        if not re.match(iso8601_date_regex, data.get('date')):
-            current_app.logger.warning("Invalid date format while trying to add the new Entry.")
-            return jsonify(
-                error=f"Invalid date format: {data.get('date')} while adding new entry. The accepted date format is "
-                      f"ISO 8601, meaning: YYYY-MM-DD"), 400
-
-        else:
-            return func(*args, **kwargs)
+        return func(*args, **kwargs)
 
     return wrapper_function
 
@@ -118,43 +194,10 @@ def validate_line_items(func):
     @wraps(func)
     def wrapper_function(*args, **kwargs):
 
-        data = kwargs.get('data')
-        
-        # Empty line_items edge case
-        if not data.get('line_items'):
-            return jsonify(error="At least one line item is required."), 400
-
-        for line_item in data.get('line_items'):
-
-            quantity = line_item.get('quantity')
-            current_price = line_item.get('price_per_unit')
-            product = line_item.get('product')
-            # Check if any missing fields:
-            if quantity is None or current_price is None or product is None:
-                missing_fields = [field for field in LineItem.REQUIRED_FIELDS if field not in line_item]
-                current_app.logger.warning(f"Missing field(s): {', '.join(missing_fields)} while trying to create LineItem")
-                return jsonify(error=f"Missing field(s): {', '.join(missing_fields)} while trying to create new LineItem."), 400
-
-            # Validate fields for LineItem:
-            if any(key not in LineItem.REQUIRED_FIELDS for key in line_item):
-                invalid_fields = [key for key in line_item if key not in LineItem.REQUIRED_FIELDS]
-                current_app.logger.warning(
-                    f"Invalid field(s): {', '.join(invalid_fields)} for the LineItem(s) while creating new Entry")
-                return jsonify(
-                    error=f"Invalid field(s): {', '.join(invalid_fields)} while trying to create new LineItem."), 400
-            # Check if vales for 'price' and 'quantity' are numeric (float or int):
-            type_errors = validate_numeric_fields(line_item)
-            if type_errors: return type_errors
-            # Check if the quantity and price fields are greater than 0:
-            if float(quantity) <= 0 or float(current_price) <= 0:
-                current_app.logger.warning(
-                    f"Fields 'quantity' or 'current_price' for LineItem received nov-positive values.")
-                return jsonify(error="Non-positive values for price or quantity for the product in the new Entry."), 400
-            # Check if provided product field corresponds to the existing Product:
-            # QUERYING DB MOVED TO VIEW FUNCTION
+        error = check_line_items(kwargs.get('data'))
+        if error:
+            return jsonify(error=error), 400
 
         return func(*args, **kwargs)
 
     return wrapper_function
-
-
@@ -0,0 +1,8 @@
+"""
+Production entry point: 'gunicorn -c gunicorn.conf.py wsgi:app'.
+The worker model and the pre-fork hooks are set in 'gunicorn.conf.py'.
+"""
+from main import create_app
+
+# Migrations are run by 'flask db' (FLASK_APP=main.py), never by the web workers
+app = create_app({"MIGRATIONS": False})